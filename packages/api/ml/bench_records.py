@@ -0,0 +1,268 @@
+"""
+Record-building benchmark for export_live_stats / odds_setter / preprocess_data.
+
+Times the column-wise builders (``export_live_stats._history_records``,
+``odds_setter.feature_cache_from_frame`` and
+``preprocess_data.engineer_features``) against the per-row versions they
+replaced (iterrows / ``apply(axis=1)``), on a synthetic copy of the inputs
+scaled up ``--scale`` times (player names suffixed per copy so the output
+grows too). Both versions must produce the same records; any difference
+fails the run.
+
+The history input is the VCT CSVs under data/Val-historical-stats when
+present, otherwise one year rebuilt from data/player_features.csv. The
+feature-engineering case runs on the full normalized players_stats dataset
+when it is present (``--scale`` is then ignored).
+
+Usage:
+  python packages/api/ml/bench_records.py                  # 100x copy, best of 3
+  python packages/api/ml/bench_records.py --scale 20 --iterations 1
+  python packages/api/ml/bench_records.py --only engineer
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+ML_DIR = Path(__file__).resolve().parent
+if str(ML_DIR) not in sys.path:
+    sys.path.insert(0, str(ML_DIR))
+
+import export_live_stats as els  # noqa: E402
+
+FEATURES_CSV = ML_DIR / "data" / "player_features.csv"
+# player_features.csv column -> VCT players_stats.csv header
+_HIST_HEADERS = {dst: src for src, dst in els._HIST_COLMAP.items()}
+_FEATURE_TO_HIST = {
+    "tournament": "tournament", "stage": "stage", "match_type": "match_type", "player": "player",
+    "team": "team", "rounds_played": "rounds", "rating": "rating", "acs": "acs",
+    "kills": "kills", "deaths": "deaths", "assists": "assists", "hs_pct": "hs",
+}
+
+
+# Reference implementations: the per-row loops these builders replaced.
+def _history_records_iterrows(agg: pd.DataFrame) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for _, r in agg.iterrows():
+        name = str(r["player"]).strip()
+        if not name or name.lower() == "nan":
+            continue
+        team = str(r.get("team") or "").split(",")[0].strip()
+        out.append(
+            {
+                "playerId": f"val-hist-{els._slug(name)}",
+                "name": name,
+                "team": team or "VCT",
+                "game": "VALORANT",
+                "imageUrl": "",
+                "maps": int(r["maps"]),
+                "kills": int(r["kills"] or 0),
+                "deaths": int(r["deaths"] or 0),
+                "assists": int(r["assists"] or 0),
+                "rating": round(float(r["rating"] or 0), 3),
+                "acs": int(round(float(r["acs"]))) if pd.notna(r.get("acs")) else None,
+                "hsPercent": round(float(r["hs"]), 1) if pd.notna(r.get("hs")) else None,
+                "source": "vct_history",
+            }
+        )
+    return out
+
+
+def _feature_cache_iterrows(df: pd.DataFrame, feature_cols: List[str]) -> Dict[str, Dict[str, Any]]:
+    latest = df.groupby("player", as_index=False).tail(1)
+    cache: Dict[str, Dict[str, Any]] = {}
+    for _, row in latest.iterrows():
+        cache[str(row["player"]).strip()] = {
+            c: float(row[c]) if c in row and pd.notna(row[c]) else 0.0 for c in feature_cols
+        }
+    return cache
+
+
+def _engineer_features_apply(df: pd.DataFrame) -> pd.DataFrame:
+    df['kdr'] = (df['kills'] / df['deaths']).replace([pd.NA, pd.NaT, float('inf')], None)
+    df['kad'] = ((df['kills'] + df['assists']) / df['deaths']).replace([pd.NA, pd.NaT, float('inf')], None)
+    df['fk_fd_diff'] = df['first_kills'] - df['first_deaths']
+    df['hs_rate'] = df['hs_pct'] / 100.0
+    df['clutch_rate'] = df.apply(lambda r: (r['clutches_won'] / r['clutches_played']) if r.get('clutches_played') not in (0, None, float('nan')) else None, axis=1)
+    return df
+
+
+def _scaled(df: pd.DataFrame, scale: int) -> pd.DataFrame:
+    copies = []
+    for i in range(scale):
+        c = df.copy()
+        if i:
+            c["player"] = c["player"].astype(str) + f" {i}"
+        copies.append(c)
+    return pd.concat(copies, ignore_index=True)
+
+
+def _history_sources() -> Dict[str, pd.DataFrame]:
+    files = sorted(els.HIST_DIR.glob("vct_*/players_stats/players_stats.csv"))
+    if files:
+        return {f.parent.parent.name: pd.read_csv(f) for f in files}
+    df = pd.read_csv(FEATURES_CSV, usecols=list(_FEATURE_TO_HIST))
+    df = df.rename(columns={k: _HIST_HEADERS[v] for k, v in _FEATURE_TO_HIST.items()})
+    return {"vct_2023": df}
+
+
+def _build_history_copy(root: Path, scale: int) -> int:
+    rows = 0
+    for year, df in _history_sources().items():
+        big = _scaled(df.rename(columns={"Player": "player"}), scale).rename(columns={"player": "Player"})
+        out = root / year / "players_stats" / "players_stats.csv"
+        out.parent.mkdir(parents=True)
+        big.to_csv(out, index=False)
+        rows += len(big)
+    return rows
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, float) and isinstance(b, float):
+        return a == b or (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, abs_tol=1e-9)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b and type(a) is type(b)
+
+
+def _time(fn: Callable[[], Any], iterations: int) -> tuple:
+    """Best-of-``iterations`` wall time (ms) and the first run's result."""
+    result, best = None, float("inf")
+    for i in range(max(1, iterations)):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+        if i == 0:
+            result = out
+    return best * 1000, result
+
+
+def _report(
+    name: str, old: Callable[[], Any], new: Callable[[], Any], iterations: int, records: Optional[int] = None
+) -> bool:
+    old_ms, old_out = _time(old, iterations)
+    new_ms, new_out = _time(new, iterations)
+    ok = _same(old_out, new_out)
+    print(
+        f"{name:<28}{len(new_out) if records is None else records:>9}{old_ms:>12.1f}{new_ms:>12.1f}{old_ms / max(new_ms, 1e-9):>9.1f}x"
+        f"  {'ok' if ok else 'MISMATCH'}"
+    )
+    return ok
+
+
+def bench_history(scale: int, iterations: int) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        rows = _build_history_copy(root / "hist", scale)
+        print(f"[bench] history copy: {rows} rows x{scale}", file=sys.stderr)
+        els.HIST_DIR, els.HIST_CACHE = root / "hist", root / "partials.pkl"
+        new_records = els._history_records
+        captured: Dict[str, pd.DataFrame] = {}
+
+        def capture(agg: pd.DataFrame) -> List[Dict[str, Any]]:
+            captured["agg"] = agg
+            return new_records(agg)
+
+        els._history_records = capture
+        try:
+            els.load_vct_history(min_maps_equiv=0, limit=10**9)
+        finally:
+            els._history_records = new_records
+        agg = captured["agg"]
+        return _report(
+            "export.history_records",
+            lambda: _history_records_iterrows(agg),
+            lambda: els._history_records(agg),
+            iterations,
+        )
+
+
+def bench_feature_cache(scale: int, iterations: int) -> bool:
+    try:
+        import odds_setter
+    except ImportError as e:
+        print(f"[bench] skipping odds_setter ({e})", file=sys.stderr)
+        return True
+    df = _scaled(pd.read_csv(FEATURES_CSV), scale)
+    cols = [c for c in df.columns if c not in ("player", "team", "agents", "tournament", "stage", "match_type", "map")]
+    cols.append("missing_feature")
+    for c in cols:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    print(f"[bench] feature copy: {len(df)} rows x{scale}", file=sys.stderr)
+    return _report(
+        "odds.feature_cache",
+        lambda: list(_feature_cache_iterrows(df, cols).items()),
+        lambda: list(odds_setter.feature_cache_from_frame(df, cols).items()),
+        iterations,
+    )
+
+
+def _engineer_input(scale: int) -> pd.DataFrame:
+    import preprocess_data as pp
+
+    if any(pp.DATA_DIR.rglob("players_stats.csv")):
+        return pp.normalize_player_stats(pp.load_all_player_stats())
+    df = _scaled(pd.read_csv(FEATURES_CSV), scale)
+    parts = df["clutches_won_played"].astype(str).str.split("/", n=1, expand=True)
+    df["clutches_won"] = pd.to_numeric(parts[0], errors="coerce")
+    df["clutches_played"] = pd.to_numeric(parts[1], errors="coerce")
+    return df
+
+
+def bench_engineer(scale: int, iterations: int) -> bool:
+    import preprocess_data as pp
+
+    base = _engineer_input(scale)
+    cols = list(pp.ENGINEERED_FEATURES)
+    print(f"[bench] engineer input: {len(base)} rows", file=sys.stderr)
+
+    def run(fn: Callable[[pd.DataFrame], pd.DataFrame]) -> Callable[[], List[List[float]]]:
+        return lambda: [fn(base.copy())[c].astype(float).tolist() for c in cols]
+
+    return _report(
+        "preprocess.engineer_features",
+        run(_engineer_features_apply),
+        run(pp.engineer_features),
+        iterations,
+        records=len(base),
+    )
+
+
+CASES: Dict[str, Callable[[int, int], bool]] = {
+    "history": bench_history,
+    "feature_cache": bench_feature_cache,
+    "engineer": bench_engineer,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--scale", type=int, default=100, help="Copies of the input data")
+    p.add_argument("--iterations", type=int, default=3)
+    p.add_argument("--only", default=None, help="Substring filter on case names")
+    args = p.parse_args(argv)
+
+    print(f"{'case':<28}{'records':>9}{'per-row ms':>12}{'vector ms':>12}{'speedup':>10}  check")
+    ok = True
+    for name, bench in CASES.items():
+        if args.only and args.only not in name:
+            continue
+        ok = bench(args.scale, args.iterations) and ok
+    if not ok:
+        print("[bench] FAIL column-wise builders disagree with the per-row reference", file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,158 @@
+"""
+Offline parser benchmarks for vlr_scraper / bp_scraper.
+
+Runs every parse function over the saved pages in fixtures/, checks the
+extracted records against fixtures/expected.json and reports p50/p95 time
+per page plus peak traced allocations. No network access is needed.
+
+Usage:
+  python packages/api/ml/bench_scrapers.py                      # check + time
+  python packages/api/ml/bench_scrapers.py --iterations 50 --json out.json
+  python packages/api/ml/bench_scrapers.py --baseline out.json  # fail on >25% p50 regressions
+  python packages/api/ml/bench_scrapers.py --update             # re-record expected.json after an intended parser change
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ML_DIR = Path(__file__).resolve().parent
+FIXTURES = ML_DIR / "fixtures"
+EXPECTED = FIXTURES / "expected.json"
+
+if str(ML_DIR) not in sys.path:
+    sys.path.insert(0, str(ML_DIR))
+
+import bp_scraper  # noqa: E402
+import vlr_scraper  # noqa: E402
+
+# Upcoming-match ETAs are relative; pin "now" so results are reproducible.
+FIXED_NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class Case:
+    name: str
+    fixture: str
+    parse: Callable[[str], Any]
+
+
+CASES: List[Case] = [
+    Case("vlr.stats_page", "vlr/stats.html", lambda t: list(vlr_scraper.parse_stats_page(t))),
+    Case("vlr.upcoming_matches", "vlr/matches.html", lambda t: vlr_scraper.parse_upcoming_matches(t, FIXED_NOW)),
+    Case("vlr.results_page", "vlr/results.html", vlr_scraper.parse_results_page),
+    Case("vlr.match_map_stats", "vlr/match.html", lambda t: vlr_scraper.parse_match_map_stats(t, "399950")),
+    Case("vlr.match_players", "vlr/match.html", vlr_scraper.parse_match_players),
+    Case("vlr.player_stats", "vlr/player.html", vlr_scraper.parse_player_stats),
+    Case("vlr.search_results", "vlr/search.html", vlr_scraper.parse_search_results),
+    Case("bp.current_season", "bp/stats.html", bp_scraper.parse_current_season_id),
+    Case("bp.next_data", "bp/stats.html", lambda t: sorted(bp_scraper.extract_next_data(t)["props"]["pageProps"])),
+    Case("bp.chunk_urls", "bp/stats.html", bp_scraper.parse_chunk_urls),
+    Case("bp.trpc_rows", "bp/trpc_aggregated.json", lambda t: bp_scraper.parse_trpc_rows(json.loads(t))),
+    Case("bp.anon_key", "bp/chunk.js", bp_scraper._extract_supabase_anon_key),
+]
+
+
+def _summary(result: Any) -> Dict[str, Any]:
+    """Compact, JSON-comparable fingerprint of a parse result."""
+    result = json.loads(json.dumps(result, default=str))
+    if isinstance(result, list):
+        return {
+            "count": len(result),
+            "first": result[0] if result else None,
+            "last": result[-1] if result else None,
+        }
+    return {"value": result}
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def run_case(case: Case, iterations: int) -> Dict[str, Any]:
+    text = (FIXTURES / case.fixture).read_text(encoding="utf-8")
+    result = case.parse(text)  # warm-up (imports, regex caches)
+
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        case.parse(text)
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    case.parse(text)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "case": case.name,
+        "fixture": case.fixture,
+        "bytes": len(text.encode("utf-8")),
+        "p50_ms": round(_percentile(samples, 50), 3),
+        "p95_ms": round(_percentile(samples, 95), 3),
+        "peak_alloc_kib": round(peak / 1024, 1),
+        "summary": _summary(result),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--iterations", type=int, default=20)
+    p.add_argument("--only", default=None, help="Substring filter on case names")
+    p.add_argument("--json", default=None, help="Write results to this path")
+    p.add_argument("--baseline", default=None, help="Previous --json output to compare p50 against")
+    p.add_argument("--max-regress", type=float, default=0.25, help="Allowed p50 slowdown vs baseline (fraction)")
+    p.add_argument("--update", action="store_true", help="Rewrite expected.json from current output")
+    args = p.parse_args(argv)
+
+    expected = json.loads(EXPECTED.read_text(encoding="utf-8")) if EXPECTED.exists() else {}
+    baseline: Dict[str, Any] = {}
+    if args.baseline:
+        baseline = {r["case"]: r for r in json.loads(Path(args.baseline).read_text(encoding="utf-8"))}
+
+    failures: List[str] = []
+    results = []
+    print(f"{'case':<24}{'KiB':>8}{'p50 ms':>10}{'p95 ms':>10}{'peak KiB':>10}  check")
+    for case in CASES:
+        if args.only and args.only not in case.name:
+            continue
+        r = run_case(case, args.iterations)
+        results.append(r)
+        status = "ok"
+        if args.update:
+            expected[case.name] = r["summary"]
+            status = "updated"
+        elif expected.get(case.name) != r["summary"]:
+            status = "MISMATCH"
+            failures.append(f"{case.name}: extracted records differ from expected.json")
+        base = baseline.get(case.name)
+        if base and base["p50_ms"] > 0 and r["p50_ms"] > base["p50_ms"] * (1 + args.max_regress):
+            status += f" SLOWER({base['p50_ms']}ms)"
+            failures.append(f"{case.name}: p50 {r['p50_ms']}ms vs baseline {base['p50_ms']}ms")
+        print(
+            f"{case.name:<24}{r['bytes'] / 1024:>8.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+            f"{r['peak_alloc_kib']:>10.1f}  {status}"
+        )
+
+    if args.update:
+        EXPECTED.write_text(json.dumps(expected, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+    for f in failures:
+        print(f"[bench] FAIL {f}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,81 +2,223 @@
 
 Uses the public Next.js tRPC endpoint plus the public Supabase anon key
 (already embedded in BP's client bundle) for player/team metadata.
+
+  python packages/api/ml/bp_scraper.py             # current-season leaderboard
+  python packages/api/ml/bp_scraper.py --backfill  # every season -> data/cod_seasons/
 """
 
 from __future__ import annotations
 
+import argparse
+import hashlib
+import io
 import json
+import os
 import re
 import sys
 import urllib.parse
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from http_util import DEFAULT_UA, get, session
+from cache_util import CACHE_DIR, DAY, ML_DIR, age_seconds, atomic_write_bytes, load_json, now_iso, write_json
+from http_util import DEFAULT_UA, HTTPStatusError, get, session, submit
 
 BP_ORIGIN = "https://www.breakingpoint.gg"
 SUPABASE_URL = "https://dfpiiufxcciujugzjvgx.supabase.co"
 TRPC_PROC = "playerStats.getAggregatedOrderedPlayerStats"
 
+ANON_KEY_CACHE = CACHE_DIR / "bp_anon_key.json"
+MAX_KEY_CHUNKS = 40
+KEY_SCAN_WORKERS = 8
+
+# Team names and headshots barely change; cache per player id.
+META_CACHE = CACHE_DIR / "bp_player_meta.json"
+META_TTL = 7 * DAY
+META_BATCH = 80
+META_WORKERS = 4
+
+# Multi-season backfill: one partition per season plus a manifest of content hashes.
+COD_DATASET_DIR = Path(os.getenv("COD_DATASET_DIR") or ML_DIR / "data" / "cod_seasons")
+SEASON_WORKERS = 4
+
 
 def _extract_supabase_anon_key(html_or_js: str) -> Optional[str]:
     keys = re.findall(r"eyJ[a-zA-Z0-9_-]+\.[a-zA-Z0-9_-]+\.[a-zA-Z0-9_-]+", html_or_js)
     return keys[0] if keys else None
 
 
-def _discover_anon_key(sess) -> Optional[str]:
-    """Pull the public anon JWT from BP's frontend chunk (same key every visitor gets)."""
+def parse_chunk_urls(html: str) -> List[str]:
+    """Unique /_next/static/chunks/*.js paths referenced by a page, in page order."""
+    seen: Dict[str, None] = {}
+    for path in re.findall(r"/_next/static/chunks/[a-f0-9]+\.js", html):
+        seen.setdefault(path, None)
+    return list(seen)
+
+
+_NEXT_DATA_MARKER = '<script id="__NEXT_DATA__"'
+
+
+def extract_next_data(html: str) -> Optional[Dict[str, Any]]:
+    """Parse the __NEXT_DATA__ JSON blob (plain substring search, no page-wide regex)."""
+    start = html.find(_NEXT_DATA_MARKER)
+    if start < 0:
+        return None
+    body = html.find(">", start) + 1
+    end = html.find("</script>", body)
+    if body <= 0 or end < 0:
+        return None
+    return json.loads(html[body:end])
+
+
+class BPPage:
+    """
+    BP's /stats page, fetched once and shared by every consumer.
+
+    __NEXT_DATA__ is parsed on first use; seasons, chunk URLs and any stats
+    embedded in pageProps are derived from that single parse.
+    """
+
+    def __init__(self, html: str):
+        self.html = html
+        self._next_data: Optional[Dict[str, Any]] = None
+        self._parsed = False
+        self._chunk_urls: Optional[List[str]] = None
+
+    @classmethod
+    def fetch(cls, sess) -> "BPPage":
+        return cls(get(f"{BP_ORIGIN}/stats", sess=sess, timeout=30).text)
+
+    @property
+    def next_data(self) -> Dict[str, Any]:
+        if not self._parsed:
+            self._next_data = extract_next_data(self.html)
+            self._parsed = True
+        return self._next_data or {}
+
+    @property
+    def page_props(self) -> Dict[str, Any]:
+        return (self.next_data.get("props") or {}).get("pageProps") or {}
+
+    @property
+    def seasons(self) -> List[Dict[str, Any]]:
+        return self.page_props.get("allSeasons") or []
+
+    @property
+    def current_season_id(self) -> int:
+        """Highest season id on the page (2026 if none listed)."""
+        ids = [s.get("id") or 0 for s in self.seasons]
+        return int(max(ids)) if ids else 2026
+
+    @property
+    def chunk_urls(self) -> List[str]:
+        if self._chunk_urls is None:
+            self._chunk_urls = parse_chunk_urls(self.html)
+        return self._chunk_urls
+
+    @property
+    def embedded_stats(self) -> List[Dict[str, Any]]:
+        """Player stat rows server-rendered into pageProps, if this build embeds any."""
+        for key in ("stats", "playerStats", "aggregatedStats"):
+            rows = self.page_props.get(key)
+            if isinstance(rows, list):
+                return rows
+        return []
+
+
+def _probe_anon_key(sess, anon_key: str) -> Optional[bool]:
+    """One cheap Supabase read: True = key works, False = rejected, None = couldn't tell."""
+    url = f"{SUPABASE_URL}/rest/v1/teams?select=id&limit=1"
     try:
-        page = get(f"{BP_ORIGIN}/stats", sess=sess, timeout=30)
-        # Prefer the known chunk that embeds the key; fall back to scanning page scripts.
-        chunk_urls = re.findall(r"/_next/static/chunks/[a-f0-9]+\.js", page.text)
-        candidates = []
-        for path in chunk_urls:
-            if path not in candidates:
-                candidates.append(path)
-        # Also try a few high-signal chunks first by fetching buildManifest is overkill —
-        # scan until we find a JWT.
-        for path in candidates[:40]:
-            try:
-                js = get(f"{BP_ORIGIN}{path}", sess=sess, timeout=20).text
-            except Exception:
-                continue
-            key = _extract_supabase_anon_key(js)
-            if key and len(key) > 100:
+        get(url, sess=sess, headers=_supabase_headers(anon_key), timeout=10, retries=1)
+    except HTTPStatusError as e:
+        if e.status in (401, 403):
+            return False
+        print(f"[bp] anon key probe failed: {e}", file=sys.stderr)
+        return None
+    except Exception as e:
+        print(f"[bp] anon key probe failed: {e}", file=sys.stderr)
+        return None
+    return True
+
+
+def _chunk_anon_key(sess, path: str) -> Optional[str]:
+    try:
+        js = get(f"{BP_ORIGIN}{path}", sess=sess, timeout=20).text
+    except Exception:
+        return None
+    key = _extract_supabase_anon_key(js)
+    return key if key and len(key) > 100 else None
+
+
+def _scan_for_anon_key(sess, page: Optional[BPPage] = None) -> Optional[str]:
+    """Fetch the page's chunks concurrently; return the first JWT the probe doesn't reject."""
+    page = page or BPPage.fetch(sess)
+    paths = page.chunk_urls[:MAX_KEY_CHUNKS]
+    pool = ThreadPoolExecutor(max_workers=KEY_SCAN_WORKERS, thread_name_prefix="bp-chunks")
+    try:
+        futures = [submit(pool, _chunk_anon_key, sess, path) for path in paths]
+        for fut in as_completed(futures):
+            key = fut.result()
+            if key and _probe_anon_key(sess, key) is not False:
                 return key
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return None
+
+
+def _discover_anon_key(sess, page: Optional[BPPage] = None) -> Optional[str]:
+    """
+    Public anon JWT from BP's frontend chunk (same key every visitor gets).
+
+    The last good key is persisted and revalidated with a single Supabase
+    probe; chunks are only rescanned when the probe rejects it.
+    """
+    cached = load_json(ANON_KEY_CACHE, {}) or {}
+    key = cached.get("key")
+    if key:
+        ok = _probe_anon_key(sess, key)
+        if ok is not False:
+            if ok:
+                write_json(ANON_KEY_CACHE, {**cached, "validatedAt": now_iso()})
+            return key
+        print("[bp] cached anon key rejected — rescanning chunks", file=sys.stderr)
+    try:
+        key = _scan_for_anon_key(sess, page)
     except Exception as e:
         print(f"[bp] anon key discovery failed: {e}", file=sys.stderr)
-    return None
+        return None
+    if key:
+        stamp = now_iso()
+        write_json(ANON_KEY_CACHE, {"key": key, "discoveredAt": stamp, "validatedAt": stamp})
+    return key
+
+
+def parse_current_season_id(html: str) -> int:
+    """Latest season id from the /stats page's __NEXT_DATA__ (2026 if absent)."""
+    return BPPage(html).current_season_id
 
 
-def _current_season_id(sess) -> int:
+def _current_season_id(sess, page: Optional[BPPage] = None) -> int:
     try:
-        page = get(f"{BP_ORIGIN}/stats", sess=sess, timeout=30)
-        m = re.search(
-            r'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>', page.text, re.S
-        )
-        if not m:
-            return 2026
-        data = json.loads(m.group(1))
-        seasons = data["props"]["pageProps"].get("allSeasons") or []
-        if not seasons:
-            return 2026
-        # Prefer highest year / id.
-        seasons = sorted(seasons, key=lambda s: s.get("id") or 0, reverse=True)
-        return int(seasons[0]["id"])
+        return (page or BPPage.fetch(sess)).current_season_id
     except Exception as e:
         print(f"[bp] season detect failed, defaulting 2026: {e}", file=sys.stderr)
         return 2026
 
 
+def parse_trpc_rows(body: Any) -> List[Dict[str, Any]]:
+    """Unwrap a tRPC (superjson) response body into its row list."""
+    rows = (body or {}).get("result", {}).get("data", {}).get("json") or []
+    return rows if isinstance(rows, list) else []
+
+
 def _trpc_aggregated(sess, season_id: int) -> List[Dict[str, Any]]:
     payload = {"json": {"seasonId": season_id}}
     q = urllib.parse.quote(json.dumps(payload, separators=(",", ":")))
     url = f"{BP_ORIGIN}/api/trpc/{TRPC_PROC}?input={q}"
     resp = get(url, sess=sess, timeout=45)
-    body = resp.json()
-    rows = body.get("result", {}).get("data", {}).get("json") or []
-    return rows if isinstance(rows, list) else []
+    return parse_trpc_rows(resp.json())
 
 
 def _supabase_headers(anon_key: str) -> Dict[str, str]:
@@ -88,45 +230,150 @@ def _supabase_headers(anon_key: str) -> Dict[str, str]:
     }
 
 
-def _fetch_player_meta(sess, anon_key: str, player_ids: List[int]) -> Dict[int, Dict]:
-    """id -> {tag, current_team_id, headshot}"""
+def _run_batches(fn, ids: List[int]) -> List[Tuple[List[int], Any]]:
+    """Run ``fn(batch)`` over META_BATCH-sized id slices concurrently; (batch, result) in batch order."""
+    batches = [ids[i : i + META_BATCH] for i in range(0, len(ids), META_BATCH)]
+    if len(batches) <= 1:
+        return [(b, fn(b)) for b in batches]
+    pool = ThreadPoolExecutor(max_workers=min(META_WORKERS, len(batches)), thread_name_prefix="bp-meta")
+    try:
+        futures = [submit(pool, fn, b) for b in batches]
+        return [(b, fut.result()) for b, fut in zip(batches, futures)]
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _fetch_player_meta(sess, anon_key: str, player_ids: List[int]) -> Tuple[Dict[int, Dict], Set[int]]:
+    """id -> {tag, current_team_id, headshot}, plus the ids whose batch failed."""
     out: Dict[int, Dict] = {}
+    failed: Set[int] = set()
     if not player_ids:
-        return out
+        return out, failed
     # Supabase REST caps URL length; batch.
     headers = _supabase_headers(anon_key)
-    for i in range(0, len(player_ids), 80):
-        batch = player_ids[i : i + 80]
+
+    def batch_rows(batch: List[int]) -> Optional[List[Dict]]:
         ids = ",".join(str(x) for x in batch)
         url = (
             f"{SUPABASE_URL}/rest/v1/players"
             f"?select=id,tag,current_team_id,headshot&id=in.({ids})"
         )
         try:
-            resp = get(url, sess=sess, headers=headers, timeout=30)
-            for row in resp.json():
-                out[int(row["id"])] = row
+            return get(url, sess=sess, headers=headers, timeout=30).json()
         except Exception as e:
             print(f"[bp] players meta batch failed: {e}", file=sys.stderr)
-    return out
+            return None
 
+    for batch, rows in _run_batches(batch_rows, player_ids):
+        if rows is None:
+            failed.update(batch)
+            continue
+        for row in rows:
+            out[int(row["id"])] = row
+    return out, failed
 
-def _fetch_teams(sess, anon_key: str, team_ids: List[int]) -> Dict[int, str]:
+
+def _fetch_teams(sess, anon_key: str, team_ids: List[int]) -> Tuple[Dict[int, str], Set[int]]:
+    """team id -> name, plus the team ids whose batch failed."""
     out: Dict[int, str] = {}
+    failed: Set[int] = set()
     if not team_ids:
-        return out
+        return out, failed
     headers = _supabase_headers(anon_key)
-    for i in range(0, len(team_ids), 80):
-        batch = team_ids[i : i + 80]
+
+    def batch_rows(batch: List[int]) -> Optional[List[Dict]]:
         ids = ",".join(str(x) for x in batch)
         url = f"{SUPABASE_URL}/rest/v1/teams?select=id,name&id=in.({ids})"
         try:
-            resp = get(url, sess=sess, headers=headers, timeout=30)
-            for row in resp.json():
-                out[int(row["id"])] = row.get("name") or "CDL"
+            return get(url, sess=sess, headers=headers, timeout=30).json()
         except Exception as e:
             print(f"[bp] teams batch failed: {e}", file=sys.stderr)
-    return out
+            return None
+
+    for batch, rows in _run_batches(batch_rows, team_ids):
+        if rows is None:
+            failed.update(batch)
+            continue
+        for row in rows:
+            out[int(row["id"])] = row.get("name") or "CDL"
+    return out, failed
+
+
+def _fetch_meta_embedded(sess, anon_key: str, player_ids: List[int]) -> Tuple[Dict[int, Dict], Set[int]]:
+    """
+    Players with their current team in one PostgREST select per batch, plus
+    the ids whose batch failed.
+
+    Raises HTTPStatusError if PostgREST rejects the embed (no FK to hint on),
+    so the caller can fall back to the two-phase players + teams fetch.
+    """
+    headers = _supabase_headers(anon_key)
+    select = "id,tag,current_team_id,headshot,team:teams!current_team_id(name)"
+
+    def batch_rows(batch: List[int]) -> Optional[List[Dict]]:
+        ids = ",".join(str(x) for x in batch)
+        url = f"{SUPABASE_URL}/rest/v1/players?select={select}&id=in.({ids})"
+        try:
+            return get(url, sess=sess, headers=headers, timeout=30).json()
+        except HTTPStatusError:
+            raise
+        except Exception as e:
+            print(f"[bp] players+teams batch failed: {e}", file=sys.stderr)
+            return None
+
+    out: Dict[int, Dict] = {}
+    failed: Set[int] = set()
+    for batch, rows in _run_batches(batch_rows, player_ids):
+        if rows is None:
+            failed.update(batch)
+            continue
+        for row in rows:
+            team = row.pop("team", None) or {}
+            row["team_name"] = team.get("name") if isinstance(team, dict) else None
+            out[int(row["id"])] = row
+    return out, failed
+
+
+def fetch_player_meta(sess, anon_key: str, player_ids: List[int]) -> Dict[int, Dict]:
+    """
+    id -> {tag, current_team_id, headshot, team_name}, served from a local TTL cache.
+
+    Only ids that are new or older than META_TTL hit Supabase. Ids Supabase
+    doesn't return are cached as empty entries so they aren't re-asked every run;
+    ids whose batch failed are left unstamped so the next run retries them.
+    """
+    cache: Dict[str, Dict] = load_json(META_CACHE, {}) or {}
+    stale = [pid for pid in player_ids if age_seconds((cache.get(str(pid)) or {}).get("fetchedAt")) >= META_TTL]
+    if stale:
+        try:
+            fetched, failed = _fetch_meta_embedded(sess, anon_key, stale)
+        except HTTPStatusError as e:
+            print(f"[bp] embedded select rejected ({e.status}); fetching teams separately", file=sys.stderr)
+            fetched, failed = _fetch_player_meta(sess, anon_key, stale)
+            team_ids = sorted(
+                {int(m["current_team_id"]) for m in fetched.values() if m.get("current_team_id") is not None}
+            )
+            teams, failed_teams = _fetch_teams(sess, anon_key, team_ids)
+            for pid, m in fetched.items():
+                tid = m.get("current_team_id")
+                if tid is not None and int(tid) in failed_teams:
+                    failed.add(pid)
+                m["team_name"] = teams.get(int(tid)) if tid is not None else None
+        stamp = now_iso()
+        got = 0
+        for pid in stale:
+            if pid in failed:
+                # No answer this run: keep any old entry, but don't stamp it so it's retried.
+                continue
+            row = fetched.get(pid)
+            got += row is not None
+            cache[str(pid)] = {**(row or {}), "fetchedAt": stamp}
+        write_json(META_CACHE, cache)
+        print(
+            f"[bp] meta fetched={got} failed={len(failed)} cached={len(player_ids) - len(stale)}",
+            file=sys.stderr,
+        )
+    return {pid: cache[str(pid)] for pid in player_ids if cache.get(str(pid), {}).get("id") is not None}
 
 
 def get_cod_leaderboard(limit: int = 80) -> List[Dict[str, Any]]:
@@ -136,7 +383,13 @@ def get_cod_leaderboard(limit: int = 80) -> List[Dict[str, Any]]:
     """
     sess = session()
     try:
-        season_id = _current_season_id(sess)
+        # One /stats download feeds both season detection and key discovery.
+        page: Optional[BPPage] = None
+        try:
+            page = BPPage.fetch(sess)
+        except Exception as e:
+            print(f"[bp] stats page fetch failed: {e}", file=sys.stderr)
+        season_id = _current_season_id(sess, page) if page else 2026
         rows = _trpc_aggregated(sess, season_id)
         if not rows:
             print("[bp] empty aggregated stats", file=sys.stderr)
@@ -147,19 +400,10 @@ def get_cod_leaderboard(limit: int = 80) -> List[Dict[str, Any]]:
         active = active[:limit]
 
         player_ids = [int(r["player_id"]) for r in active if r.get("player_id") is not None]
-        anon = _discover_anon_key(sess)
+        anon = _discover_anon_key(sess, page)
         meta: Dict[int, Dict] = {}
-        teams: Dict[int, str] = {}
         if anon:
-            meta = _fetch_player_meta(sess, anon, player_ids)
-            team_ids = sorted(
-                {
-                    int(m["current_team_id"])
-                    for m in meta.values()
-                    if m.get("current_team_id") is not None
-                }
-            )
-            teams = _fetch_teams(sess, anon, team_ids)
+            meta = fetch_player_meta(sess, anon, player_ids)
         else:
             print("[bp] no anon key — team/avatar metadata limited", file=sys.stderr)
 
@@ -168,8 +412,7 @@ def get_cod_leaderboard(limit: int = 80) -> List[Dict[str, Any]]:
             pid = int(r["player_id"])
             m = meta.get(pid) or {}
             name = (m.get("tag") or r.get("player_tag") or f"Player{pid}").strip()
-            team_id = m.get("current_team_id")
-            team = teams.get(int(team_id), "CDL") if team_id is not None else "CDL"
+            team = m.get("team_name") or "CDL"
             headshot = m.get("headshot") or ""
             kills = int(r.get("kills") or 0)
             deaths = int(r.get("deaths") or 0)
@@ -201,6 +444,155 @@ def get_cod_leaderboard(limit: int = 80) -> List[Dict[str, Any]]:
         return []
 
 
+def _season_rows(season_id: int, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Flatten aggregated tRPC rows to scalar columns tagged with their season."""
+    out = []
+    for r in rows:
+        if r.get("player_id") is None:
+            continue
+        flat = {k: v for k, v in r.items() if v is None or isinstance(v, (str, int, float, bool))}
+        flat["season_id"] = season_id
+        out.append(flat)
+    out.sort(key=lambda r: int(r["player_id"]))
+    return out
+
+
+def _rows_hash(rows: List[Dict[str, Any]]) -> str:
+    blob = json.dumps(rows, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _write_partition(root: Path, season_id: int, rows: List[Dict[str, Any]]) -> str:
+    """Write one season as Parquet (CSV if no Parquet engine is installed); returns the file name."""
+    import pandas as pd
+
+    df = pd.DataFrame(rows)
+    part_dir = root / f"season_id={season_id}"
+    buf = io.BytesIO()
+    try:
+        df.drop(columns=["season_id"]).to_parquet(buf, index=False)
+        name = "part-0.parquet"
+    except ImportError:
+        buf = io.BytesIO(df.drop(columns=["season_id"]).to_csv(index=False).encode("utf-8"))
+        name = "part-0.csv"
+    atomic_write_bytes(part_dir / name, buf.getvalue())
+    for stale in part_dir.glob("part-0.*"):
+        if stale.name != name:
+            stale.unlink()
+    return name
+
+
+def backfill_seasons(
+    season_ids: Optional[List[int]] = None,
+    *,
+    root: Path = COD_DATASET_DIR,
+    force: bool = False,
+    workers: int = SEASON_WORKERS,
+) -> Dict[str, Any]:
+    """
+    Fetch every season's aggregated player stats concurrently into a
+    ``season_id=<id>/`` partitioned dataset under ``root``.
+
+    Finished seasons already in the manifest are skipped; the current season,
+    any season last fetched while it was still running (``final`` false), and
+    anything passed with ``force`` are refetched, but a partition is only
+    rewritten when the rows' content hash changed.
+    """
+    manifest_path = root / "_manifest.json"
+    manifest: Dict[str, Any] = load_json(manifest_path, {}) or {}
+    seasons: Dict[str, Dict[str, Any]] = manifest.setdefault("seasons", {})
+
+    sess = session()
+    page: Optional[BPPage] = None
+    try:
+        page = BPPage.fetch(sess)
+    except Exception as e:
+        print(f"[bp] stats page fetch failed: {e}", file=sys.stderr)
+    current = page.current_season_id if page else 2026
+    if season_ids is None:
+        season_ids = sorted({int(s["id"]) for s in (page.seasons if page else []) if s.get("id")} | {current})
+
+    todo = [
+        sid
+        for sid in season_ids
+        if force or sid == current or not (seasons.get(str(sid)) or {}).get("final")
+    ]
+    summary: Dict[str, Any] = {"current": current, "skipped": len(season_ids) - len(todo), "written": [], "unchanged": [], "failed": []}
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo))), thread_name_prefix="bp-seasons") as pool:
+            futures = {submit(pool, _trpc_aggregated, sess, sid): sid for sid in todo}
+            for fut in as_completed(futures):
+                sid = futures[fut]
+                try:
+                    rows = _season_rows(sid, fut.result())
+                except Exception as e:
+                    print(f"[bp] season {sid} failed: {e}", file=sys.stderr)
+                    summary["failed"].append(sid)
+                    continue
+                if not rows:
+                    print(f"[bp] season {sid}: no rows", file=sys.stderr)
+                    summary["failed"].append(sid)
+                    continue
+                digest = _rows_hash(rows)
+                entry = seasons.get(str(sid)) or {}
+                stamp = now_iso()
+                if entry.get("hash") == digest and (root / f"season_id={sid}" / entry.get("file", "")).exists():
+                    seasons[str(sid)] = {**entry, "checkedAt": stamp, "final": sid != current}
+                    summary["unchanged"].append(sid)
+                    continue
+                name = _write_partition(root, sid, rows)
+                seasons[str(sid)] = {
+                    "hash": digest,
+                    "rows": len(rows),
+                    "file": name,
+                    "fetchedAt": stamp,
+                    "checkedAt": stamp,
+                    "final": sid != current,
+                }
+                summary["written"].append(sid)
+                print(f"[bp] season {sid}: wrote {len(rows)} rows ({name})", file=sys.stderr)
+    manifest["updatedAt"] = now_iso()
+    write_json(manifest_path, manifest)
+    return summary
+
+
+def load_seasons(root: Path = COD_DATASET_DIR, season_ids: Optional[List[int]] = None):
+    """Read the backfilled dataset into one DataFrame (``season_id`` column restored)."""
+    import pandas as pd
+
+    seasons = (load_json(root / "_manifest.json", {}) or {}).get("seasons") or {}
+    frames = []
+    for sid, entry in sorted(seasons.items(), key=lambda kv: int(kv[0])):
+        if season_ids is not None and int(sid) not in season_ids:
+            continue
+        path = root / f"season_id={sid}" / entry["file"]
+        if not path.exists():
+            continue
+        df = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+        df["season_id"] = int(sid)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--backfill", action="store_true", help="Fetch every season into the partitioned dataset")
+    p.add_argument("--seasons", default=None, help="Comma separated season ids (default: all listed on /stats)")
+    p.add_argument("--force", action="store_true", help="Refetch seasons already in the manifest")
+    p.add_argument("--out", default=None, help=f"Dataset root (default {COD_DATASET_DIR})")
+    args = p.parse_args(argv)
+
+    if not args.backfill:
+        for row in get_cod_leaderboard(10):
+            print(json.dumps(row))
+        return 0
+    ids = [int(x) for x in args.seasons.split(",") if x.strip()] if args.seasons else None
+    summary = backfill_seasons(ids, root=Path(args.out) if args.out else COD_DATASET_DIR, force=args.force)
+    print(json.dumps(summary))
+    return 1 if summary["failed"] and not (summary["written"] or summary["unchanged"]) else 0
+
+
 if __name__ == "__main__":
-    for row in get_cod_leaderboard(10):
-        print(json.dumps(row))
+    raise SystemExit(main())
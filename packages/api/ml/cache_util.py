@@ -0,0 +1,70 @@
+"""Small on-disk cache helpers shared by the scrapers and exporters.
+
+Caches live under ``data/cache/`` (override with ``ML_CACHE_DIR``) and are
+plain JSON written atomically, so a crashed run never leaves a torn file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+ML_DIR = Path(__file__).resolve().parent
+CACHE_DIR = Path(os.getenv("ML_CACHE_DIR") or ML_DIR / "data" / "cache")
+
+DAY = 24 * 3600
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def age_seconds(stamp: Optional[str]) -> float:
+    """Seconds since an ISO-8601 timestamp; +inf if missing or unparseable."""
+    if not stamp:
+        return float("inf")
+    try:
+        dt = datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+    except ValueError:
+        return float("inf")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return time.time() - dt.timestamp()
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write via a temp file in the same directory, then rename over ``path``."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def load_json(path: Path, default: Any = None) -> Any:
+    try:
+        if path.exists():
+            return json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[cache] could not read {path}: {e}", file=sys.stderr)
+    return default
+
+
+def write_json(path: Path, obj: Any) -> None:
+    data = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    atomic_write_bytes(path, data.encode("utf-8"))
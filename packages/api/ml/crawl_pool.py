@@ -0,0 +1,189 @@
+"""
+Bulk fetch + parse: I/O on threads, HTML parsing on a process pool.
+
+BeautifulSoup parsing is CPU-bound and holds the GIL, so a threaded crawl
+tops out at one core once fetching is fast enough. ``fetch_parse`` keeps
+downloads on a thread pool (still admitted by http_util's per-host limiter)
+and ships each raw body to worker processes that run the existing
+vlr_scraper parse functions and return compact records.
+
+Small batches (< MIN_POOL_JOBS) or ``SCRAPER_PARSE_PROCS=1`` parse inline,
+since spinning up processes would cost more than it saves.
+
+The parse pool is created once per process and reused across calls. Its
+workers start from a forkserver (spawn where that's unavailable), never a
+bare fork: callers such as the exporter run fetch_parse on worker threads
+while other threads hold locks (HTTP sessions, rate limiters, logging), and
+a forked child would inherit those locks held.
+"""
+
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    from http_util import get as http_get, session as http_session, submit
+except ImportError:
+    from packages.api.ml.http_util import get as http_get, session as http_session, submit  # type: ignore
+
+DEFAULT_FETCH_WORKERS = 8
+DEFAULT_PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_PROCS") or os.cpu_count() or 1)
+MIN_POOL_JOBS = 4
+
+
+@dataclass(frozen=True)
+class Job:
+    url: str
+    kind: str
+    args: Tuple[Any, ...] = ()
+    key: Any = None
+
+
+def _parsers() -> Dict[str, Callable[..., Any]]:
+    # Imported lazily: vlr_scraper itself uses fetch_parse, and workers only
+    # need the parsers, not the network helpers.
+    try:
+        import vlr_scraper as vlr
+    except ImportError:
+        from packages.api.ml import vlr_scraper as vlr  # type: ignore
+    return {
+        "stats_page": lambda text: list(vlr.parse_stats_page(text)),
+        "results_page": vlr.parse_results_page,
+        "match_map_stats": vlr.parse_match_map_stats,
+        "match_players": vlr.parse_match_players,
+        "player_stats": vlr.parse_player_stats,
+        "player_image": vlr.parse_player_image,
+        "search_results": vlr.parse_search_results,
+    }
+
+
+def run_parser(kind: str, text: str, args: Tuple[Any, ...] = ()) -> Any:
+    """Worker entry point (must stay module-level so it pickles)."""
+    return _parsers()[kind](text, *args)
+
+
+_local = threading.local()
+
+
+def _fetch_text(url: str, timeout: int) -> str:
+    sess = getattr(_local, "session", None)
+    if sess is None:
+        sess = _local.session = http_session()
+    return http_get(url, sess=sess, timeout=timeout).text
+
+
+_POOLS: Dict[int, ProcessPoolExecutor] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _start_method() -> str:
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _parse_pool(procs: int) -> Optional[ProcessPoolExecutor]:
+    """The shared ``procs``-worker parse pool, created on first use (None if processes are unavailable)."""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(procs)
+        if pool is None:
+            try:
+                pool = ProcessPoolExecutor(max_workers=procs, mp_context=multiprocessing.get_context(_start_method()))
+            except (OSError, NotImplementedError, ValueError) as e:
+                print(f"[crawl] process pool unavailable, parsing inline: {e}", file=sys.stderr)
+                return None
+            _POOLS[procs] = pool
+        return pool
+
+
+def _drop_pool(procs: int, pool: ProcessPoolExecutor) -> None:
+    """Forget a broken pool so the next call starts a fresh one."""
+    with _POOLS_LOCK:
+        if _POOLS.get(procs) is pool:
+            del _POOLS[procs]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def fetch_parse(
+    jobs: Iterable[Job],
+    *,
+    fetch_workers: int = DEFAULT_FETCH_WORKERS,
+    parse_workers: Optional[int] = None,
+    timeout: int = 20,
+) -> Iterator[Tuple[Job, Any, Optional[Exception]]]:
+    """
+    Yield ``(job, records, error)`` as each job finishes, in completion order.
+
+    Exactly one of ``records`` / ``error`` is meaningful; fetch and parse
+    failures are reported per job rather than raised.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return
+    procs = DEFAULT_PARSE_WORKERS if parse_workers is None else parse_workers
+    fetchers = ThreadPoolExecutor(max_workers=max(1, min(fetch_workers, len(jobs))), thread_name_prefix="crawl-fetch")
+    parsers = _parse_pool(procs) if procs > 1 and len(jobs) >= MIN_POOL_JOBS else None
+    parsing: Dict[Any, Job] = {}
+    try:
+        fetching = {submit(fetchers, _fetch_text, job.url, timeout): job for job in jobs}
+        pending = set(fetching)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in fetching:
+                    job = fetching.pop(fut)
+                    try:
+                        text = fut.result()
+                    except Exception as e:
+                        yield job, None, e
+                        continue
+                    if parsers is None:
+                        try:
+                            yield job, run_parser(job.kind, text, job.args), None
+                        except Exception as e:
+                            yield job, None, e
+                        continue
+                    try:
+                        pf = parsers.submit(run_parser, job.kind, text, job.args)
+                    except (BrokenProcessPool, RuntimeError) as e:
+                        print(f"[crawl] parse pool unusable, parsing inline: {e}", file=sys.stderr)
+                        _drop_pool(procs, parsers)
+                        parsers = None
+                        try:
+                            yield job, run_parser(job.kind, text, job.args), None
+                        except Exception as e:
+                            yield job, None, e
+                        continue
+                    parsing[pf] = job
+                    pending.add(pf)
+                else:
+                    job = parsing.pop(fut)
+                    try:
+                        yield job, fut.result(), None
+                    except BrokenProcessPool as e:
+                        if parsers is not None:
+                            _drop_pool(procs, parsers)
+                            parsers = None
+                        yield job, None, e
+                    except Exception as e:
+                        yield job, None, e
+    finally:
+        fetchers.shutdown(wait=False, cancel_futures=True)
+        # The pool is shared; just drop this call's queued parses.
+        for pf in parsing:
+            pf.cancel()
@@ -1,144 +1,299 @@
 """
 Export live Chronicle stats from VLR + Breaking Point + VCT historical CSVs.
 
-Writes:
+Writes (minified, atomically, same bytes everywhere):
   packages/api/ml/data/live_stats.json
   packages/web/src/lib/demo/live_stats.json
-  packages/web/public/data/live_stats.json
+  packages/web/public/data/live_stats.json (+ .gz, .br, .sha256)
+plus live_stats.delta.json / live_stats.manifest.json and per-game shards
+(live_stats/index.json + live_stats/<game>/page-NNN.<hash>.json) in the API and
+public dirs.
 
 Usage (from repo root or this directory):
   python packages/api/ml/export_live_stats.py
+  python packages/api/ml/export_live_stats.py --refresh-all   # ignore SOURCE_TTLS
 """
 
 from __future__ import annotations
 
+import gzip
+import hashlib
 import json
+import os
+import pickle
+import queue
 import sys
+import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import pandas as pd
 
+try:
+    import brotli
+except ImportError:  # optional; the .br variant is skipped without it
+    brotli = None
+
 ML_DIR = Path(__file__).resolve().parent
 DATA_DIR = ML_DIR / "data"
 HIST_DIR = DATA_DIR / "Val-historical-stats"
 OUT_API = DATA_DIR / "live_stats.json"
 OUT_WEB_DEMO = ML_DIR.parent.parent / "web" / "src" / "lib" / "demo" / "live_stats.json"
 OUT_WEB_PUBLIC = ML_DIR.parent.parent / "web" / "public" / "data" / "live_stats.json"
+OUT_DELTA = DATA_DIR / "live_stats.delta.json"
+OUT_MANIFEST = DATA_DIR / "live_stats.manifest.json"
+# Per-game, rating-sorted pages + index.json for clients that only need a slice.
+OUT_SHARDS = DATA_DIR / "live_stats"
+OUT_SHARDS_PUBLIC = ML_DIR.parent.parent / "web" / "public" / "data" / "live_stats"
+SHARD_PAGE_SIZE = int(os.getenv("LIVE_STATS_PAGE_SIZE") or 50)
 
 # Ensure local imports work when invoked as a script.
 if str(ML_DIR) not in sys.path:
     sys.path.insert(0, str(ML_DIR))
 
 from bp_scraper import get_cod_leaderboard  # noqa: E402
+from cache_util import CACHE_DIR, age_seconds, atomic_write_bytes, load_json, now_iso, write_json  # noqa: E402
+from http_util import deadline  # noqa: E402
+from image_index import ImageIndex  # noqa: E402
 from vlr_scraper import (  # noqa: E402
+    WATCHLIST_NAMES,
     enrich_image_urls,
-    get_stats_leaderboard,
     get_watchlist_players,
+    iter_stats_leaderboard,
 )
 
+# Per-file partial aggregates for load_vct_history, keyed by path + size + mtime.
+HIST_CACHE = CACHE_DIR / "vct_history_partials.pkl"
+HIST_CACHE_VERSION = 2
+
+# Sources are collected concurrently; each gets a deadline (seconds), capped
+# by the whole export's budget. Late or failed sources reuse the previous
+# export's rows for that source.
+EXPORT_BUDGET = float(os.getenv("EXPORT_BUDGET_S") or 600)
+SOURCE_DEADLINES = {
+    "vct_history": 120.0,
+    "vlr": 300.0,
+    "vlr_watchlist": 420.0,
+    "breakingpoint": 240.0,
+}
+# How long a timed-out source gets to wind down (its requests fail fast past
+# the deadline) before the export carries on without it.
+STRAGGLER_GRACE = 10.0
+
+# Per-source freshness TTLs (seconds). REFRESH_STATE records when each source
+# last refreshed each row; rows younger than their source's TTL are served
+# from the last payload instead of being refetched. The
+# leaderboards come back in one request, so they are refetched as a whole once
+# any row is stale; the watchlist refetches only its stale players. 0 always
+# refetches. Override with EXPORT_SOURCE_TTLS="vlr=1800,vlr_watchlist=0".
+SOURCE_TTLS = {
+    "vct_history": 0.0,
+    "vlr": 3600.0,
+    "vlr_watchlist": 12 * 3600.0,
+    "breakingpoint": 3600.0,
+}
+# {"updatedAt": <payload it belongs to>, "sources": {source: {rowKey: iso}}};
+# kept out of live_stats.json, and ignored if that payload was never published.
+REFRESH_STATE = CACHE_DIR / "live_stats_refresh.json"
+
 
 def _slug(name: str) -> str:
     return "".join(ch.lower() if ch.isalnum() else "-" for ch in name).strip("-")
 
 
-def load_vct_history(min_maps_equiv: int = 20, limit: int = 120) -> List[Dict[str, Any]]:
+_HIST_COLMAP = {
+    "Tournament": "tournament",
+    "Stage": "stage",
+    "Match Type": "match_type",
+    "Player": "player",
+    "Teams": "team",
+    "Rounds Played": "rounds",
+    "Rating": "rating",
+    "Average Combat Score": "acs",
+    "Kills": "kills",
+    "Deaths": "deaths",
+    "Assists": "assists",
+    "Headshot %": "hs",
+}
+_HIST_NEED = ["player", "rounds", "kills", "deaths", "assists", "rating"]
+_HIST_SUMS = ["rounds", "kills", "deaths", "assists"]
+_HIST_MEANS = ["rating", "acs", "hs"]
+
+
+def _history_year(f: Path) -> Optional[int]:
+    year = None
+    for part in f.parts:
+        if part.startswith("vct_"):
+            year = int(part.split("_")[1])
+    return year
+
+
+def _history_partial(f: Path) -> Dict[str, Any]:
     """
-    Aggregate career-style rolls from local VCT players_stats CSVs.
+    One CSV reduced to per-player partial aggregates.
 
-    To avoid double-counting per-agent + series rows, for each
-    (year, tournament, stage, match_type, player) we keep the row with
-    the most rounds played (typically the multi-agent aggregate).
+    Sums for the counting stats, the deduplicated rows' values for the
+    averaged ones (combined with the same pandas mean as before; a
+    sum/count of partials rounds differently), and the team from the
+    player's lowest-rounds row with its rounds as a sort key, so combining
+    partials gives the same result as aggregating every file at once.
     """
-    files = list(HIST_DIR.glob("vct_*/players_stats/players_stats.csv"))
-    if not files:
-        print("[hist] no VCT CSVs found", file=sys.stderr)
-        return []
+    df = pd.read_csv(f)
+    for src, dst in _HIST_COLMAP.items():
+        if src in df.columns and dst not in df.columns:
+            df[dst] = df[src]
+    present = sorted(c for c in [*_HIST_NEED, "acs", "hs", "team"] if c in df.columns)
+    for c in _HIST_NEED + ["acs", "hs", "team"]:
+        if c not in df.columns:
+            df[c] = None
+    for c in ["rounds", "kills", "deaths", "assists", "rating", "acs"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df["hs"] = df["hs"].astype(str).str.replace("%", "", regex=False).pipe(pd.to_numeric, errors="coerce")
+    for k in ["tournament", "stage", "match_type"]:
+        if k not in df.columns:
+            df[k] = ""
 
-    frames = []
+    # Keep max-rounds row per match/player to drop agent duplicates.
+    df = df.sort_values("rounds", ascending=False, kind="stable")
+    df = df.drop_duplicates(subset=["tournament", "stage", "match_type", "player"], keep="first")
+
+    g = df.groupby("player")
+    part = pd.DataFrame({c: g[c].sum() for c in _HIST_SUMS})
+    teams = df[df["team"].notna()].groupby("player").tail(1).set_index("player")
+    part["team"] = teams["team"]
+    # NaN rounds sort last, i.e. "smallest".
+    part["team_key"] = teams["rounds"].fillna(float("-inf"))
+    means = df[["player", *_HIST_MEANS]].reset_index(drop=True)
+    return {"year": _history_year(f), "columns": present, "partial": part, "means": means}
+
+
+def _load_history_partials(files: List[Path]) -> tuple:
+    """Per-file partials, re-reading only CSVs whose size or mtime changed."""
+    cache: Dict[str, Any] = {}
+    try:
+        if HIST_CACHE.exists():
+            cache = pickle.loads(HIST_CACHE.read_bytes())
+            if cache.get("version") != HIST_CACHE_VERSION:
+                cache = {}
+    except Exception as e:
+        print(f"[hist] ignoring unreadable cache {HIST_CACHE}: {e}", file=sys.stderr)
+        cache = {}
+    old = cache.get("files") or {}
+    entries: Dict[str, Any] = {}
+    parsed = 0
     for f in files:
+        key = str(f.resolve())
+        st = f.stat()
+        hit = old.get(key)
+        if hit and hit["size"] == st.st_size and hit["mtime_ns"] == st.st_mtime_ns:
+            entries[key] = hit
+            continue
         try:
-            year = None
-            for part in f.parts:
-                if part.startswith("vct_"):
-                    year = int(part.split("_")[1])
-            df = pd.read_csv(f)
-            df["__year"] = year
-            frames.append(df)
+            entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, **_history_partial(f)}
+            parsed += 1
         except Exception as e:
             print(f"[hist] skip {f}: {e}", file=sys.stderr)
+    if parsed or set(entries) != set(old):
+        try:
+            blob = pickle.dumps({"version": HIST_CACHE_VERSION, "files": entries}, protocol=pickle.HIGHEST_PROTOCOL)
+            atomic_write_bytes(HIST_CACHE, blob)
+        except Exception as e:
+            print(f"[hist] could not write cache: {e}", file=sys.stderr)
+    return [entries[k] for k in sorted(entries)], parsed
 
-    if not frames:
+
+def _nullable(values: pd.Series, mask: pd.Series) -> List[Any]:
+    """Native Python values, with None where ``mask`` is False."""
+    return values.astype(object).where(mask, None).tolist()
+
+
+def _round_half_ties(values: pd.Series, digits: int) -> pd.Series:
+    """
+    Python's ``round`` per value. ``Series.round`` scales by 10**digits first,
+    so exact-looking ties like 1.0775 (stored just below) round the other way.
+    """
+    return pd.Series([round(v, digits) for v in values.astype(float).tolist()], index=values.index, dtype=float)
+
+
+def _history_records(agg: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Aggregated history frame -> DemoStatRow dicts.
+
+    Cleaning, casts and rounding run column-wise; the dicts are zipped from
+    plain lists at the end (``to_dict("records")`` boxes every cell and is
+    most of the cost at this size).
+    """
+    name = agg["player"].astype(str).str.strip()
+    keep = (name != "") & (name.str.lower() != "nan")
+    agg, name = agg[keep], name[keep]
+    n = len(agg)
+    if not n:
         return []
 
-    df = pd.concat(frames, ignore_index=True)
-    # Normalize columns
-    colmap = {
-        "Tournament": "tournament",
-        "Stage": "stage",
-        "Match Type": "match_type",
-        "Player": "player",
-        "Teams": "team",
-        "Rounds Played": "rounds",
-        "Rating": "rating",
-        "Average Combat Score": "acs",
-        "Kills": "kills",
-        "Deaths": "deaths",
-        "Assists": "assists",
-        "Headshot %": "hs",
+    team = agg["team"].astype(str).str.split(",").str[0].str.strip()
+    acs = pd.to_numeric(agg["acs"], errors="coerce").round()
+    hs = _round_half_ties(pd.to_numeric(agg["hs"], errors="coerce"), 1)
+    slug = name.str.replace(r"[\W_]", "-", regex=True).str.lower().str.strip("-")
+    columns = {
+        "playerId": ("val-hist-" + slug).tolist(),
+        "name": name.tolist(),
+        "team": team.mask(team == "", "VCT").tolist(),
+        "game": ["VALORANT"] * n,
+        "imageUrl": [""] * n,
+        "maps": agg["maps"].astype(int).tolist(),
+        "kills": agg["kills"].astype(int).tolist(),
+        "deaths": agg["deaths"].astype(int).tolist(),
+        "assists": agg["assists"].astype(int).tolist(),
+        "rating": _round_half_ties(pd.to_numeric(agg["rating"], errors="coerce"), 3).tolist(),
+        "acs": _nullable(acs.fillna(0).astype(int), acs.notna()),
+        "hsPercent": _nullable(hs, hs.notna()),
+        "source": ["vct_history"] * n,
     }
-    for src, dst in colmap.items():
-        if src in df.columns and dst not in df.columns:
-            df[dst] = df[src]
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
 
-    need = ["player", "rounds", "kills", "deaths", "assists", "rating"]
-    for c in need:
-        if c not in df.columns:
-            print(f"[hist] missing column {c}", file=sys.stderr)
-            return []
 
-    for c in ["rounds", "kills", "deaths", "assists", "rating", "acs"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-
-    if "hs" in df.columns:
-        df["hs"] = (
-            df["hs"]
-            .astype(str)
-            .str.replace("%", "", regex=False)
-            .pipe(pd.to_numeric, errors="coerce")
-        )
+def load_vct_history(min_maps_equiv: int = 20, limit: int = 120) -> List[Dict[str, Any]]:
+    """
+    Aggregate career-style rolls from local VCT players_stats CSVs.
 
-    group_keys = ["__year", "tournament", "stage", "match_type", "player"]
-    for k in group_keys:
-        if k not in df.columns:
-            df[k] = ""
+    To avoid double-counting per-agent + series rows, for each
+    (year, tournament, stage, match_type, player) we keep the row with
+    the most rounds played (typically the multi-agent aggregate).
+    Per-file partial aggregates are cached in data/cache, so unchanged
+    years are not re-read.
+    """
+    files = sorted(HIST_DIR.glob("vct_*/players_stats/players_stats.csv"))
+    if not files:
+        print("[hist] no VCT CSVs found", file=sys.stderr)
+        return []
 
-    # Keep max-rounds row per match/player to drop agent duplicates.
-    df = df.sort_values("rounds", ascending=False)
-    df = df.drop_duplicates(subset=group_keys, keep="first")
-
-    # Career rolls
-    named = {
-        "rounds": ("rounds", "sum"),
-        "kills": ("kills", "sum"),
-        "deaths": ("deaths", "sum"),
-        "assists": ("assists", "sum"),
-        "rating": ("rating", "mean"),
-    }
-    if "acs" in df.columns:
-        named["acs"] = ("acs", "mean")
-    if "hs" in df.columns:
-        named["hs"] = ("hs", "mean")
-    if "team" in df.columns:
-        named["team"] = ("team", "last")
-    agg = df.groupby("player", as_index=False).agg(**named)
-    if "acs" not in agg.columns:
+    entries, parsed = _load_history_partials(files)
+    if not entries:
+        return []
+    columns = set().union(*(e["columns"] for e in entries))
+    for c in _HIST_NEED:
+        if c not in columns:
+            print(f"[hist] missing column {c}", file=sys.stderr)
+            return []
+
+    parts = pd.concat([e["partial"] for e in entries])
+    parts.index.name = "player"
+    parts = parts.reset_index()
+    agg = parts.groupby("player")[_HIST_SUMS].sum()
+    means = pd.concat([e["means"] for e in entries], ignore_index=True)
+    agg = agg.join(means.groupby("player")[_HIST_MEANS].mean())
+    agg["team"] = (
+        parts.sort_values("team_key", ascending=False, kind="stable").groupby("player")["team"].last()
+    )
+    agg = agg.reset_index()
+    if "acs" not in columns:
         agg["acs"] = None
-    if "hs" not in agg.columns:
+    if "hs" not in columns:
         agg["hs"] = None
-    if "team" not in agg.columns:
+    if "team" not in columns:
         agg["team"] = "VCT"
 
     # Approximate maps from rounds (~22/map average)
@@ -146,33 +301,8 @@ def load_vct_history(min_maps_equiv: int = 20, limit: int = 120) -> List[Dict[st
     agg = agg[agg["maps"] >= min_maps_equiv]
     agg = agg.sort_values(["maps", "rating"], ascending=[False, False]).head(limit)
 
-    out: List[Dict[str, Any]] = []
-    for _, r in agg.iterrows():
-        name = str(r["player"]).strip()
-        if not name or name.lower() == "nan":
-            continue
-        team = str(r.get("team") or "").split(",")[0].strip()
-        hs_val = r.get("hs")
-        acs_val = r.get("acs")
-        out.append(
-            {
-                "playerId": f"val-hist-{_slug(name)}",
-                "name": name,
-                "team": team or "VCT",
-                "game": "VALORANT",
-                "imageUrl": "",
-                "maps": int(r["maps"]),
-                "kills": int(r["kills"] or 0),
-                "deaths": int(r["deaths"] or 0),
-                "assists": int(r["assists"] or 0),
-                "rating": round(float(r["rating"] or 0), 3),
-                "acs": int(round(float(acs_val))) if pd.notna(acs_val) and acs_val == acs_val else None,
-                "hsPercent": round(float(hs_val), 1) if pd.notna(hs_val) and hs_val == hs_val else None,
-                "source": "vct_history",
-            }
-        )
-
-    print(f"[hist] career rows={len(out)} from {len(files)} files", file=sys.stderr)
+    out = _history_records(agg)
+    print(f"[hist] career rows={len(out)} from {len(files)} files ({parsed} re-read)", file=sys.stderr)
     return out
 
 
@@ -192,13 +322,17 @@ def _stat_score(p: Dict[str, Any]) -> tuple:
     return (1 if maps > 0 or kills > 0 else 0, maps, priority.get(p.get("source") or "", 0), rating)
 
 
+def _row_key(p: Dict[str, Any]) -> str:
+    return f"{p.get('game')}|{(p.get('name') or '').strip().lower()}"
+
+
 def _merge_players(*groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Merge by lowercase name + game; keep best stats and fill blanks (esp. images)."""
     by_key: Dict[str, Dict[str, Any]] = {}
 
     for group in groups:
         for p in group:
-            key = f"{p.get('game')}|{(p.get('name') or '').strip().lower()}"
+            key = _row_key(p)
             if not p.get("name"):
                 continue
             existing = by_key.get(key)
@@ -230,8 +364,8 @@ def _merge_players(*groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return players
 
 
-def _load_previous_history() -> List[Dict[str, Any]]:
-    """When VCT CSVs aren't in CI, keep prior vct_history rows from the last export."""
+def _load_previous_rows(source: str, tag: str = "export") -> List[Dict[str, Any]]:
+    """Rows of one ``source`` from the last export, used when that source fails or times out."""
     for path in (OUT_API, OUT_WEB_DEMO):
         try:
             if not path.exists():
@@ -240,70 +374,247 @@ def _load_previous_history() -> List[Dict[str, Any]]:
             rows = [
                 p
                 for p in (prev.get("players") or [])
-                if p.get("source") == "vct_history"
-                and (p.get("maps") or 0) > 0
+                if p.get("source") == source
+                and ((p.get("maps") or 0) > 0 or (p.get("kills") or 0) > 0)
             ]
             if rows:
-                print(f"[hist] preserved {len(rows)} rows from {path.name}", file=sys.stderr)
+                print(f"[{tag}] preserved {len(rows)} {source} rows from {path.name}", file=sys.stderr)
                 return rows
         except Exception as e:
-            print(f"[hist] could not read previous export {path}: {e}", file=sys.stderr)
+            print(f"[{tag}] could not read previous export {path}: {e}", file=sys.stderr)
     return []
 
 
-def export(skip_network: bool = False) -> Dict[str, Any]:
-    sources: List[str] = []
-    hist = load_vct_history()
-    if not hist:
-        hist = _load_previous_history()
-    if hist:
-        sources.append("vct_history")
+def _load_previous_history() -> List[Dict[str, Any]]:
+    """When VCT CSVs aren't in CI, keep prior vct_history rows from the last export."""
+    return _load_previous_rows("vct_history", tag="hist")
 
-    vlr_rows: List[Dict[str, Any]] = []
-    watch: List[Dict[str, Any]] = []
-    cod: List[Dict[str, Any]] = []
 
-    if not skip_network:
-        try:
-            vlr_rows = get_stats_leaderboard(timespan="90d", min_rounds=80, limit=80)
-            if vlr_rows:
-                sources.append("vlr")
-                vlr_rows = enrich_image_urls(vlr_rows, max_fetch=20)
-        except Exception as e:
-            print(f"[export] vlr leaderboard failed: {e}", file=sys.stderr)
+def _collect_sources(
+    tasks: Dict[str, Tuple[Callable[[], List[Dict[str, Any]]], float]],
+    budget: float,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run each source on its own thread and wait until it finishes, its
+    deadline passes, or the global budget runs out, whichever is first.
+
+    Each source runs inside an ``http_util.deadline`` scope (carried into its
+    thread pools), so once its time is up every request it makes fails fast
+    with DeadlineExceeded and the source unwinds, shutting its pools down.
+    Timed-out sources get STRAGGLER_GRACE seconds to finish that before this
+    returns, so they aren't still writing to shared state (the image index)
+    afterwards; their rows are discarded either way.
+
+    Returns ``{name: {"status", "rows", "seconds", ["error"]}}`` where status is
+    ok / empty / error / timeout.
+    """
+    started = time.monotonic()
+    done: "queue.Queue[Tuple[str, Optional[List[Dict[str, Any]]], Optional[BaseException], float]]" = queue.Queue()
+    deadlines = {name: started + min(secs, budget) for name, (_fn, secs) in tasks.items()}
 
+    def run(name: str, fn: Callable[[], List[Dict[str, Any]]]) -> None:
+        t0 = time.monotonic()
         try:
-            # Watchlist is for avatars / id enrichment — drop empty stat stubs.
-            watch_raw = get_watchlist_players()
-            watch = []
-            for w in watch_raw:
-                if (w.get("maps") or 0) > 0 or (w.get("kills") or 0) > 0:
-                    watch.append(w)
-                elif w.get("imageUrl"):
-                    watch.append(
-                        {
-                            **w,
-                            # Keep as soft enrichment only; merge fills blanks onto real rows.
-                            "maps": 0,
-                            "kills": 0,
-                            "deaths": 0,
-                            "assists": 0,
-                            "rating": 0.0,
-                        }
-                    )
-            if watch and "vlr" not in sources:
-                sources.append("vlr")
-        except Exception as e:
-            print(f"[export] vlr watchlist failed: {e}", file=sys.stderr)
+            with deadline(deadlines[name]):
+                rows = fn()
+            done.put((name, rows, None, time.monotonic() - t0))
+        except BaseException as e:  # reported, never raised on a worker thread
+            done.put((name, None, e, time.monotonic() - t0))
+
+    threads: Dict[str, threading.Thread] = {}
+    for name, (fn, _secs) in tasks.items():
+        # Daemon only as a last resort for a source stuck outside http_util
+        # (e.g. CPU-bound parsing); normal stragglers are joined below.
+        threads[name] = threading.Thread(target=run, args=(name, fn), name=f"export-{name}", daemon=True)
+        threads[name].start()
+
+    out: Dict[str, Dict[str, Any]] = {}
+    while len(out) < len(tasks):
+        pending = [n for n in tasks if n not in out]
+        try:
+            name, rows, err, secs = done.get(timeout=max(0.0, min(deadlines[n] for n in pending) - time.monotonic()))
+        except queue.Empty:
+            now = time.monotonic()
+            for n in pending:
+                if deadlines[n] <= now:
+                    out[n] = {"status": "timeout", "rows": None, "seconds": round(now - started, 2)}
+                    print(f"[export] {n} missed its {deadlines[n] - started:.0f}s deadline", file=sys.stderr)
+            continue
+        if name in out:
+            continue
+        if time.monotonic() >= deadlines[name]:
+            # Its requests started failing at the deadline, so the rows may be cut short.
+            out[name] = {"status": "timeout", "rows": None, "seconds": round(secs, 2)}
+            print(f"[export] {name} missed its {deadlines[name] - started:.0f}s deadline", file=sys.stderr)
+            continue
+        if err is not None:
+            print(f"[export] {name} failed: {err}", file=sys.stderr)
+            out[name] = {"status": "error", "rows": None, "seconds": round(secs, 2), "error": str(err)[:200]}
+        else:
+            out[name] = {"status": "ok" if rows else "empty", "rows": rows or [], "seconds": round(secs, 2)}
+
+    grace_until = time.monotonic() + STRAGGLER_GRACE
+    for name, thread in threads.items():
+        thread.join(max(0.0, grace_until - time.monotonic()))
+        if thread.is_alive():
+            print(f"[export] {name} still running {STRAGGLER_GRACE:.0f}s past its deadline", file=sys.stderr)
+    return out
 
+
+def _source_ttls() -> Dict[str, float]:
+    ttls = dict(SOURCE_TTLS)
+    for item in (os.getenv("EXPORT_SOURCE_TTLS") or "").split(","):
+        name, _, secs = item.strip().partition("=")
+        if name not in ttls or not secs:
+            continue
         try:
-            cod = get_cod_leaderboard(limit=60)
-            if cod:
-                sources.append("breakingpoint")
-        except Exception as e:
-            print(f"[export] bp failed: {e}", file=sys.stderr)
+            ttls[name] = float(secs)
+        except ValueError:
+            continue
+    return ttls
+
+
+def _load_refresh_state(previous: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    """Per-source ``{rowKey: refreshedAt}`` for the previous payload ({} if they don't match)."""
+    state = load_json(REFRESH_STATE, {}) or {}
+    if not previous.get("updatedAt") or state.get("updatedAt") != previous.get("updatedAt"):
+        return {}
+    return state.get("sources") or {}
+
+
+def _save_refresh_state(updated_at: str, refreshed: Dict[str, Dict[str, str]]) -> None:
+    # Sources with a 0 TTL always refetch, so their stamps would never be read.
+    ttls = _source_ttls()
+    sources = {name: stamps for name, stamps in refreshed.items() if stamps and ttls.get(name, 0) > 0}
+    write_json(REFRESH_STATE, {"updatedAt": updated_at, "sources": sources})
+
+
+def _fresh_stamps(stamps: Dict[str, str], ttl: float) -> Dict[str, str]:
+    """The subset of ``{rowKey: refreshedAt}`` still inside ``ttl``."""
+    if ttl <= 0:
+        return {}
+    return {k: v for k, v in stamps.items() if age_seconds(v) < ttl}
+
+
+def _vlr_leaderboard(images: ImageIndex) -> List[Dict[str, Any]]:
+    # Stream rows so avatar lookups start while the page is still parsing.
+    stream = iter_stats_leaderboard(timespans=("90d",), min_rounds=80, limit=80)
+    rows = enrich_image_urls(stream, max_fetch=20, index=images)
+    print(f"[vlr] leaderboard rows={len(rows)}", file=sys.stderr)
+    return rows
+
+
+def _vlr_watchlist(images: ImageIndex, names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    # Watchlist is for avatars / id enrichment — drop empty stat stubs.
+    watch = []
+    for w in get_watchlist_players(names=names, index=images):
+        if (w.get("maps") or 0) > 0 or (w.get("kills") or 0) > 0:
+            watch.append(w)
+        elif w.get("imageUrl"):
+            watch.append(
+                {
+                    **w,
+                    # Keep as soft enrichment only; merge fills blanks onto real rows.
+                    "maps": 0,
+                    "kills": 0,
+                    "deaths": 0,
+                    "assists": 0,
+                    "rating": 0.0,
+                }
+            )
+    return watch
+
+
+def export(skip_network: bool = False, budget: Optional[float] = None, refresh_all: bool = False) -> Dict[str, Any]:
+    budget = EXPORT_BUDGET if budget is None else budget
+    images = ImageIndex.load()
+    stamp = now_iso()
+    ttls = {n: 0.0 for n in SOURCE_TTLS} if refresh_all else _source_ttls()
+    previous = _read_previous(OUT_API)
+    prev_rows = {_row_key(p): p for p in previous.get("players") or []}
+    prev_stamps = _load_refresh_state(previous)
+
+    # Rows each source refreshed within its TTL, served from the last payload.
+    cached: Dict[str, Dict[str, str]] = {}
+    for name, ttl in ttls.items():
+        old = prev_stamps.get(name) or {}
+        fresh = _fresh_stamps(old, ttl)
+        if name == "vlr_watchlist":
+            cached[name] = fresh
+        elif old and len(fresh) == len(old):
+            cached[name] = fresh
+    watch_key = {n: _row_key({"game": "VALORANT", "name": n}) for n in WATCHLIST_NAMES}
+    stale_watch = [n for n, k in watch_key.items() if k not in cached.get("vlr_watchlist", {})]
+
+    tasks: Dict[str, Tuple[Callable[[], List[Dict[str, Any]]], float]] = {}
+    if "vct_history" not in cached:
+        tasks["vct_history"] = (load_vct_history, SOURCE_DEADLINES["vct_history"])
+    if not skip_network:
+        if "vlr" not in cached:
+            tasks["vlr"] = (lambda: _vlr_leaderboard(images), SOURCE_DEADLINES["vlr"])
+        if stale_watch:
+            tasks["vlr_watchlist"] = (lambda: _vlr_watchlist(images, stale_watch), SOURCE_DEADLINES["vlr_watchlist"])
+        if "breakingpoint" not in cached:
+            tasks["breakingpoint"] = (lambda: get_cod_leaderboard(limit=60), SOURCE_DEADLINES["breakingpoint"])
+    results = _collect_sources(tasks, budget)
+
+    status: Dict[str, Dict[str, Any]] = {}
+    rows: Dict[str, List[Dict[str, Any]]] = {}
+    refreshed: Dict[str, Dict[str, str]] = {}
+    for name in ("vct_history", "vlr", "vlr_watchlist", "breakingpoint"):
+        r = results.get(name)
+        served = {} if skip_network and name != "vct_history" else cached.get(name, {})
+        served_rows = [prev_rows[k] for k in served if k in prev_rows]
+        if r is None:
+            if served:
+                status[name] = {"status": "cached", "rows": len(served_rows)}
+                print(f"[export] {name}: serving {len(served_rows)} fresh rows from the last export", file=sys.stderr)
+            else:
+                status[name] = {"status": "skipped", "rows": 0}
+            rows[name] = served_rows
+            refreshed[name] = dict(served)
+            continue
+        got = r["rows"] or []
+        meta = {k: v for k, v in r.items() if k != "rows"}
+        meta["rows"] = len(got)
+        stamps = {_row_key(p): stamp for p in got}
+        # The watchlist only enriches other rows, so it has nothing to fall back to.
+        if not got and name != "vlr_watchlist":
+            prev = _load_previous_history() if name == "vct_history" else _load_previous_rows(name)
+            if prev:
+                got = prev
+                meta["fallbackRows"] = len(prev)
+                # Keep the old stamps so the next run retries.
+                old = prev_stamps.get(name) or {}
+                stamps = {k: old[k] for k in map(_row_key, prev) if k in old}
+        if served_rows:
+            meta["cachedRows"] = len(served_rows)
+            got = got + served_rows
+        if name == "vlr_watchlist":
+            # Unrefreshed watchlist players keep their old stamp (retried next run).
+            old = prev_stamps.get(name) or {}
+            keep = {k: old[k] for k in watch_key.values() if k in old and k not in stamps}
+            stamps = {**keep, **served, **stamps}
+        status[name] = meta
+        rows[name] = got
+        refreshed[name] = stamps
+
+    hist, vlr_rows, watch, cod = rows["vct_history"], rows["vlr"], rows["vlr_watchlist"], rows["breakingpoint"]
+    sources: List[str] = []
+    if hist:
+        sources.append("vct_history")
+    if vlr_rows or watch:
+        sources.append("vlr")
+    if cod:
+        sources.append("breakingpoint")
+        if results.get("breakingpoint", {}).get("rows"):
+            images.absorb(cod, "breakingpoint")
 
     players = _merge_players(hist, vlr_rows, watch, cod)
+    filled = images.fill(players)
+    if filled:
+        print(f"[export] filled {filled} avatars from image index", file=sys.stderr)
+    images.save()
     # Drop pure avatar stubs that never found a stats twin.
     players = [
         p
@@ -336,27 +647,264 @@ def export(skip_network: bool = False) -> Dict[str, Any]:
     payload = {
         "updatedAt": datetime.now(timezone.utc).isoformat(),
         "sources": sources,
+        "sourceStatus": status,
         "players": clean,
     }
+    _save_refresh_state(payload["updatedAt"], refreshed)
     return payload
 
 
-def write_payload(payload: Dict[str, Any]) -> None:
-    text = json.dumps(payload, indent=2, ensure_ascii=False) + "\n"
-    for path in (OUT_API, OUT_WEB_DEMO, OUT_WEB_PUBLIC):
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(text, encoding="utf-8")
-        print(f"[export] wrote {path} ({len(payload['players'])} players)", file=sys.stderr)
+def _write_if_changed(path: Path, data: bytes) -> bool:
+    """Atomically replace ``path`` with ``data`` unless it already holds exactly that."""
+    try:
+        if path.exists() and path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    atomic_write_bytes(path, data)
+    return True
+
+
+def _publish(src: Path, dest: Path) -> bool:
+    """Hard-link (else copy) ``src`` to a temp name beside ``dest``, then rename over it."""
+    data = src.read_bytes()
+    try:
+        if dest.exists() and dest.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    try:
+        os.link(src, tmp)
+        os.replace(tmp, dest)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        atomic_write_bytes(dest, data)
+    return True
+
+
+def player_hash(row: Dict[str, Any]) -> str:
+    blob = json.dumps(row, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def _content_etag(hashes: Dict[str, str], sources: List[str]) -> str:
+    """ETag over player content only, so a run that changes nothing but updatedAt keeps it."""
+    h = hashlib.sha256(json.dumps([sorted(hashes.items()), sources], separators=(",", ":")).encode("utf-8"))
+    return f'"{h.hexdigest()[:20]}"'
+
+
+def build_delta(prev_players: List[Dict[str, Any]], players: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Added / changed rows and removed playerIds between two player lists (keyed by playerId)."""
+    old = {p["playerId"]: player_hash(p) for p in prev_players if p.get("playerId")}
+    added, changed = [], []
+    seen = set()
+    for p in players:
+        pid = p.get("playerId")
+        if not pid:
+            continue
+        seen.add(pid)
+        if pid not in old:
+            added.append(p)
+        elif old[pid] != player_hash(p):
+            changed.append(p)
+    removed = sorted(pid for pid in old if pid not in seen)
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+def _read_previous(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    except Exception as e:
+        print(f"[export] could not read previous {path.name}: {e}", file=sys.stderr)
+        return {}
+
+
+def write_delta(payload: Dict[str, Any], previous: Dict[str, Any], sha256: str) -> Dict[str, Any]:
+    """
+    Write ``live_stats.delta.json`` (changes since the previous export) and
+    ``live_stats.manifest.json`` (version, ETag, delta summary) next to OUT_API
+    and publish both to the public data dir.
+
+    The version only advances when player content changes. Clients holding
+    ``delta.fromEtag`` apply the delta by playerId (then re-sort by rating);
+    anyone else refetches the full snapshot.
+    """
+    players = payload["players"]
+    hashes = {p["playerId"]: player_hash(p) for p in players if p.get("playerId")}
+    etag = _content_etag(hashes, payload.get("sources") or [])
+    prev_manifest = _read_previous(OUT_MANIFEST)
+    prev_version = int(prev_manifest.get("version") or 0)
+    prev_etag = prev_manifest.get("etag")
+    if not prev_etag and previous.get("players"):
+        prev_hashes = {p["playerId"]: player_hash(p) for p in previous["players"] if p.get("playerId")}
+        prev_etag = _content_etag(prev_hashes, previous.get("sources") or [])
+
+    if prev_etag == etag and prev_manifest:
+        manifest = {**prev_manifest, "sha256": sha256, "checkedAt": payload["updatedAt"]}
+        _write_if_changed(OUT_MANIFEST, json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+        _publish(OUT_MANIFEST, OUT_WEB_PUBLIC.with_name(OUT_MANIFEST.name))
+        print(f"[export] content unchanged (version {prev_version}, etag {etag})", file=sys.stderr)
+        return manifest
+
+    version = prev_version + 1
+    diff = build_delta(previous.get("players") or [], players)
+    delta = {
+        "fromVersion": prev_version or None,
+        "fromEtag": prev_etag,
+        "version": version,
+        "etag": etag,
+        "updatedAt": payload["updatedAt"],
+        "sources": payload.get("sources") or [],
+        **diff,
+    }
+    manifest = {
+        "version": version,
+        "etag": etag,
+        "updatedAt": payload["updatedAt"],
+        "checkedAt": payload["updatedAt"],
+        "count": len(players),
+        "sha256": sha256,
+        "full": OUT_API.name,
+        "delta": {
+            "file": OUT_DELTA.name,
+            "fromVersion": prev_version or None,
+            "fromEtag": prev_etag,
+            "added": len(diff["added"]),
+            "changed": len(diff["changed"]),
+            "removed": len(diff["removed"]),
+        },
+    }
+    _write_if_changed(OUT_DELTA, json.dumps(delta, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    _write_if_changed(OUT_MANIFEST, json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+    for path in (OUT_DELTA, OUT_MANIFEST):
+        _publish(path, OUT_WEB_PUBLIC.with_name(path.name))
+    print(
+        f"[export] version {version} etag {etag}: +{len(diff['added'])} ~{len(diff['changed'])} -{len(diff['removed'])}",
+        file=sys.stderr,
+    )
+    return manifest
+
+
+def _shard_slug(game: str) -> str:
+    return _slug(game or "unknown") or "unknown"
+
+
+def build_shards(payload: Dict[str, Any], page_size: int = SHARD_PAGE_SIZE) -> tuple:
+    """
+    Split players per game (rating-descending) into ``page_size`` pages.
+
+    Returns ``(index, files)`` where ``files`` maps a path relative to the
+    shard root (``valorant/page-001.<hash>.json``) to its bytes. Shard names
+    carry a content hash, so they're immutable and safe to cache forever;
+    ``index.json`` is the only file that changes in place.
+    """
+    by_game: Dict[str, List[Dict[str, Any]]] = {}
+    for p in payload["players"]:
+        by_game.setdefault(p.get("game") or "unknown", []).append(p)
+
+    files: Dict[str, bytes] = {}
+    games: Dict[str, Any] = {}
+    for game, rows in sorted(by_game.items()):
+        rows = sorted(rows, key=lambda r: float(r.get("rating") or 0), reverse=True)
+        pages = max(1, -(-len(rows) // page_size))
+        urls = []
+        for i in range(pages):
+            chunk = rows[i * page_size : (i + 1) * page_size]
+            body = {"game": game, "page": i + 1, "pages": pages, "pageSize": page_size, "total": len(rows), "players": chunk}
+            data = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            name = f"{_shard_slug(game)}/page-{i + 1:03d}.{hashlib.sha256(data).hexdigest()[:10]}.json"
+            files[name] = data
+            urls.append(name)
+        games[game] = {"count": len(rows), "pages": pages, "shards": urls}
+    index = {
+        "updatedAt": payload["updatedAt"],
+        "sources": payload.get("sources") or [],
+        "pageSize": page_size,
+        "count": len(payload["players"]),
+        "games": games,
+    }
+    return index, files
+
+
+def write_shards(payload: Dict[str, Any], manifest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Write shard pages + index.json under OUT_SHARDS and the public mirror; prune superseded pages."""
+    index, files = build_shards(payload)
+    if manifest:
+        index["version"] = manifest.get("version")
+        index["etag"] = manifest.get("etag")
+    index_bytes = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    for root in (OUT_SHARDS, OUT_SHARDS_PUBLIC):
+        # Pages first, index last: a reader never gets an index pointing at missing pages.
+        for rel, data in files.items():
+            _write_if_changed(root / rel, data)
+        _write_if_changed(root / "index.json", index_bytes)
+        for old in root.glob("*/page-*.json"):
+            if old.relative_to(root).as_posix() not in files:
+                old.unlink()
+    print(
+        "[export] shards " + ", ".join(f"{g} {v['count']} rows/{v['pages']} pages" for g, v in index["games"].items()),
+        file=sys.stderr,
+    )
+    return index
+
+
+def write_payload(payload: Dict[str, Any]) -> str:
+    """
+    Serialize once (minified), write OUT_API atomically and publish the same
+    bytes to the web paths. The public copy also gets precompressed
+    ``.gz`` / ``.br`` siblings and a ``.sha256`` content hash, and a delta +
+    manifest against the previous export are written alongside. Returns the hash.
+    """
+    previous = _read_previous(OUT_API)
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+
+    wrote = _write_if_changed(OUT_API, data)
+    for path in (OUT_WEB_DEMO, OUT_WEB_PUBLIC):
+        wrote = _publish(OUT_API, path) or wrote
+
+    # mtime=0 keeps the gzip bytes stable, so unchanged stats don't show up as a diff.
+    variants = {OUT_WEB_PUBLIC.with_name(OUT_WEB_PUBLIC.name + ".gz"): gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants[OUT_WEB_PUBLIC.with_name(OUT_WEB_PUBLIC.name + ".br")] = brotli.compress(data, quality=11)
+    variants[OUT_WEB_PUBLIC.with_name(OUT_WEB_PUBLIC.name + ".sha256")] = f"{digest}  {OUT_WEB_PUBLIC.name}\n".encode()
+    for path, blob in variants.items():
+        _write_if_changed(path, blob)
+
+    sizes = ", ".join(f"{p.suffix or p.name} {len(b) / 1024:.1f} KiB" for p, b in variants.items() if p.suffix != ".sha256")
+    state = "wrote" if wrote else "unchanged"
+    print(
+        f"[export] {state} {len(payload['players'])} players sha256={digest[:12]} "
+        f"json {len(data) / 1024:.1f} KiB, {sizes}",
+        file=sys.stderr,
+    )
+    manifest = write_delta(payload, previous, digest)
+    write_shards(payload, manifest)
+    return digest
 
 
 def main(argv: Optional[List[str]] = None) -> int:
     argv = argv or sys.argv[1:]
     skip = "--offline" in argv
-    payload = export(skip_network=skip)
+    payload = export(skip_network=skip, refresh_all="--refresh-all" in argv)
     if not payload["players"]:
         print("[export] WARNING: no players exported", file=sys.stderr)
     write_payload(payload)
-    print(json.dumps({"updatedAt": payload["updatedAt"], "sources": payload["sources"], "count": len(payload["players"])}))
+    print(
+        json.dumps(
+            {
+                "updatedAt": payload["updatedAt"],
+                "sources": payload["sources"],
+                "sourceStatus": payload["sourceStatus"],
+                "count": len(payload["players"]),
+            }
+        )
+    )
     return 0
 
 
@@ -1,11 +1,62 @@
-"""Shared polite HTTP helpers for scrapers."""
+"""Shared polite HTTP helpers for scrapers.
+
+Every request made through :func:`get` is admitted by a per-host token
+bucket and circuit breaker, so concurrent scrapers share one request budget
+per site instead of each bursting on its own. Rates are configurable per host
+(``HOST_RATES``, :func:`configure_host` or the ``HTTP_RATE_LIMITS`` env var,
+e.g. ``www.vlr.gg=2:4,api.pandascore.co=0.3:10`` as ``rate/s:burst``).
+
+:func:`aget` is the asyncio counterpart with the same retry, breaker and
+rate-limit behaviour (httpx when installed, otherwise requests on worker
+threads); :func:`get_many` fans a list of URLs out on one event loop for
+synchronous callers.
+
+Every attempt is also recorded in per-host / per-route-pattern histograms
+(latency, bytes, retries, status codes): query them with :func:`telemetry`,
+render with :func:`prometheus_text`, or set ``HTTP_TELEMETRY`` to a path
+(``.json`` or ``.prom``, ``-`` for stderr) to dump them when the script exits.
+
+:func:`deadline` scopes a block of work (including tasks handed to thread
+pools via :func:`submit`): once it passes, every get/aget in that context
+raises :class:`DeadlineExceeded` instead of sending, and request timeouts and
+backoff sleeps are capped to the time left.
+
+``HTTP_CASSETTE=record`` saves every response fetched through :func:`session`
+sessions to cassette files under ``HTTP_CASSETTE_DIR``; ``HTTP_CASSETTE=replay``
+serves them back without touching the network (``HTTP_REPLAY_LATENCY`` =
+seconds, or ``recorded`` to replay the original timings).
+"""
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import base64
+import bisect
+import contextlib
+import contextvars
+import email.utils
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
 import time
-from typing import Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    import httpx
+except ImportError:  # optional; AsyncSession falls back to requests on threads
+    httpx = None
 
 DEFAULT_UA = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -14,19 +65,651 @@ DEFAULT_UA = (
 DEFAULT_TIMEOUT = 20
 DEFAULT_RETRIES = 3
 
+# Token bucket defaults: sustained requests/second and burst size per host.
+DEFAULT_RATE = 4.0
+DEFAULT_BURST = 4
+# Exact host or ".suffix" -> (rate, burst). First match wins, exact hosts first.
+HOST_RATES: Dict[str, Tuple[float, int]] = {
+    "www.vlr.gg": (2.0, 4),
+    "www.breakingpoint.gg": (4.0, 8),
+    ".supabase.co": (8.0, 16),
+    # Free PandaScore plans allow ~1000 requests/hour.
+    "api.pandascore.co": (0.3, 10),
+}
 
-def session(user_agent: str = DEFAULT_UA) -> requests.Session:
-    s = requests.Session()
-    s.headers.update(
-        {
-            "User-Agent": user_agent,
-            "Accept": "text/html,application/json,*/*",
-            "Accept-Language": "en-US,en;q=0.9",
+BACKOFF_BASE = 0.6
+BACKOFF_CAP = 20.0
+RETRY_AFTER_CAP = 120.0
+# Statuses worth retrying; any other 4xx fails fast.
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Consecutive failed attempts before a host's breaker opens, and how long it
+# stays open before a single probe request is let through.
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a host's circuit breaker is open and the request was not sent."""
+
+
+class CassetteMiss(RuntimeError):
+    """Replay mode found no recorded response for a request (never retried)."""
+
+
+class DeadlineExceeded(RuntimeError):
+    """The enclosing :func:`deadline` passed before the request could finish (never retried)."""
+
+
+class HTTPStatusError(RuntimeError):
+    """Non-retryable HTTP error response (e.g. 400/401/404); ``status`` holds the code."""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+class TokenBucket:
+    """Thread-safe token bucket. ``reserve`` never sleeps; callers wait it out."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(float(rate), 1e-6)
+        self.burst = max(float(burst), 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """Closed -> open after ``threshold`` straight failures -> half-open after ``cooldown``."""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self) -> None:
+        """Hand back a half-open probe that ended without a verdict (our deadline, a cancel)."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this failure opened the breaker."""
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.threshold):
+                self._opened_at = time.monotonic()
+                self._probing = False
+                return True
+            return False
+
+
+class _HostState:
+    def __init__(self, host: str, rate: float, burst: int):
+        self.host = host
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "throttle_wait_s": 0.0,
+            "retry_after_s": 0.0,
+            "failures": 0,
+            "circuit_opens": 0,
+            "circuit_rejects": 0,
         }
-    )
+
+    def count(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[key] += amount
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for this host (Retry-After applies host-wide)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.counters["retry_after_s"] += seconds
+
+    def admit(self, url: str) -> float:
+        """Check the breaker and take a token; returns seconds to wait before sending."""
+        if not self.breaker.allow():
+            self.count("circuit_rejects")
+            raise CircuitOpenError(f"circuit open for {self.host}: {url}")
+        wait = self.bucket.reserve()
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+            self.counters["requests"] += 1
+            if wait > 0:
+                self.counters["throttled"] += 1
+                self.counters["throttle_wait_s"] += wait
+        return max(wait, 0.0)
+
+    def failed(self) -> None:
+        self.count("failures")
+        if self.breaker.record_failure():
+            self.count("circuit_opens")
+
+
+_HOSTS: Dict[str, _HostState] = {}
+_HOSTS_LOCK = threading.Lock()
+
+
+# Histogram bucket upper bounds (Prometheus ``le``), plus an implicit +Inf.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1024, 10240, 102400, 1048576, 10485760)
+RETRY_BUCKETS = (0, 1, 2, 3, 5)
+
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are estimated as the bucket's upper bound."""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds + (self.max,), self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, running = {}, 0
+        for bound, n in zip(self.bounds, self.counts):
+            running += n
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max,
+            "buckets": cumulative,
+        }
+
+
+class _RouteStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.bytes = Histogram(BYTES_BUCKETS)
+        self.retries = Histogram(RETRY_BUCKETS)
+        self.status: Dict[str, int] = {}
+
+    def merge(self, other: "_RouteStats") -> None:
+        self.latency.merge(other.latency)
+        self.bytes.merge(other.bytes)
+        self.retries.merge(other.retries)
+        for code, n in other.status.items():
+            self.status[code] = self.status.get(code, 0) + n
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "latency_s": self.latency.snapshot(),
+            "bytes": self.bytes.snapshot(),
+            "retries": self.retries.snapshot(),
+            "status": dict(sorted(self.status.items())),
+        }
+
+
+_TELEMETRY: Dict[Tuple[str, str], _RouteStats] = {}
+_TELEMETRY_LOCK = threading.Lock()
+
+_NUMERIC_SEG = re.compile(r"^\d+$")
+_HASH_SEG = re.compile(r"^[0-9a-f]{8,}(\.\w+)?$", re.I)
+
+
+def route_pattern(url: str) -> str:
+    """
+    Collapse a URL path to a low-cardinality route: numeric segments become
+    ``{id}``, the slug after an id becomes ``{slug}``, long hex names become
+    ``{hash}``; the query string is dropped.
+    """
+    out: List[str] = []
+    prev_id = False
+    for seg in urlsplit(url).path.split("/"):
+        if not seg:
+            continue
+        if _NUMERIC_SEG.match(seg):
+            out.append("{id}")
+            prev_id = True
+            continue
+        if prev_id:
+            out.append("{slug}")
+        elif _HASH_SEG.match(seg):
+            out.append("{hash}" + (_HASH_SEG.match(seg).group(1) or ""))
+        else:
+            out.append(seg)
+        prev_id = False
+    return "/" + "/".join(out)
+
+
+def _route_stats(url: str) -> _RouteStats:
+    key = (_host_of(url), route_pattern(url))
+    st = _TELEMETRY.get(key)
+    if st is None:
+        st = _TELEMETRY[key] = _RouteStats()
+    return st
+
+
+def _record_attempt(url: str, seconds: float, resp: Any) -> None:
+    status = str(resp.status_code) if resp is not None else "error"
+    size = len(resp.content or b"") if resp is not None else 0
+    with _TELEMETRY_LOCK:
+        st = _route_stats(url)
+        st.latency.observe(seconds)
+        st.bytes.observe(size)
+        st.status[status] = st.status.get(status, 0) + 1
+
+
+def _record_call(url: str, retries: int) -> None:
+    with _TELEMETRY_LOCK:
+        _route_stats(url).retries.observe(retries)
+
+
+def telemetry(by: str = "route") -> Dict[str, Any]:
+    """
+    Histogram snapshots keyed ``{host: {route: {...}}}`` (``by="route"``)
+    or ``{host: {...}}`` with routes merged (``by="host"``).
+    """
+    with _TELEMETRY_LOCK:
+        items = list(_TELEMETRY.items())
+        if by == "host":
+            merged: Dict[str, _RouteStats] = {}
+            for (host, _route), st in items:
+                merged.setdefault(host, _RouteStats()).merge(st)
+            return {host: st.snapshot() for host, st in sorted(merged.items())}
+        out: Dict[str, Dict[str, Any]] = {}
+        for (host, route), st in sorted(items):
+            out.setdefault(host, {})[route] = st.snapshot()
+        return out
+
+
+def reset_telemetry() -> None:
+    with _TELEMETRY_LOCK:
+        _TELEMETRY.clear()
+
+
+def prometheus_text() -> str:
+    """Telemetry in the Prometheus text exposition format."""
+    lines: List[str] = []
+    with _TELEMETRY_LOCK:
+        items = sorted(_TELEMETRY.items())
+        for metric, attr, help_text in (
+            ("http_client_request_duration_seconds", "latency", "Per-attempt request latency"),
+            ("http_client_response_bytes", "bytes", "Response body size"),
+            ("http_client_retries", "retries", "Retries per get() call"),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (host, route), st in items:
+                h: Histogram = getattr(st, attr)
+                labels = f'host="{host}",route="{route}"'
+                running = 0
+                for bound, n in zip(h.bounds, h.counts):
+                    running += n
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {running}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"{metric}_sum{{{labels}}} {h.sum}")
+                lines.append(f"{metric}_count{{{labels}}} {h.count}")
+        lines.append("# HELP http_client_responses_total Attempts by status code")
+        lines.append("# TYPE http_client_responses_total counter")
+        for (host, route), st in items:
+            for code, n in sorted(st.status.items()):
+                lines.append(f'http_client_responses_total{{host="{host}",route="{route}",status="{code}"}} {n}')
+    return "\n".join(lines) + "\n"
+
+
+def dump_telemetry(path: Optional[str] = None) -> None:
+    """Write telemetry (plus :func:`stats`) to ``path``: ``.prom`` = Prometheus, else JSON; ``-`` = stderr."""
+    path = path or os.getenv("HTTP_TELEMETRY")
+    if not path:
+        return
+    with _TELEMETRY_LOCK:
+        if not _TELEMETRY:
+            return
+    if path.endswith(".prom"):
+        text = prometheus_text()
+    else:
+        text = json.dumps({"routes": telemetry(), "hosts": telemetry("host"), "limits": stats()}, indent=2)
+    if path == "-":
+        print(text, file=sys.stderr)
+        return
+    try:
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    except OSError as e:
+        print(f"[http] could not write telemetry to {path}: {e}", file=sys.stderr)
+
+
+if os.getenv("HTTP_TELEMETRY"):
+    atexit.register(dump_telemetry)
+
+
+def _env_rates() -> Dict[str, Tuple[float, int]]:
+    out: Dict[str, Tuple[float, int]] = {}
+    for item in (os.getenv("HTTP_RATE_LIMITS") or "").split(","):
+        host, _, spec = item.strip().partition("=")
+        if not host or not spec:
+            continue
+        rate, _, burst = spec.partition(":")
+        try:
+            out[host] = (float(rate), int(burst or max(1, round(float(rate)))))
+        except ValueError:
+            continue
+    return out
+
+
+def _rate_for(host: str) -> Tuple[float, int]:
+    table = {**HOST_RATES, **_env_rates()}
+    if host in table:
+        return table[host]
+    for pattern, spec in table.items():
+        if pattern.startswith(".") and host.endswith(pattern):
+            return spec
+    return DEFAULT_RATE, DEFAULT_BURST
+
+
+def _host_of(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def _host_state(url: str) -> _HostState:
+    host = _host_of(url)
+    with _HOSTS_LOCK:
+        state = _HOSTS.get(host)
+        if state is None:
+            state = _HOSTS[host] = _HostState(host, *_rate_for(host))
+        return state
+
+
+def configure_host(host: str, rate: float, burst: Optional[int] = None) -> None:
+    """Set the token-bucket rate (requests/s) and burst for one host."""
+    host = host.lower()
+    burst = burst if burst is not None else max(1, round(rate))
+    HOST_RATES[host] = (rate, burst)
+    with _HOSTS_LOCK:
+        state = _HOSTS.get(host)
+        if state is not None:
+            state.bucket = TokenBucket(rate, burst)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Per-host throttle/retry counters plus current breaker state."""
+    with _HOSTS_LOCK:
+        states = list(_HOSTS.values())
+    out: Dict[str, Dict[str, Any]] = {}
+    for st in states:
+        with st._lock:
+            row: Dict[str, Any] = dict(st.counters)
+        row["throttle_wait_s"] = round(row["throttle_wait_s"], 3)
+        row["retry_after_s"] = round(row["retry_after_s"], 3)
+        row["circuit"] = st.breaker.state
+        out[st.host] = row
+    return out
+
+
+def reset_stats() -> None:
+    """Forget all host state (counters, buckets, breakers)."""
+    with _HOSTS_LOCK:
+        _HOSTS.clear()
+
+
+def throttle(url: str) -> float:
+    """Block until ``url``'s host admits one request; returns seconds waited."""
+    wait = _host_state(url).admit(url)
+    if wait > 0:
+        time.sleep(wait)
+    return wait
+
+
+async def athrottle(url: str) -> float:
+    """asyncio counterpart of :func:`throttle` (awaits instead of blocking)."""
+    wait = _host_state(url).admit(url)
+    if wait > 0:
+        await asyncio.sleep(wait)
+    return wait
+
+
+_DEADLINE: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar("http_deadline", default=None)
+
+
+@contextlib.contextmanager
+def deadline(at: float) -> Iterator[None]:
+    """
+    Fail requests made in this context once ``time.monotonic()`` passes ``at``.
+
+    Nested scopes keep the earlier deadline. Thread pools don't inherit
+    context; submit work with :func:`submit` so workers see the deadline too.
+    """
+    current = _DEADLINE.get()
+    token = _DEADLINE.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current :func:`deadline` (None when there is none)."""
+    at = _DEADLINE.get()
+    return None if at is None else at - time.monotonic()
+
+
+def _check_deadline(url: str, need: float = 0.0) -> Optional[float]:
+    left = time_left()
+    if left is not None and left <= need:
+        raise DeadlineExceeded(f"deadline passed before GET: {url}")
+    return left
+
+
+def _capped(seconds: float, left: Optional[float], spent: float = 0.0) -> float:
+    """``seconds``, capped to what remains of the deadline after ``spent``."""
+    return seconds if left is None else max(0.0, min(seconds, left - spent))
+
+
+def submit(pool: Any, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """``pool.submit`` for thread pools that carries the caller's context (and :func:`deadline`) into the worker."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with equal jitter: half fixed, half random."""
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def retry_after_seconds(resp: Optional[requests.Response]) -> Optional[float]:
+    """Parse a ``Retry-After`` header (delta-seconds or HTTP date)."""
+    if resp is None:
+        return None
+    raw = (resp.headers.get("Retry-After") or "").strip()
+    if not raw:
+        return None
+    try:
+        seconds = float(raw)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(raw)
+        except (TypeError, ValueError):
+            return None
+        seconds = when.timestamp() - time.time()
+    return min(max(seconds, 0.0), RETRY_AFTER_CAP)
+
+
+CASSETTE_DIR = Path(os.getenv("HTTP_CASSETTE_DIR") or Path(__file__).resolve().parent / "data" / "cassettes")
+# Response headers worth keeping; cookies and request headers (tokens) are never written.
+_CASSETTE_HEADERS = {"content-type", "content-encoding", "retry-after", "etag", "last-modified", "location"}
+
+
+def cassette_mode() -> Optional[str]:
+    mode = (os.getenv("HTTP_CASSETTE") or "").strip().lower()
+    return mode if mode in ("record", "replay") else None
+
+
+def cassette_path(method: str, url: str, body: Optional[bytes] = None, root: Optional[Path] = None) -> Path:
+    """Cassette file for one request: ``<dir>/<host>/<sha1 of method, url, body>.json``."""
+    digest = hashlib.sha1(f"{method.upper()} {url}".encode("utf-8"))
+    if body:
+        digest.update(body if isinstance(body, bytes) else str(body).encode("utf-8"))
+    return (root or CASSETTE_DIR) / (_host_of(url) or "_") / f"{digest.hexdigest()[:20]}.json"
+
+
+class CassetteAdapter(HTTPAdapter):
+    """requests transport that records responses to, or replays them from, cassette files."""
+
+    def __init__(self, mode: str, root: Optional[Path] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.mode = mode
+        self.root = root or CASSETTE_DIR
+
+    def send(self, request, **kwargs):
+        path = cassette_path(request.method, request.url, request.body, self.root)
+        if self.mode == "replay":
+            return self._replay(request, path)
+        started = time.perf_counter()
+        resp = super().send(request, **kwargs)
+        content = resp.content
+        try:
+            text, b64 = content.decode("utf-8"), None
+        except UnicodeDecodeError:
+            text, b64 = None, base64.b64encode(content).decode("ascii")
+        record = {
+            "method": request.method,
+            "url": request.url,
+            "status": resp.status_code,
+            "reason": resp.reason,
+            "headers": {k: v for k, v in resp.headers.items() if k.lower() in _CASSETTE_HEADERS},
+            "elapsed": round(time.perf_counter() - started, 4),
+            "text": text,
+            "b64": b64,
+            "recordedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        return resp
+
+    def _replay(self, request, path: Path) -> requests.Response:
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise CassetteMiss(f"no cassette for {request.method} {request.url} ({path})") from None
+        latency = (os.getenv("HTTP_REPLAY_LATENCY") or "0").strip().lower()
+        delay = float(record.get("elapsed") or 0) if latency == "recorded" else float(latency or 0)
+        if delay > 0:
+            time.sleep(delay)
+        resp = requests.Response()
+        resp.status_code = int(record["status"])
+        resp.reason = record.get("reason") or ""
+        resp.headers = CaseInsensitiveDict(record.get("headers") or {})
+        resp._content = (
+            base64.b64decode(record["b64"]) if record.get("b64") is not None else (record.get("text") or "").encode("utf-8")
+        )
+        resp.encoding = get_encoding_from_headers(resp.headers) or "utf-8"
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        return resp
+
+
+def _default_headers(user_agent: str) -> Dict[str, str]:
+    return {
+        "User-Agent": user_agent,
+        "Accept": "text/html,application/json,*/*",
+        "Accept-Language": "en-US,en;q=0.9",
+    }
+
+
+def session(user_agent: str = DEFAULT_UA, pool_maxsize: int = 10) -> requests.Session:
+    s = requests.Session()
+    s.headers.update(_default_headers(user_agent))
+    mode = cassette_mode()
+    if mode:
+        adapter: HTTPAdapter = CassetteAdapter(mode, pool_maxsize=pool_maxsize)
+    elif pool_maxsize != 10:
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+    else:
+        return s
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
     return s
 
 
+def _replayed(url: str, resp: Any, started: float) -> Any:
+    """Raise for a replayed error status the way a final live attempt would, else return ``resp``."""
+    _record_attempt(url, time.perf_counter() - started, resp)
+    _record_call(url, 0)
+    status = resp.status_code
+    if status >= 400:
+        if status not in RETRY_STATUSES:
+            raise HTTPStatusError(f"GET failed with {status}: {url} (replayed)", status)
+        raise RuntimeError(f"GET failed after 1 tries: {url} ({status} replayed)")
+    return resp
+
+
 def get(
     url: str,
     *,
@@ -37,14 +720,218 @@ def get(
     params: Optional[dict] = None,
 ) -> requests.Response:
     s = sess or session()
+    if cassette_mode() == "replay":
+        # Nothing goes on the wire: skip the host's token bucket, breaker and
+        # retries (a retry would replay the same recording anyway).
+        started = time.perf_counter()
+        return _replayed(url, s.get(url, timeout=timeout, headers=headers, params=params), started)
+    state = _host_state(url)
     last_err: Exception | None = None
-    for attempt in range(retries):
+    attempt = 0
+    try:
+        for attempt in range(retries):
+            _check_deadline(url)
+            wait = state.admit(url)
+            # A half-open probe that ends without a verdict (our deadline, a
+            # cassette miss, a cancel) has to be handed back, or the breaker
+            # turns away every later request.
+            probe = state.breaker.state != "closed"
+            settled = False
+            try:
+                left = _check_deadline(url, wait)
+                if wait > 0:
+                    time.sleep(wait)
+                resp: Optional[requests.Response] = None
+                started = time.perf_counter()
+                try:
+                    resp = s.get(url, timeout=_capped(timeout, left, wait), headers=headers, params=params)
+                    resp.raise_for_status()
+                    settled = True
+                    state.breaker.record_success()
+                    return resp
+                except CassetteMiss:
+                    raise
+                except Exception as e:
+                    last_err = e
+                    status = resp.status_code if resp is not None else None
+                    if status is not None and status not in RETRY_STATUSES:
+                        # The host answered; the request itself is bad. Don't retry or trip the breaker.
+                        settled = True
+                        state.breaker.record_success()
+                        raise HTTPStatusError(f"GET failed with {status}: {url} ({e})", status) from e
+                    # Our own deadline cut the request short; that says nothing about the host.
+                    _check_deadline(url)
+                    settled = True
+                    state.failed()
+                    if attempt < retries - 1:
+                        state.count("retries")
+                        delay = retry_after_seconds(resp)
+                        if delay is not None:
+                            state.pause(delay)
+                        else:
+                            time.sleep(_capped(backoff_delay(attempt), time_left()))
+                finally:
+                    _record_attempt(url, time.perf_counter() - started, resp)
+            finally:
+                if probe and not settled:
+                    state.breaker.release()
+        raise RuntimeError(f"GET failed after {retries} tries: {url} ({last_err})")
+    finally:
+        _record_call(url, attempt)
+
+
+class AsyncSession:
+    """
+    Async counterpart of :func:`session`.
+
+    Wraps an ``httpx.AsyncClient`` when httpx is installed (and no cassette
+    mode is active); otherwise each
+    request runs ``requests`` in a worker thread via ``asyncio.to_thread``.
+    Responses expose ``status_code``, ``headers``, ``text`` and ``json()``
+    either way. Use as ``async with AsyncSession() as s: ...``.
+    """
+
+    def __init__(self, user_agent: str = DEFAULT_UA, max_connections: int = 100):
+        self.headers = _default_headers(user_agent)
+        self._client = None
+        self._sess: Optional[requests.Session] = None
+        if httpx is not None and not cassette_mode():
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=max_connections),
+            )
+        else:
+            # Cassette record/replay lives in the requests transport, so it takes this path.
+            self._sess = session(user_agent, pool_maxsize=max_connections)
+
+    async def fetch(self, url: str, *, timeout: float, headers: Optional[dict] = None, params: Optional[dict] = None):
+        """One raw GET (no retries/throttling; see :func:`aget`)."""
+        if self._client is not None:
+            return await self._client.get(url, timeout=timeout, headers=headers, params=params)
+        return await asyncio.to_thread(self._sess.get, url, timeout=timeout, headers=headers, params=params)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        if self._sess is not None:
+            self._sess.close()
+
+    async def __aenter__(self) -> "AsyncSession":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+
+async def aget(
+    url: str,
+    *,
+    sess: Optional[AsyncSession] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    headers: Optional[dict] = None,
+    params: Optional[dict] = None,
+):
+    """:func:`get` for asyncio: same host limiter, breaker, retries and errors, but awaits instead of sleeping."""
+    own = sess is None
+    s = sess or AsyncSession()
+    if cassette_mode() == "replay":
         try:
-            resp = s.get(url, timeout=timeout, headers=headers, params=params)
-            resp.raise_for_status()
-            return resp
-        except Exception as e:
-            last_err = e
-            if attempt < retries - 1:
-                time.sleep(0.6 * (attempt + 1))
-    raise RuntimeError(f"GET failed after {retries} tries: {url} ({last_err})")
+            started = time.perf_counter()
+            return _replayed(url, await s.fetch(url, timeout=timeout, headers=headers, params=params), started)
+        finally:
+            if own:
+                await s.aclose()
+    state = _host_state(url)
+    last_err: Exception | None = None
+    attempt = 0
+    try:
+        for attempt in range(retries):
+            _check_deadline(url)
+            wait = state.admit(url)
+            # A half-open probe that ends without a verdict (our deadline, a
+            # cassette miss, a cancel) has to be handed back, or the breaker
+            # turns away every later request.
+            probe = state.breaker.state != "closed"
+            settled = False
+            try:
+                left = _check_deadline(url, wait)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                resp = None
+                started = time.perf_counter()
+                try:
+                    resp = await s.fetch(url, timeout=_capped(timeout, left, wait), headers=headers, params=params)
+                    if resp.status_code >= 400:
+                        raise RuntimeError(f"{resp.status_code} error for url: {url}")
+                    settled = True
+                    state.breaker.record_success()
+                    return resp
+                except CassetteMiss:
+                    raise
+                except Exception as e:
+                    last_err = e
+                    status = resp.status_code if resp is not None else None
+                    if status is not None and status not in RETRY_STATUSES:
+                        settled = True
+                        state.breaker.record_success()
+                        raise HTTPStatusError(f"GET failed with {status}: {url} ({e})", status) from e
+                    _check_deadline(url)
+                    settled = True
+                    state.failed()
+                    if attempt < retries - 1:
+                        state.count("retries")
+                        delay = retry_after_seconds(resp)
+                        if delay is not None:
+                            state.pause(delay)
+                        else:
+                            await asyncio.sleep(_capped(backoff_delay(attempt), time_left()))
+                finally:
+                    _record_attempt(url, time.perf_counter() - started, resp)
+            finally:
+                if probe and not settled:
+                    state.breaker.release()
+        raise RuntimeError(f"GET failed after {retries} tries: {url} ({last_err})")
+    finally:
+        _record_call(url, attempt)
+        if own:
+            await s.aclose()
+
+
+async def aget_many(
+    urls: Iterable[str],
+    *,
+    sess: Optional[AsyncSession] = None,
+    concurrency: int = 16,
+    **kwargs: Any,
+) -> List[Any]:
+    """
+    :func:`aget` every URL with at most ``concurrency`` in flight.
+
+    Results come back in input order; a failed URL yields its exception
+    instead of raising, so one bad page doesn't cancel the rest.
+    """
+    own = sess is None
+    s = sess or AsyncSession(max_connections=concurrency)
+    gate = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(u: str):
+        async with gate:
+            return await aget(u, sess=s, **kwargs)
+
+    try:
+        return await asyncio.gather(*(one(u) for u in urls), return_exceptions=True)
+    finally:
+        if own:
+            await s.aclose()
+
+
+def get_many(urls: Iterable[str], *, concurrency: int = 16, **kwargs: Any) -> List[Union[Any, Exception]]:
+    """
+    Synchronous wrapper around :func:`aget_many` for non-async callers.
+
+    Runs its own event loop, so call it from plain code, not from inside a
+    coroutine (await :func:`aget_many` there instead).
+    """
+    return asyncio.run(aget_many(list(urls), concurrency=concurrency, **kwargs))
@@ -0,0 +1,121 @@
+"""Persistent player avatar index.
+
+Keyed by canonical player id (``val-{vlr_id}``, ``cod-{bp_id}``), each entry
+stores the image URL, where it came from and when it was last verified:
+
+  {"val-9": {"url": "https://owcdn.net/...", "source": "vlr",
+             "verifiedAt": "2026-01-01T00:00:00+00:00"}}
+
+An empty ``url`` records "profile checked, no avatar" so it isn't refetched
+until the entry expires. Entries are revalidated after ``ttl`` seconds.
+
+Several processes share the file (exporter, scraper, odds setter), so
+:meth:`ImageIndex.save` merges with what is on disk and keeps the most
+recently verified entry per player instead of overwriting it.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    from cache_util import CACHE_DIR, DAY, age_seconds, load_json, now_iso, write_json
+except ImportError:
+    from packages.api.ml.cache_util import CACHE_DIR, DAY, age_seconds, load_json, now_iso, write_json  # type: ignore
+
+IMAGE_INDEX_PATH = Path(os.getenv("PLAYER_IMAGE_INDEX") or CACHE_DIR / "player_images.json")
+DEFAULT_TTL = 30 * DAY
+
+
+def vlr_key(vlr_id: Any) -> str:
+    return f"val-{vlr_id}"
+
+
+class ImageIndex:
+    def __init__(self, path: Path = IMAGE_INDEX_PATH, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path = IMAGE_INDEX_PATH, ttl: float = DEFAULT_TTL) -> "ImageIndex":
+        idx = cls(path, ttl)
+        idx.reload()
+        return idx
+
+    def reload(self) -> None:
+        """Pick up entries other processes verified since this index was loaded."""
+        with self._lock:
+            self._merge_disk()
+
+    def _merge_disk(self) -> None:
+        data = load_json(self.path, {})
+        if not isinstance(data, dict):
+            return
+        for key, entry in data.items():
+            if not isinstance(entry, dict):
+                continue
+            mine = self._entries.get(key)
+            if mine is None or age_seconds(entry.get("verifiedAt")) < age_seconds(mine.get("verifiedAt")):
+                self._entries[key] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, player_id: Optional[str]) -> Optional[str]:
+        """Known image URL for a player (fresh or stale), else None."""
+        entry = self._entries.get(player_id or "")
+        return (entry or {}).get("url") or None
+
+    def is_fresh(self, player_id: Optional[str]) -> bool:
+        """True if the entry was verified within the TTL (even if it has no URL)."""
+        entry = self._entries.get(player_id or "")
+        return bool(entry) and age_seconds(entry.get("verifiedAt")) < self.ttl
+
+    def record(self, player_id: Optional[str], url: Optional[str], source: str) -> None:
+        """Store a freshly verified URL (``""`` = verified absent)."""
+        if not player_id:
+            return
+        with self._lock:
+            self._entries[player_id] = {"url": url or "", "source": source, "verifiedAt": now_iso()}
+            self._dirty = True
+
+    def absorb(self, rows: Iterable[Dict[str, Any]], source: Optional[str] = None) -> None:
+        """Record images already present on stat rows, unless the index holds a fresh copy."""
+        for row in rows:
+            pid = row.get("playerId")
+            url = row.get("imageUrl")
+            if not pid or not url:
+                continue
+            if self.is_fresh(pid) and self.lookup(pid) == url:
+                continue
+            self.record(pid, url, source or row.get("source") or "unknown")
+
+    def fill(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Fill blank ``imageUrl`` fields from the index; returns how many were filled."""
+        filled = 0
+        for row in rows:
+            if row.get("imageUrl"):
+                continue
+            url = self.lookup(row.get("playerId"))
+            if url:
+                row["imageUrl"] = url
+                filled += 1
+        return filled
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                self._merge_disk()
+                write_json(self.path, self._entries)
+                self._dirty = False
+            except Exception as e:
+                print(f"[images] could not write {self.path}: {e}", file=sys.stderr)
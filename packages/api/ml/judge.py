@@ -32,10 +32,13 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Dict, List
 
-import requests
 import psycopg2
 import psycopg2.extras
 from dotenv import load_dotenv
+try:
+    from .http_util import get as http_get, session as http_session
+except ImportError:
+    from http_util import get as http_get, session as http_session
 
 import time
 
@@ -63,11 +66,8 @@ def fetch_recent_completed(token: str, limit: int) -> List[Dict[str, Any]]:
     url = 'https://api.pandascore.co/valorant/matches/past'
     headers = {'Authorization': f'Bearer {token}'}
     params = {'per_page': 100} # Fetch more to filter
-    r = requests.get(url, headers=headers, params=params, timeout=20)
-    if r.status_code != 200:
-        raise RuntimeError(f'PandaScore response {r.status_code}: {r.text[:200]}')
-    
-    data = r.json()
+    # Raises RuntimeError (status in message) after http_util's retries.
+    data = http_get(url, headers=headers, params=params, timeout=20).json()
     # Filter for Tier 1 VCT and Game Changers
     filtered = []
     keywords = ['champions tour', 'vct', 'game changers']
@@ -131,7 +131,8 @@ def fetch_match_player_kills(token: str, match: Dict[str, Any]) -> Dict[str, flo
 
 def post_settlements(base_url: str, admin_token: str, results: List[Dict[str, Any]]):
     url = base_url.rstrip('/') + '/settlements'
-    r = requests.post(url, json={'results': results}, headers={'x-admin-token': admin_token}, timeout=30)
+    # http_util session so HTTP_CASSETTE record/replay covers settlements too.
+    r = http_session().post(url, json={'results': results}, headers={'x-admin-token': admin_token}, timeout=30)
     if r.status_code != 200:
         raise RuntimeError(f'Settlements failed {r.status_code}: {r.text[:200]}')
     return r.json()
@@ -7,7 +7,8 @@ Postgres database used by the API (PlayerProjection table).
 Steps:
  1. Load environment (.env / process) for DATABASE_URL & PANDA_SCORE_TOKEN.
  2. Load latest model artifact (models/latest_<target>.joblib).
- 3. Load consolidated training_data.csv to build a feature cache per player.
+ 3. Load the player + feature columns of the training dataset (data/training
+    partitions; player_features.csv as a fallback) to build a feature cache per player.
  4. Fetch upcoming matches from PandaScore.
  5. For each match, ensure Match + Player rows exist; build feature vectors
     for each player (fall back to zeros if unseen) and predict.
@@ -15,7 +16,7 @@ Steps:
 
 Assumptions / Limitations:
  - Feature engineering for live odds currently uses the most recent row in
-   training_data.csv for each player (aggregated historical stats). If a
+   the training dataset for each player (aggregated historical stats). If a
    player is unseen, zeros are used (prediction may skew low).
  - Target assumed to be 'kills_per_round'. Adjust via --target.
  - statType stored as 'Kills Per Round' (frontend display). Adjust STAT_TYPE.
@@ -44,13 +45,13 @@ import sys
 import argparse
 import json
 import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 print("Loading modules...")
 
 import pandas as pd
-import requests
 import psycopg2
 import psycopg2.extras
 import joblib
@@ -58,8 +59,14 @@ from dotenv import load_dotenv
 from uuid import uuid4
 try:
     from . import vlr_scraper
+    from .http_util import get as http_get
+    from .image_index import ImageIndex, vlr_key
+    from .preprocess_data import load_training_dataset
 except ImportError:
     import vlr_scraper
+    from http_util import get as http_get
+    from image_index import ImageIndex, vlr_key
+    from preprocess_data import load_training_dataset
 
 print("Starting odds_setter script...")
 
@@ -69,6 +76,14 @@ DATA_CSV = ROOT / 'data' / 'player_features.csv'
 
 STAT_TYPE_DISPLAY = 'Kills'
 
+# Players missing from player_features.csv are scraped from VLR at runtime.
+# Those results live in a bounded LRU with a TTL; failed/empty fetches back
+# off exponentially so --loop doesn't re-scrape the same unknowns every cycle.
+RUNTIME_CACHE_SIZE = int(os.getenv('ODDS_FEATURE_CACHE_SIZE') or 512)
+RUNTIME_CACHE_TTL = float(os.getenv('ODDS_FEATURE_CACHE_TTL') or 6 * 3600)
+MISS_BACKOFF_BASE = 600.0
+MISS_BACKOFF_CAP = 24 * 3600.0
+
 
 def expected_rounds(game: str = 'VALORANT', series_format: str = 'BO3', map_number: int | None = None) -> float:
     """Bo-aware / game-aware expectancy used to scale KPR → total kills."""
@@ -119,21 +134,104 @@ def load_model(target: str):
 
 
 def build_feature_cache(feature_cols: List[str]) -> Dict[str, Dict[str, Any]]:
-    if not DATA_CSV.exists():
-        raise FileNotFoundError(f"Missing training dataset: {DATA_CSV}")
-    df = pd.read_csv(DATA_CSV)
+    """
+    Latest row per player from the partitioned training dataset (only the
+    player + model feature columns are read), else from player_features.csv.
+    """
+    wanted = {'player', *feature_cols}
+    try:
+        df = load_training_dataset(columns=['player', *feature_cols])
+    except FileNotFoundError:
+        if not DATA_CSV.exists():
+            raise FileNotFoundError(f"Missing training dataset: {DATA_CSV}")
+        df = pd.read_csv(DATA_CSV, usecols=lambda c: c in wanted)
     # Coerce required numeric columns
     for c in feature_cols:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors='coerce')
     # Latest row per player (assumes dataset sorted by year/tournament earlier)
     if 'player' not in df.columns:
-        raise RuntimeError('training_data.csv missing player column')
+        raise RuntimeError('training dataset missing player column')
+    return feature_cache_from_frame(df, feature_cols)
+
+
+def feature_cache_from_frame(df: pd.DataFrame, feature_cols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Latest row per player -> {feature: float}, missing/NaN as 0.0 (column-wise, no per-row pandas access)."""
     latest = df.groupby('player', as_index=False).tail(1)
-    cache: Dict[str, Dict[str, Any]] = {}
-    for _, row in latest.iterrows():
-        cache[str(row['player']).strip()] = {c: float(row[c]) if c in row and pd.notna(row[c]) else 0.0 for c in feature_cols}
-    return cache
+    feats = latest.reindex(columns=feature_cols).apply(pd.to_numeric, errors='coerce').astype(float).fillna(0.0)
+    names = latest['player'].astype(str).str.strip().tolist()
+    return {name: dict(zip(feature_cols, row)) for name, row in zip(names, feats.to_numpy().tolist())}
+
+
+class FeatureCache:
+    """
+    Player-name -> feature dict lookups.
+
+    ``static`` rows (from player_features.csv) are fixed for the process.
+    Runtime additions go into an LRU capped at ``maxsize`` entries that
+    expire after ``ttl`` seconds. Misses are remembered in a second bounded
+    LRU with exponential backoff (``MISS_BACKOFF_BASE`` doubling per repeat,
+    capped at ``MISS_BACKOFF_CAP``). Names match case-insensitively.
+    """
+
+    def __init__(self, static: Dict[str, Dict[str, Any]], maxsize: int = RUNTIME_CACHE_SIZE, ttl: float = RUNTIME_CACHE_TTL):
+        self.static = static
+        self._static_lower = {k.lower(): k for k in static}
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._runtime: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._misses: 'OrderedDict[str, Tuple[int, float]]' = OrderedDict()
+        self.counters = {'static_hits': 0, 'hits': 0, 'misses': 0, 'negative_hits': 0, 'expired': 0, 'evictions': 0}
+
+    def __len__(self) -> int:
+        return len(self.static) + len(self._runtime)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        key = self._static_lower.get(name.lower()) if name not in self.static else name
+        if key is not None:
+            self.counters['static_hits'] += 1
+            return self.static[key]
+        lk = name.lower()
+        entry = self._runtime.get(lk)
+        if entry is not None:
+            if time.monotonic() - entry[0] < self.ttl:
+                self._runtime.move_to_end(lk)
+                self.counters['hits'] += 1
+                return entry[1]
+            del self._runtime[lk]
+            self.counters['expired'] += 1
+        self.counters['misses'] += 1
+        return None
+
+    def put(self, name: str, feats: Dict[str, Any]) -> None:
+        lk = name.lower()
+        self._misses.pop(lk, None)
+        self._runtime[lk] = (time.monotonic(), feats)
+        self._runtime.move_to_end(lk)
+        self._evict(self._runtime)
+
+    def backing_off(self, name: str) -> bool:
+        """True while a recent failed fetch for ``name`` is still in its backoff window."""
+        entry = self._misses.get(name.lower())
+        if entry is not None and time.monotonic() < entry[1]:
+            self.counters['negative_hits'] += 1
+            return True
+        return False
+
+    def record_miss(self, name: str) -> None:
+        lk = name.lower()
+        failures = (self._misses.pop(lk, (0, 0.0))[0]) + 1
+        delay = min(MISS_BACKOFF_CAP, MISS_BACKOFF_BASE * 2 ** (failures - 1))
+        self._misses[lk] = (failures, time.monotonic() + delay)
+        self._evict(self._misses)
+
+    def _evict(self, lru: 'OrderedDict[str, Any]') -> None:
+        while len(lru) > self.maxsize:
+            lru.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, 'runtime': len(self._runtime), 'negative': len(self._misses)}
 
 
 def fetch_upcoming_matches(token: str, limit: int) -> List[Dict[str, Any]]:
@@ -143,20 +241,17 @@ def fetch_upcoming_matches(token: str, limit: int) -> List[Dict[str, Any]]:
         url = f'https://api.pandascore.co/valorant/matches/upcoming'
         params = {'per_page': 100}  # Fetch more to filter
         headers = {'Authorization': f'Bearer {token}'}
-        resp = requests.get(url, params=params, headers=headers, timeout=20)
-        if resp.status_code == 200:
-            data = resp.json()
-            # Filter for Tier 1 VCT and Game Changers
-            keywords = ['champions tour', 'vct', 'game changers']
-            for m in data:
-                league_name = m.get('league', {}).get('name', '').lower()
-                series_name = m.get('series', {}).get('name', '').lower()
-                tournament_name = m.get('tournament', {}).get('name', '').lower()
-                full_context = f"{league_name} {series_name} {tournament_name}"
-                if any(k in full_context for k in keywords):
-                    panda_matches.append(m)
-        else:
-            log(f"PandaScore error {resp.status_code}: {resp.text[:200]}", error=True)
+        # Shared limiter/retries; non-2xx raises with the status in the message.
+        data = http_get(url, params=params, headers=headers, timeout=20).json()
+        # Filter for Tier 1 VCT and Game Changers
+        keywords = ['champions tour', 'vct', 'game changers']
+        for m in data:
+            league_name = m.get('league', {}).get('name', '').lower()
+            series_name = m.get('series', {}).get('name', '').lower()
+            tournament_name = m.get('tournament', {}).get('name', '').lower()
+            full_context = f"{league_name} {series_name} {tournament_name}"
+            if any(k in full_context for k in keywords):
+                panda_matches.append(m)
     except Exception as e:
         log(f"PandaScore fetch failed: {e}", error=True)
 
@@ -281,39 +376,61 @@ def upsert_projection(conn, player_id: str, stat_type: str, match_id: str, value
         )
 
 
-def build_feature_vector(player_obj: Dict[str, Any], feature_cols: List[str], cache: Dict[str, Dict[str, Any]]):
+def update_player_images(conn, updates: Dict[str, str]):
+    """Fill missing Player.imageUrl for many players in one statement."""
+    if not updates:
+        return
+    with conn.cursor() as cur:
+        psycopg2.extras.execute_values(
+            cur,
+            """
+            UPDATE "Player" AS p SET "imageUrl" = v.url
+            FROM (VALUES %s) AS v(id, url)
+            WHERE p.id = v.id AND p."imageUrl" IS NULL
+            """,
+            list(updates.items()),
+        )
+
+
+def player_image(player_obj: Dict[str, Any], images: ImageIndex | None) -> str | None:
+    """Avatar for a VLR-sourced player from the persistent image index."""
+    if images is None or not player_obj.get('id') or 'vlr.gg' not in (player_obj.get('url') or ''):
+        return None
+    return images.lookup(vlr_key(player_obj['id']))
+
+
+def build_feature_vector(player_obj: Dict[str, Any], feature_cols: List[str], cache: FeatureCache, images: ImageIndex | None = None):
     player_name = player_obj.get('name') or 'unknown'
-    # Exact match first; attempt case-insensitive fallback
-    if player_name in cache:
-        return cache[player_name]
-    lowered = {k.lower(): k for k in cache.keys()}
-    key = lowered.get(player_name.lower())
-    if key:
-        return cache[key]
-    
+    hit = cache.get(player_name)
+    if hit is not None:
+        return hit
+    if cache.backing_off(player_name):
+        return {c: 0.0 for c in feature_cols}
+
     # If missing from cache, try to fetch from VLR if URL is present
     if 'url' in player_obj and 'vlr.gg' in player_obj['url']:
         log(f"Fetching missing stats for {player_name} from {player_obj['url']}")
         try:
-            stats = vlr_scraper.get_player_stats(player_obj['url'])
-            if stats:
-                # Update cache so we don't fetch again this run
+            stats = vlr_scraper.get_player_stats(player_obj['url']) or {}
+            # The profile page carries the avatar; remember it for the DB update.
+            if stats and images is not None and player_obj.get('id'):
+                images.record(vlr_key(player_obj['id']), stats.get('image_url'), 'vlr')
+            # No rounds played (or nothing parsed) means all-zero features: treat
+            # it as a miss so it backs off and is retried, rather than caching it.
+            if stats.get('rounds'):
                 # Ensure all feature cols are present
                 full_stats = {c: stats.get(c, 0.0) for c in feature_cols}
-                cache[player_name] = full_stats
-                
-                # If we found an image URL, return it so we can update the DB
-                if 'image_url' in stats:
-                    full_stats['image_url'] = stats['image_url']
-                    
+                cache.put(player_name, full_stats)
                 return full_stats
+            cache.record_miss(player_name)
         except Exception as e:
             log(f"Failed to fetch stats for {player_name}: {e}", error=True)
+            cache.record_miss(player_name)
 
     return {c: 0.0 for c in feature_cols}
 
 
-def run_once(args, token, db_url, model, feature_cols, feature_cache):
+def run_once(args, token, db_url, model, feature_cols, feature_cache: FeatureCache, images: ImageIndex | None = None):
     try:
         matches = fetch_upcoming_matches(token, args.limit_matches)
     except Exception as e:
@@ -334,6 +451,7 @@ def run_once(args, token, db_url, model, feature_cols, feature_cache):
 
     total_projections = 0
     skipped_players = 0
+    image_updates: Dict[str, str] = {}
 
     for m in matches:
         try:
@@ -355,18 +473,12 @@ def run_once(args, token, db_url, model, feature_cols, feature_cache):
                 skipped_players += 1
                 continue
 
-            feats_dict = build_feature_vector(p, feature_cols, feature_cache)
-            
-            # Update player image if found during stats fetch
-            if 'image_url' in feats_dict and feats_dict['image_url'] and conn:
-                try:
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            """UPDATE "Player" SET "imageUrl"=%s WHERE id=%s AND "imageUrl" IS NULL""",
-                            (feats_dict['image_url'], pid)
-                        )
-                except Exception as e:
-                    log(f"Failed to update image for {pname}: {e}", error=True)
+            feats_dict = build_feature_vector(p, feature_cols, feature_cache, images)
+
+            # Queue avatar from the image index; written in one batch below.
+            image_url = player_image(p, images)
+            if image_url and conn:
+                image_updates[pid] = image_url
 
             feats = [feats_dict.get(c, 0.0) for c in feature_cols]
             try:
@@ -399,8 +511,15 @@ def run_once(args, token, db_url, model, feature_cols, feature_cache):
             total_projections += 1
 
     if conn:
+        try:
+            update_player_images(conn, image_updates)
+        except Exception as e:
+            log(f'Failed to update player images: {e}', error=True)
         conn.close()
-    log(f'Done. projections={total_projections} skipped_players={skipped_players}')
+    if images is not None:
+        images.save()
+    log(f'Done. projections={total_projections} skipped_players={skipped_players} images={len(image_updates)}')
+    log('Feature cache ' + ' '.join(f'{k}={v}' for k, v in feature_cache.stats().items()))
 
 
 def main():
@@ -429,23 +548,26 @@ def main():
         sys.exit(1)
 
     try:
-        feature_cache = build_feature_cache(feature_cols)
+        feature_cache = FeatureCache(build_feature_cache(feature_cols))
     except Exception as e:
         log(f'Feature cache build failed: {e}', error=True)
         sys.exit(1)
 
-    log(f'Model loaded target={args.target} features={len(feature_cols)} players_in_cache={len(feature_cache)}')
+    images = ImageIndex.load()
+    log(f'Model loaded target={args.target} features={len(feature_cols)} players_in_cache={len(feature_cache)} images={len(images)}')
 
     if args.loop:
         log(f"Starting odds_setter in loop mode (interval={args.interval}s)")
         while True:
             try:
-                run_once(args, token, db_url, model, feature_cols, feature_cache)
+                # The exporter and scraper write the same index between cycles.
+                images.reload()
+                run_once(args, token, db_url, model, feature_cols, feature_cache, images)
             except Exception as e:
                 log(f"Unexpected error in loop: {e}", error=True)
             time.sleep(args.interval)
     else:
-        run_once(args, token, db_url, model, feature_cols, feature_cache)
+        run_once(args, token, db_url, model, feature_cols, feature_cache, images)
 
 
 if __name__ == '__main__':
@@ -5,13 +5,26 @@ Reads:
   - vct_YYYY/players_stats/players_stats.csv across available years
 
 Produces:
-  - ml/data/training_data.csv
+  - ml/data/training/year=YYYY/part-0.parquet (one partition per year; CSV
+    partitions when no Parquet engine is installed) + _schema.json
+  - ml/data/training_data.csv with --csv (optional single-file export)
+
+Read it back with load_training_dataset(columns=..., years=..., filters=...):
+only the requested years' partitions are opened, and with Parquet only the
+requested columns / matching row groups are decoded.
 
 Joining strategy:
   1. Concatenate all yearly players_stats with a Year column inferred from directory or from matches mapping.
   2. Normalize column names (snake_case, safe identifiers).
   3. Join with all_matches_games_ids on (Tournament, Stage, Match Type) to enrich with Match ID, Map, Year.
-  4. Derive simple engineered features (kdr, kad, fk_fd_diff, hs_rate, clutch_rate).
+  4. Derive engineered features (ENGINEERED_FEATURES: kdr, kad, fk_fd_diff, hs_rate, clutch_rate),
+     vectorized with masked division (NaN where the denominator is 0 or missing).
+
+Loading:
+  players_stats partitions are read in parallel on a process pool
+  (PREPROCESS_WORKERS, default one per CPU) with an explicit dtype schema:
+  categoricals for the join keys, team and agents, float32 for rates and counts.
+  The pyarrow CSV engine is used when pyarrow is installed.
 
 Assumptions:
   - Directory structure preserved as in imported Kaggle dataset.
@@ -19,17 +32,35 @@ Assumptions:
 
 Usage:
   python packages/api/ml/preprocess_data.py
+  python packages/api/ml/preprocess_data.py --csv   # also write training_data.csv
 """
 from __future__ import annotations
+import argparse
+import io
+import importlib.util
 import os
+import shutil
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 from pathlib import Path
 
+# pyarrow is optional; the C parser is used without it.
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+
+try:
+    from cache_util import atomic_write_bytes, load_json, now_iso, write_json
+except ImportError:
+    from packages.api.ml.cache_util import atomic_write_bytes, load_json, now_iso, write_json  # type: ignore
+
 ROOT = Path(__file__).parent
 DATA_DIR = ROOT / 'data' / 'Val-historical-stats'
 OUTPUT_FILE = ROOT / 'data' / 'training_data.csv'
+TRAINING_DATASET_DIR = Path(os.getenv('TRAINING_DATASET_DIR') or ROOT / 'data' / 'training')
 
 # Directories expected inside DATA_DIR for yearly splits (vct_2021, vct_2022, ...)
 YEAR_DIR_PATTERN = re.compile(r'vct_(\\d{4})')
@@ -67,9 +98,20 @@ RENAME_MAP = {
     'First Deaths': 'first_deaths'
 }
 
-ENGINEERED_ORDER = [
-    'kdr', 'kad', 'fk_fd_diff', 'hs_rate', 'clutch_rate'
+# Read schema for players_stats.csv (raw headers). Percent / "a/b" / "a:b"
+# columns stay text; normalize_player_stats parses them.
+CATEGORY_COLS = ['Tournament', 'Stage', 'Match Type', 'Teams', 'Agents']
+FLOAT32_COLS = [
+    'Rating', 'Average Combat Score', 'Average Damage Per Round', 'Kills Per Round', 'Assists Per Round',
+    'First Kills Per Round', 'First Deaths Per Round',
+    'Rounds Played', 'Kills', 'Deaths', 'Assists', 'First Kills', 'First Deaths', 'Maximum Kills in a Single Map',
 ]
+PLAYER_STATS_DTYPES = {**{c: 'category' for c in CATEGORY_COLS}, **{c: 'float32' for c in FLOAT32_COLS}}
+
+# Partitions are parsed on a process pool; fewer files than this parse inline.
+LOAD_WORKERS = int(os.getenv('PREPROCESS_WORKERS') or os.cpu_count() or 1)
+MIN_POOL_FILES = 2
+
 
 META_KEEP = [
     'tournament', 'stage', 'match_type', 'map', 'year', 'game_id', 'match_id'
@@ -81,6 +123,32 @@ PLAYER_KEEP = [
     'clutches_won_played', 'max_kills_map'
 ]
 
+# Column types of the training dataset; every partition is cast to this before
+# it is written, and CSV partitions are cast back on read. Columns not listed
+# here (e.g. extra engineered features) keep their computed dtype.
+TRAINING_SCHEMA = {
+    'player': 'string',
+    'team': 'category',
+    'agents': 'category',
+    'clutches_won_played': 'string',
+    'tournament': 'category',
+    'stage': 'category',
+    'match_type': 'category',
+    'map': 'category',
+    'year': 'int16',
+    'game_id': 'Int64',
+    'match_id': 'Int64',
+    **{
+        c: 'float32'
+        for c in [
+            'rounds_played', 'rating', 'acs', 'adr', 'kpr', 'apr', 'fkpr', 'fdpr', 'kills', 'deaths', 'assists',
+            'first_kills', 'first_deaths', 'hs_pct', 'clutch_success_pct', 'max_kills_map',
+            'kdr', 'kad', 'fk_fd_diff', 'hs_rate', 'clutch_rate',
+        ]
+    },
+}
+SCHEMA_FILE = '_schema.json'
+
 def _infer_year_from_path(p: Path) -> int | None:
     # Search each part for 4-digit year
     for part in p.parts[::-1]:
@@ -137,42 +205,102 @@ def parse_year_from_dir(path: Path) -> int | None:
         return int(m.group(1))
     return None
 
-def load_all_player_stats() -> pd.DataFrame:
+def _apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce an inferred-dtype frame to PLAYER_STATS_DTYPES (bad numeric cells become NaN)."""
+    for c in FLOAT32_COLS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors='coerce').astype('float32')
+    for c in CATEGORY_COLS:
+        if c in df.columns:
+            df[c] = df[c].astype('category')
+    return df
+
+def _read_players_stats(path: Path) -> pd.DataFrame:
+    """Read one partition with the schema, falling back to inference for malformed files."""
+    if CSV_ENGINE == 'pyarrow':
+        try:
+            return _apply_schema(pd.read_csv(path, engine='pyarrow'))
+        except Exception as e:
+            print(f"[preprocess] pyarrow engine failed on {path}, using C parser: {e}", file=sys.stderr)
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {c: t for c, t in PLAYER_STATS_DTYPES.items() if c in header}
+    try:
+        return pd.read_csv(path, dtype=dtypes)
+    except (ValueError, TypeError):
+        # Stray text in a numeric column: read loosely, then coerce.
+        return _apply_schema(pd.read_csv(path, low_memory=False))
+
+def load_player_stats_partition(path: Path) -> pd.DataFrame | None:
+    """One players_stats.csv with its __year_from_dir column (worker entry point; must pickle)."""
+    try:
+        df = _read_players_stats(path)
+    except Exception as e:  # skip unreadable files but log
+        print(f"[preprocess] WARN could not read {path}: {e}", file=sys.stderr)
+        return None
+    inferred_year = _infer_year_from_path(path)
+    if 'Year' in df.columns and pd.api.types.is_numeric_dtype(df['Year']):
+        # Trust explicit column if consistent
+        year_series = df['Year'].dropna().unique()
+        if len(year_series) == 1:
+            inferred_year = int(year_series[0])
+    df['__year_from_dir'] = inferred_year if inferred_year is not None else -1
+    return df
+
+def _concat_partitions(frames: list[pd.DataFrame], category_cols: list[str] = CATEGORY_COLS) -> pd.DataFrame:
+    """Concatenate keeping categoricals: categories are unioned (sorted) first, else concat falls back to object."""
+    for c in category_cols:
+        cols = [f[c] for f in frames if c in f.columns]
+        if not cols:
+            continue
+        categories = union_categoricals([s.astype('category') for s in cols], sort_categories=True).categories
+        for f in frames:
+            if c in f.columns:
+                f[c] = f[c].astype('category').cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+def load_all_player_stats(workers: int | None = None) -> pd.DataFrame:
     """Recursively load every players_stats.csv under DATA_DIR.
 
+    Partitions are read in parallel (``workers`` processes, default
+    LOAD_WORKERS) with the PLAYER_STATS_DTYPES schema.
+
     Year inference order:
       1. Four-digit year detected in any directory segment of the file path.
       2. 'Year' column in the CSV if present.
       3. Fallback: -1 (unknown year).
     """
-    rows: list[pd.DataFrame] = []
-    file_count = 0
+    paths: list[Path] = []
     for root, _dirs, files in os.walk(DATA_DIR):
         for f in files:
             if f.lower() == 'players_stats.csv':
-                file_count += 1
-                path = Path(root) / f
-                try:
-                    df = pd.read_csv(path)
-                except Exception as e:  # skip unreadable files but log
-                    print(f"[preprocess] WARN could not read {path}: {e}", file=sys.stderr)
-                    continue
-                inferred_year = _infer_year_from_path(path)
-                if 'Year' in df.columns and pd.api.types.is_numeric_dtype(df['Year']):
-                    # Trust explicit column if consistent
-                    year_series = df['Year'].dropna().unique()
-                    if len(year_series) == 1:
-                        inferred_year = int(year_series[0])
-                df['__year_from_dir'] = inferred_year if inferred_year is not None else -1
-                rows.append(df)
+                paths.append(Path(root) / f)
+    paths.sort()
+
+    procs = LOAD_WORKERS if workers is None else workers
+    pool = None
+    if procs > 1 and len(paths) >= MIN_POOL_FILES:
+        try:
+            pool = ProcessPoolExecutor(max_workers=min(procs, len(paths)))
+        except (OSError, NotImplementedError) as e:
+            print(f"[preprocess] process pool unavailable, loading inline: {e}", file=sys.stderr)
+    try:
+        loaded = list(pool.map(load_player_stats_partition, paths)) if pool else [load_player_stats_partition(p) for p in paths]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    rows = [df for df in loaded if df is not None]
 
     if not rows:
         raise RuntimeError(
-            f"No players_stats.csv files found under {DATA_DIR} (searched {file_count} potential locations)."
+            f"No players_stats.csv files found under {DATA_DIR} (searched {len(paths)} potential locations)."
         )
 
-    combined = pd.concat(rows, ignore_index=True)
-    print(f"[preprocess] Loaded {len(rows)} players_stats partitions; total rows={len(combined)}", file=sys.stderr)
+    combined = _concat_partitions(rows)
+    print(
+        f"[preprocess] Loaded {len(rows)} players_stats partitions ({CSV_ENGINE} engine, {procs if pool else 1} procs); "
+        f"total rows={len(combined)}",
+        file=sys.stderr,
+    )
     return combined
 
 def normalize_player_stats(df: pd.DataFrame) -> pd.DataFrame:
@@ -204,19 +332,181 @@ def normalize_player_stats(df: pd.DataFrame) -> pd.DataFrame:
         df['deaths_kd_field'] = pd.to_numeric(deaths_part, errors='coerce')
     return df
 
+def _values(col: pd.Series) -> np.ndarray:
+    """Float ndarray for a column (float32 stays float32; missing -> NaN)."""
+    dtype = col.dtype if col.dtype in (np.float32, np.float64) else np.float64
+    return col.to_numpy(dtype=dtype, na_value=np.nan)
+
+def safe_divide(num: pd.Series, den: pd.Series) -> np.ndarray:
+    """num / den elementwise; NaN where den is 0 or either side is missing."""
+    n, d = _values(num), _values(den)
+    out = np.full(n.shape, np.nan, dtype=np.result_type(n, d))
+    np.divide(n, d, out=out, where=(d != 0) & ~np.isnan(d) & ~np.isnan(n))
+    return out
+
+# Engineered columns, in output order: name -> fn(df) returning an array or
+# Series aligned with df. Register more with @engineered_feature('name');
+# each is computed column-wise, never per row.
+EngineeredFn = Callable[[pd.DataFrame], 'np.ndarray | pd.Series']
+ENGINEERED_FEATURES: dict[str, EngineeredFn] = {
+    'kdr': lambda df: safe_divide(df['kills'], df['deaths']),
+    'kad': lambda df: safe_divide(df['kills'] + df['assists'], df['deaths']),
+    'fk_fd_diff': lambda df: _values(df['first_kills']) - _values(df['first_deaths']),
+    'hs_rate': lambda df: _values(df['hs_pct']) / 100.0,
+    'clutch_rate': lambda df: (
+        safe_divide(df['clutches_won'], df['clutches_played']) if 'clutches_played' in df else np.full(len(df), np.nan)
+    ),
+}
+
+def engineered_feature(name: str) -> Callable[[EngineeredFn], EngineeredFn]:
+    """Decorator: add (or replace) an engineered column computed by ``fn(df)``."""
+    def register(fn: EngineeredFn) -> EngineeredFn:
+        ENGINEERED_FEATURES[name] = fn
+        return fn
+    return register
+
 def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
-    # Basic ratios with safety checks
-    df['kdr'] = (df['kills'] / df['deaths']).replace([pd.NA, pd.NaT, float('inf')], None)
-    df['kad'] = ((df['kills'] + df['assists']) / df['deaths']).replace([pd.NA, pd.NaT, float('inf')], None)
-    df['fk_fd_diff'] = df['first_kills'] - df['first_deaths']
-    df['hs_rate'] = df['hs_pct'] / 100.0
-    df['clutch_rate'] = df.apply(lambda r: (r['clutches_won'] / r['clutches_played']) if r.get('clutches_played') not in (0, None, float('nan')) else None, axis=1)
+    """Add every ENGINEERED_FEATURES column to ``df`` (float dtypes, NaN for undefined ratios)."""
+    for name, fn in ENGINEERED_FEATURES.items():
+        df[name] = fn(df)
+    return df
+
+def apply_training_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast the TRAINING_SCHEMA columns present in ``df`` (bad numeric cells become NaN/NA)."""
+    for c, dtype in TRAINING_SCHEMA.items():
+        if c not in df.columns or df[c].dtype == dtype:
+            continue
+        if dtype in ('float32', 'Int64'):
+            df[c] = pd.to_numeric(df[c], errors='coerce').astype(dtype)
+        elif dtype == 'int16':
+            df[c] = pd.to_numeric(df[c], errors='coerce').fillna(-1).astype(dtype)
+        else:
+            df[c] = df[c].astype(dtype)
+    return df
+
+def _write_year_partition(root: Path, year: int, df: pd.DataFrame) -> str:
+    """Write one year as Parquet (CSV if no Parquet engine is installed); returns the file name."""
+    part_dir = root / f'year={year}'
+    df = df.drop(columns=['year'])
+    try:
+        buf = io.BytesIO()
+        df.to_parquet(buf, index=False)
+        name, data = 'part-0.parquet', buf.getvalue()
+    except ImportError:
+        name, data = 'part-0.csv', df.to_csv(index=False).encode('utf-8')
+    atomic_write_bytes(part_dir / name, data)
+    for stale in part_dir.glob('part-0.*'):
+        if stale.name != name:
+            stale.unlink()
+    return name
+
+def write_training_dataset(df: pd.DataFrame, root: Path = TRAINING_DATASET_DIR) -> dict:
+    """
+    Write ``df`` as ``root/year=<y>/part-0.*`` partitions plus ``_schema.json``
+    (column dtypes and per-year file / row counts). Partitions are written
+    before the schema file, and years no longer present are removed after it.
+    """
+    df = apply_training_schema(df.copy())
+    if 'year' not in df.columns:
+        df['year'] = pd.Series(-1, index=df.index, dtype='int16')
+    partitions = {}
+    for year, part in df.groupby('year', sort=True, observed=True):
+        name = _write_year_partition(root, int(year), part)
+        partitions[str(int(year))] = {'file': name, 'rows': len(part)}
+    manifest = {
+        'schema': {c: str(t) for c, t in df.dtypes.items()},
+        'partitionBy': 'year',
+        'partitions': partitions,
+        'rows': len(df),
+        'updatedAt': now_iso(),
+    }
+    write_json(root / SCHEMA_FILE, manifest)
+    for d in root.glob('year=*'):
+        if d.is_dir() and d.name.split('=', 1)[1] not in partitions:
+            shutil.rmtree(d, ignore_errors=True)
+    return manifest
+
+_FILTER_OPS = {
+    '==': lambda s, v: s == v,
+    '=': lambda s, v: s == v,
+    '!=': lambda s, v: s != v,
+    '<': lambda s, v: s < v,
+    '<=': lambda s, v: s <= v,
+    '>': lambda s, v: s > v,
+    '>=': lambda s, v: s >= v,
+    'in': lambda s, v: s.isin(list(v)),
+    'not in': lambda s, v: ~s.isin(list(v)),
+}
+
+def _apply_filters(df: pd.DataFrame, filters: list[tuple] | None) -> pd.DataFrame:
+    """In-memory version of pyarrow-style ``[(col, op, value), ...]`` (AND) filters."""
+    for col, op, value in filters or []:
+        if col in df.columns:
+            df = df[_FILTER_OPS[op](df[col], value).fillna(False).astype(bool)]
     return df
 
-def main():
+def load_training_dataset(
+    columns: list[str] | None = None,
+    years: set[int] | list[int] | None = None,
+    filters: list[tuple] | None = None,
+    root: Path = TRAINING_DATASET_DIR,
+) -> pd.DataFrame:
+    """
+    Read the training dataset, touching only what is asked for.
+
+    ``years`` prunes partitions (other years' files are never opened);
+    ``columns`` is pushed down to the Parquet reader (unknown names are
+    ignored); ``filters`` are pyarrow-style ``[(col, op, value)]`` conjunctions,
+    pushed down to Parquet row groups and applied in memory for CSV.
+    Falls back to the single-file training_data.csv when no partitioned
+    dataset exists. Rows come back ordered by year.
+    """
+    manifest = load_json(root / SCHEMA_FILE, {}) or {}
+    partitions = manifest.get('partitions') or {}
+    filter_cols = [f[0] for f in filters or []]
+    if not partitions:
+        if not OUTPUT_FILE.exists():
+            raise FileNotFoundError(f"No training dataset in {root} (or {OUTPUT_FILE}). Run preprocess_data.py first.")
+        wanted = None if columns is None else set(columns) | set(filter_cols) | ({'year'} if years is not None else set())
+        df = pd.read_csv(OUTPUT_FILE, usecols=None if wanted is None else (lambda c: c in wanted))
+        df = _apply_filters(apply_training_schema(df), filters)
+        if years is not None and 'year' in df.columns:
+            df = df[df['year'].isin(list(years))]
+        return df.reset_index(drop=True)
+
+    schema = manifest.get('schema') or {}
+    cols = None if columns is None else [c for c in dict.fromkeys(columns) if c in schema and c != 'year']
+    frames = []
+    for year, entry in sorted(partitions.items(), key=lambda kv: int(kv[0])):
+        if years is not None and int(year) not in years:
+            continue
+        path = root / f'year={year}' / entry['file']
+        if path.suffix == '.parquet':
+            part = pd.read_parquet(path, columns=cols, filters=filters or None)
+        else:
+            wanted = None if cols is None else set(cols) | set(filter_cols)
+            part = pd.read_csv(path, usecols=None if wanted is None else (lambda c: c in wanted))
+            part = _apply_filters(apply_training_schema(part), filters)
+            if cols is not None:
+                part = part[[c for c in cols if c in part.columns]]
+        if columns is None or 'year' in columns:
+            part['year'] = pd.Series(int(year), index=part.index, dtype='int16')
+        frames.append(part)
+    if not frames:
+        return pd.DataFrame(columns=cols if cols is not None else list(schema))
+    categories = [c for c, t in TRAINING_SCHEMA.items() if t == 'category']
+    return _concat_partitions(frames, categories)
+
+def main(argv: list[str] | None = None):
+    p = argparse.ArgumentParser()
+    p.add_argument('--csv', action='store_true', help=f'Also write the single-file {OUTPUT_FILE.name}')
+    p.add_argument('--out', default=None, help=f'Dataset directory (default {TRAINING_DATASET_DIR})')
+    p.add_argument('--workers', type=int, default=None, help='Processes for loading players_stats partitions')
+    args = p.parse_args(argv)
+
     print("[preprocess] Loading data...", file=sys.stderr)
     matches = load_matches()
-    players_raw = load_all_player_stats()
+    players_raw = load_all_player_stats(args.workers)
     players_norm = normalize_player_stats(players_raw)
 
     # Join: matches are per map row; player stats aggregated per (Tournament, Stage, Match Type). We might not have map-level granularity; left join on keys.
@@ -231,14 +521,18 @@ def main():
     merged = players_norm.merge(
         matches[join_keys + ['match_id', 'game_id', 'map', 'year']].drop_duplicates(),
         on=join_keys,
-        how='left'
+        how='left',
+        suffixes=('', '_match'),
     )
+    # Directory / CSV year wins; the matches file fills partitions of unknown year.
+    if 'year_match' in merged.columns:
+        merged['year'] = merged['year'].where(merged['year'] >= 0, merged['year_match'])
 
     engineered = engineer_features(merged)
 
     # Select & order columns
     available_player = [c for c in PLAYER_KEEP if c in engineered.columns]
-    final_cols = available_player + [c for c in META_KEEP if c in engineered.columns and c not in available_player] + ENGINEERED_ORDER
+    final_cols = available_player + [c for c in META_KEEP if c in engineered.columns and c not in available_player] + list(ENGINEERED_FEATURES)
     final_cols_existing = [c for c in final_cols if c in engineered.columns]
 
     final = engineered[final_cols_existing].copy()
@@ -248,10 +542,18 @@ def main():
     if sort_cols:
         final = final.sort_values(sort_cols)
 
-    # Output directory
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    final.to_csv(OUTPUT_FILE, index=False)
-    print(f"[preprocess] Wrote {OUTPUT_FILE} rows={len(final)} cols={len(final.columns)}", file=sys.stderr)
+    root = Path(args.out) if args.out else TRAINING_DATASET_DIR
+    manifest = write_training_dataset(final, root)
+    kinds = sorted({e['file'].rsplit('.', 1)[1] for e in manifest['partitions'].values()})
+    print(
+        f"[preprocess] Wrote {root} rows={manifest['rows']} cols={len(manifest['schema'])} "
+        f"years={','.join(manifest['partitions'])} ({'/'.join(kinds)})",
+        file=sys.stderr,
+    )
+    if args.csv:
+        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        final.to_csv(OUTPUT_FILE, index=False)
+        print(f"[preprocess] Wrote {OUTPUT_FILE} rows={len(final)} cols={len(final.columns)}", file=sys.stderr)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The ML scripts import each other as flat modules (``from http_util import ...``).
+ML_DIR = Path(__file__).resolve().parents[1]
+if str(ML_DIR) not in sys.path:
+    sys.path.insert(0, str(ML_DIR))
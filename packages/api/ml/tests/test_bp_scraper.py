@@ -0,0 +1,81 @@
+import re
+
+import bp_scraper
+from cache_util import load_json
+
+
+class _Resp:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def json(self):
+        return self._rows
+
+
+def test_failed_meta_batch_is_not_stamped(tmp_path, monkeypatch):
+    cache_path = tmp_path / "bp_player_meta.json"
+    monkeypatch.setattr(bp_scraper, "META_CACHE", cache_path)
+    monkeypatch.setattr(bp_scraper, "META_BATCH", 2)
+
+    def fake_get(url, **kwargs):
+        ids = [int(x) for x in re.search(r"id=in\.\(([\d,]+)\)", url).group(1).split(",")]
+        if 3 in ids:
+            raise RuntimeError("GET failed after retries: 503")
+        # id 2 exists upstream but has no row: a real answer, cached as empty.
+        return _Resp([{"id": i, "tag": f"p{i}", "current_team_id": None, "team": None} for i in ids if i != 2])
+
+    monkeypatch.setattr(bp_scraper, "get", fake_get)
+    meta = bp_scraper.fetch_player_meta(None, "anon", [1, 2, 3, 4, 5])
+
+    cache = load_json(cache_path, {})
+    assert sorted(cache) == ["1", "2", "5"]
+    assert cache["2"].keys() == {"fetchedAt"}
+    assert sorted(meta) == [1, 5]
+
+    # The next run only asks again for the failed batch.
+    asked = []
+
+    def retry_get(url, **kwargs):
+        asked.append(url)
+        return _Resp([{"id": 3, "tag": "p3", "team": None}, {"id": 4, "tag": "p4", "team": None}])
+
+    monkeypatch.setattr(bp_scraper, "get", retry_get)
+    meta = bp_scraper.fetch_player_meta(None, "anon", [1, 2, 3, 4, 5])
+    assert len(asked) == 1 and "in.(3,4)" in asked[0]
+    assert sorted(meta) == [1, 3, 4, 5]
+
+
+class _Page:
+    def __init__(self, current, season_ids):
+        self.current_season_id = current
+        self.seasons = [{"id": sid} for sid in season_ids]
+
+
+def test_season_fetched_while_current_is_refetched_once_finished(tmp_path, monkeypatch):
+    fetched = []
+
+    def fake_aggregated(sess, sid):
+        fetched.append(sid)
+        return [{"player_id": 1, "kills": 10 + len(fetched)}]
+
+    monkeypatch.setattr(bp_scraper, "session", lambda: None)
+    monkeypatch.setattr(bp_scraper, "_trpc_aggregated", fake_aggregated)
+
+    monkeypatch.setattr(bp_scraper.BPPage, "fetch", classmethod(lambda cls, sess: _Page(2, [1, 2])))
+    bp_scraper.backfill_seasons(root=tmp_path)
+    assert sorted(fetched) == [1, 2]
+    seasons = load_json(tmp_path / "_manifest.json", {})["seasons"]
+    assert seasons["1"]["final"] and not seasons["2"]["final"]
+
+    # Season 2 has ended: its last fetch was mid-season, so it is fetched again.
+    fetched.clear()
+    monkeypatch.setattr(bp_scraper.BPPage, "fetch", classmethod(lambda cls, sess: _Page(3, [1, 2, 3])))
+    summary = bp_scraper.backfill_seasons(root=tmp_path)
+    assert sorted(fetched) == [2, 3]
+    assert summary["skipped"] == 1
+    assert load_json(tmp_path / "_manifest.json", {})["seasons"]["2"]["final"]
+
+    # Now it is final and stays put.
+    fetched.clear()
+    bp_scraper.backfill_seasons(root=tmp_path)
+    assert fetched == [3]
@@ -0,0 +1,134 @@
+import json
+import math
+import random
+
+import pandas as pd
+
+import export_live_stats as els
+
+
+def _write_history(root, seed=7, players=120):
+    rng = random.Random(seed)
+    names = [f"Player {i}" for i in range(players)]
+    for year in (2022, 2023, 2024):
+        rows = []
+        for t in range(12):
+            for name in rng.sample(names, players // 2):
+                rounds = rng.randint(15, 30)
+                row = {
+                    "Tournament": f"T{t}", "Stage": "Playoffs", "Match Type": "Bo3", "Player": name,
+                    "Teams": f"Team {hash(name) % 9}", "Rounds Played": rounds,
+                    "Rating": round(rng.uniform(0.5, 1.6), 2), "Average Combat Score": rng.randint(100, 300),
+                    "Kills": rng.randint(5, 30), "Deaths": rng.randint(5, 30), "Assists": rng.randint(0, 10),
+                    "Headshot %": f"{rng.randint(10, 40)}%",
+                }
+                rows.append(row)
+                if rng.random() < 0.3:  # per-agent duplicate row with fewer rounds
+                    rows.append({**row, "Rounds Played": rounds - 5, "Rating": round(rng.uniform(0.5, 1.6), 2)})
+        out = root / f"vct_{year}" / "players_stats" / "players_stats.csv"
+        out.parent.mkdir(parents=True)
+        pd.DataFrame(rows).to_csv(out, index=False)
+
+
+def _reference(root):
+    """Whole-frame aggregation: every file at once, max-rounds row per match, pandas means."""
+    frames = []
+    for f in sorted(root.glob("vct_*/players_stats/players_stats.csv")):
+        df = pd.read_csv(f)
+        df["year"] = f.parts[-3]
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    df["hs"] = pd.to_numeric(df["Headshot %"].str.rstrip("%"))
+    df = df.sort_values("Rounds Played", ascending=False, kind="stable")
+    df = df.drop_duplicates(["year", "Tournament", "Stage", "Match Type", "Player"])
+    return df.groupby("Player").agg(
+        rounds=("Rounds Played", "sum"), kills=("Kills", "sum"), rating=("Rating", "mean"), hs=("hs", "mean")
+    )
+
+
+def test_cached_partials_match_whole_frame_aggregation(tmp_path, monkeypatch):
+    _write_history(tmp_path / "hist")
+    monkeypatch.setattr(els, "HIST_DIR", tmp_path / "hist")
+    monkeypatch.setattr(els, "HIST_CACHE", tmp_path / "partials.pkl")
+    build = els._history_records
+    seen = []
+    monkeypatch.setattr(els, "_history_records", lambda agg: seen.append(agg) or build(agg))
+
+    rows = els.load_vct_history(min_maps_equiv=0, limit=10**6)
+    agg = seen[0].set_index("player")
+    ref = _reference(tmp_path / "hist")
+    assert len(rows) == len(ref) == len(agg)
+    assert (agg["rounds"] == ref["rounds"].reindex(agg.index)).all()
+    assert (agg["kills"] == ref["kills"].reindex(agg.index)).all()
+    # Same pandas mean over the same rows; only summation order may differ (an ulp or so).
+    for col in ("rating", "hs"):
+        for name, value in agg[col].items():
+            assert math.isclose(value, ref.loc[name, col], rel_tol=1e-14), (name, col)
+
+    # Second run is served from the partials cache and is identical.
+    assert els.load_vct_history(min_maps_equiv=0, limit=10**6) == rows
+
+
+def test_history_records_round_half_ties_like_python():
+    ratings = [1.0775, 0.9995, 1.0625, 0.1235]
+    hs = [24.95, 24.25, 10.05, float("nan")]
+    agg = pd.DataFrame(
+        {
+            "player": [f"p{i}" for i in range(4)], "team": "T", "maps": 1, "kills": 1, "deaths": 1, "assists": 0,
+            "rating": ratings, "acs": 200.0, "hs": hs,
+        }
+    )
+    rows = els._history_records(agg)
+    assert [r["rating"] for r in rows] == [round(v, 3) for v in ratings]
+    assert [r["hsPercent"] for r in rows] == [round(v, 1) for v in hs[:3]] + [None]
+
+
+def _players(ratings):
+    return [{"playerId": f"val-{i}", "name": f"P{i}", "rating": r} for i, r in ratings.items()]
+
+
+def _apply(prev_players, delta):
+    """What a client holding the previous snapshot does with a delta."""
+    by_id = {p["playerId"]: p for p in prev_players}
+    for pid in delta["removed"]:
+        by_id.pop(pid)
+    for p in delta["added"] + delta["changed"]:
+        by_id[p["playerId"]] = p
+    return sorted(by_id.values(), key=lambda p: -p["rating"])
+
+
+def test_delta_applied_to_previous_snapshot_gives_new_players():
+    prev = _players({1: 1.2, 2: 1.1, 3: 0.9})
+    new = _players({1: 1.25, 3: 0.9, 4: 1.0})
+    delta = els.build_delta(prev, new)
+    assert [p["playerId"] for p in delta["added"]] == ["val-4"]
+    assert [p["playerId"] for p in delta["changed"]] == ["val-1"]
+    assert delta["removed"] == ["val-2"]
+    assert _apply(prev, delta) == sorted(new, key=lambda p: -p["rating"])
+
+
+def test_manifest_version_and_etag_follow_player_content(tmp_path, monkeypatch):
+    for name in ("OUT_API", "OUT_DELTA", "OUT_MANIFEST"):
+        monkeypatch.setattr(els, name, tmp_path / "api" / getattr(els, name).name)
+    monkeypatch.setattr(els, "OUT_WEB_PUBLIC", tmp_path / "public" / "live_stats.json")
+
+    first = {"players": _players({1: 1.2, 2: 1.1}), "sources": ["vlr"], "updatedAt": "2026-01-01T00:00:00+00:00"}
+    m1 = els.write_delta(first, {}, "sha-1")
+    assert m1["version"] == 1 and m1["delta"]["added"] == 2
+
+    # Only the timestamp moved: same version and ETag.
+    again = {**first, "updatedAt": "2026-01-01T01:00:00+00:00"}
+    m2 = els.write_delta(again, first, "sha-2")
+    assert (m2["version"], m2["etag"]) == (1, m1["etag"])
+    assert m2["checkedAt"] == again["updatedAt"]
+
+    second = {**again, "players": _players({1: 1.3, 3: 0.8}), "updatedAt": "2026-01-01T02:00:00+00:00"}
+    m3 = els.write_delta(second, again, "sha-3")
+    assert m3["version"] == 2 and m3["etag"] != m1["etag"]
+    assert m3["delta"]["fromEtag"] == m1["etag"]
+
+    delta = json.loads((tmp_path / "api" / "live_stats.delta.json").read_text())
+    assert (delta["fromVersion"], delta["fromEtag"], delta["etag"]) == (1, m1["etag"], m3["etag"])
+    assert _apply(again["players"], delta) == second["players"]
+    published = tmp_path / "public" / "live_stats.manifest.json"
+    assert json.loads(published.read_text()) == m3
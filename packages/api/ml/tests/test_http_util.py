@@ -0,0 +1,196 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import http_util
+
+
+class _SlowSession:
+    def __init__(self):
+        self.timeouts = []
+
+    def get(self, url, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        time.sleep(timeout)
+        raise TimeoutError("read timed out")
+
+
+def test_deadline_reaches_pool_workers_and_caps_timeouts():
+    sess = _SlowSession()
+    pool = ThreadPoolExecutor(max_workers=2)
+    started = time.monotonic()
+    try:
+        with http_util.deadline(time.monotonic() + 0.3):
+            futures = [
+                http_util.submit(pool, http_util.get, f"https://deadline.example/{i}", sess=sess, timeout=30)
+                for i in range(6)
+            ]
+            for fut in futures:
+                with pytest.raises(http_util.DeadlineExceeded):
+                    fut.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    assert time.monotonic() - started < 2
+    assert sess.timeouts and max(sess.timeouts) <= 0.3
+
+
+def _record_cassettes(root, urls):
+    import json
+
+    for url in urls:
+        path = http_util.cassette_path("GET", url, root=root)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"status": 200, "headers": {"content-type": "text/plain"}, "text": url}))
+
+
+def test_replay_does_not_wait_on_rate_limits(tmp_path, monkeypatch):
+    host = "replay.example"
+    urls = [f"https://{host}/page/{i}" for i in range(20)]
+    _record_cassettes(tmp_path, urls)
+    monkeypatch.setenv("HTTP_CASSETTE", "replay")
+    monkeypatch.setenv("HTTP_REPLAY_LATENCY", "0")
+    monkeypatch.setattr(http_util, "CASSETTE_DIR", tmp_path)
+    # One request per 10s: 20 admitted requests would take minutes.
+    http_util.configure_host(host, 0.1, 1)
+    http_util._host_state(urls[0]).pause(60)
+
+    started = time.monotonic()
+    sess = http_util.session()
+    assert [http_util.get(u, sess=sess).text for u in urls] == urls
+    assert [r.text for r in http_util.get_many(urls)] == urls
+    assert time.monotonic() - started < 2
+    assert http_util.stats()[host]["requests"] == 0
+
+
+class _OkResp:
+    status_code = 200
+    content = b""
+
+    def raise_for_status(self):
+        pass
+
+
+class _OkSession:
+    def get(self, url, **kwargs):
+        return _OkResp()
+
+
+class _HangingAsyncSession:
+    async def fetch(self, url, **kwargs):
+        await asyncio.sleep(60)
+
+
+def _half_open(host):
+    state = http_util._host_state(f"https://{host}/")
+    state.breaker = http_util.CircuitBreaker(threshold=1, cooldown=0.0)
+    state.breaker.record_failure()
+    assert state.breaker.state == "half-open"
+    return state
+
+
+def test_probe_cut_short_by_deadline_is_released():
+    state = _half_open("probe.example")
+    with http_util.deadline(time.monotonic() + 0.1):
+        with pytest.raises(http_util.DeadlineExceeded):
+            http_util.get("https://probe.example/a", sess=_SlowSession(), timeout=30)
+    # The probe said nothing about the host: the next call gets to probe again.
+    assert http_util.get("https://probe.example/b", sess=_OkSession(), retries=1).status_code == 200
+    assert state.breaker.state == "closed"
+
+
+def test_cancelled_async_probe_is_released():
+    state = _half_open("aprobe.example")
+
+    async def run():
+        task = asyncio.ensure_future(http_util.aget("https://aprobe.example/a", sess=_HangingAsyncSession()))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert state.breaker.allow()
+
+
+def test_token_bucket_allows_burst_then_spaces_requests():
+    bucket = http_util.TokenBucket(rate=10, burst=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.1, abs=0.02)
+    assert waits[3] == pytest.approx(0.2, abs=0.02)
+
+
+def test_breaker_opens_half_opens_with_one_probe_and_closes():
+    breaker = http_util.CircuitBreaker(threshold=2, cooldown=0.05)
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+    assert breaker.record_failure()  # a failed probe reopens straight away
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+class _Resp503:
+    status_code = 503
+    content = b""
+
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        raise RuntimeError("503 Server Error")
+
+
+class _CountingSession:
+    def __init__(self, resp):
+        self.resp = resp
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        return self.resp
+
+
+def test_failing_host_trips_breaker_and_is_rejected_without_sending(monkeypatch):
+    monkeypatch.setattr(http_util, "backoff_delay", lambda attempt: 0.0)
+    state = http_util._host_state("https://failing.example/")
+    state.breaker = http_util.CircuitBreaker(threshold=3, cooldown=60)
+    sess = _CountingSession(_Resp503())
+
+    with pytest.raises(RuntimeError, match="after 3 tries"):
+        http_util.get("https://failing.example/a", sess=sess, retries=3)
+    assert sess.calls == 3
+
+    with pytest.raises(http_util.CircuitOpenError):
+        http_util.get("https://failing.example/b", sess=sess, retries=3)
+    assert sess.calls == 3
+    row = http_util.stats()["failing.example"]
+    assert row["circuit"] == "open"
+    assert row["failures"] == 3 and row["retries"] == 2
+    assert row["circuit_opens"] == 1 and row["circuit_rejects"] == 1
+
+
+def test_retry_after_pauses_the_whole_host():
+    state = http_util._host_state("https://paused.example/")
+    http_util.configure_host("paused.example", 100, 100)
+    sess = _CountingSession(_Resp503({"Retry-After": "0.2"}))
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError):
+        http_util.get("https://paused.example/a", sess=sess, retries=2)
+    assert sess.calls == 2
+    assert time.monotonic() - started >= 0.2
+    assert http_util.stats()["paused.example"]["retry_after_s"] == 0.2
+    # Another URL on the same host is held by the same pause.
+    state.pause(0.2)
+    assert 0.1 < state.admit("https://paused.example/other") <= 0.2
@@ -0,0 +1,37 @@
+from cache_util import write_json
+
+from image_index import ImageIndex
+
+
+def test_save_keeps_entries_other_processes_wrote(tmp_path):
+    path = tmp_path / "player_images.json"
+    write_json(path, {"val-1": {"url": "https://a/1.png", "source": "vlr", "verifiedAt": "2026-01-01T00:00:00+00:00"}})
+    ours = ImageIndex.load(path)
+
+    # Another process verifies val-1 again and adds val-2 after we loaded.
+    other = ImageIndex.load(path)
+    other.record("val-1", "https://a/1b.png", "vlr")
+    other.record("val-2", "https://a/2.png", "vlr")
+    other.save()
+
+    ours.record("val-3", "https://a/3.png", "vlr")
+    ours.save()
+
+    merged = ImageIndex.load(path)
+    assert merged.lookup("val-1") == "https://a/1b.png"
+    assert merged.lookup("val-2") == "https://a/2.png"
+    assert merged.lookup("val-3") == "https://a/3.png"
+
+
+def test_reload_refreshes_a_long_lived_index(tmp_path):
+    path = tmp_path / "player_images.json"
+    ours = ImageIndex.load(path)
+    assert ours.lookup("val-1") is None
+
+    other = ImageIndex.load(path)
+    other.record("val-1", "https://a/1.png", "vlr")
+    other.save()
+
+    ours.reload()
+    assert ours.lookup("val-1") == "https://a/1.png"
+    assert ours.is_fresh("val-1")
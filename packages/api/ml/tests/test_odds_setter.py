@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("joblib")
+pytest.importorskip("dotenv")
+
+import odds_setter  # noqa: E402
+from odds_setter import FeatureCache  # noqa: E402
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(odds_setter, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_runtime_entries_are_lru_bounded(clock):
+    cache = FeatureCache({"TenZ": {"kpr": 0.9}}, maxsize=2, ttl=60)
+    cache.put("a", {"kpr": 1})
+    cache.put("b", {"kpr": 2})
+    assert cache.get("A") == {"kpr": 1}  # a is now most recent
+    cache.put("c", {"kpr": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"kpr": 1} and cache.get("c") == {"kpr": 3}
+    assert cache.get("tenz") == {"kpr": 0.9}  # static rows never evict
+    assert cache.stats()["evictions"] == 1
+    assert len(cache) == 3
+
+
+def test_runtime_entries_expire(clock):
+    cache = FeatureCache({}, maxsize=4, ttl=60)
+    cache.put("a", {"kpr": 1})
+    clock.now += 59
+    assert cache.get("a") == {"kpr": 1}
+    clock.now += 2
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["expired"] == 1 and stats["runtime"] == 0
+
+
+def test_misses_back_off_exponentially_up_to_the_cap(clock, monkeypatch):
+    monkeypatch.setattr(odds_setter, "MISS_BACKOFF_BASE", 10.0)
+    monkeypatch.setattr(odds_setter, "MISS_BACKOFF_CAP", 25.0)
+    cache = FeatureCache({}, maxsize=4, ttl=60)
+
+    cache.record_miss("ghost")
+    assert cache.backing_off("Ghost")
+    clock.now += 10
+    assert not cache.backing_off("ghost")
+
+    cache.record_miss("ghost")  # second failure: 20s
+    clock.now += 19
+    assert cache.backing_off("ghost")
+    clock.now += 1
+    assert not cache.backing_off("ghost")
+
+    cache.record_miss("ghost")  # third failure would be 40s, capped at 25s
+    clock.now += 25
+    assert not cache.backing_off("ghost")
+
+    # A successful fetch clears the backoff.
+    cache.record_miss("ghost")
+    cache.put("ghost", {"kpr": 1})
+    assert not cache.backing_off("ghost")
+    assert cache.stats()["negative"] == 0
+
+
+def test_profile_without_rounds_is_a_miss_not_a_hit(clock, monkeypatch):
+    cache = FeatureCache({}, maxsize=4, ttl=60)
+    fetched = []
+
+    def fake_stats(url):
+        fetched.append(url)
+        return {"rounds": 0, "kpr": 0.0}
+
+    monkeypatch.setattr(odds_setter.vlr_scraper, "get_player_stats", fake_stats)
+    player = {"name": "Rookie", "url": "https://www.vlr.gg/player/1/rookie"}
+
+    assert odds_setter.build_feature_vector(player, ["kpr"], cache) == {"kpr": 0.0}
+    assert odds_setter.build_feature_vector(player, ["kpr"], cache) == {"kpr": 0.0}
+    assert len(fetched) == 1
+    assert cache.get("Rookie") is None
+    assert cache.stats()["negative_hits"] == 1
@@ -0,0 +1,62 @@
+import json
+
+import vlr_match_crawler
+from vlr_match_crawler import Checkpoint
+
+
+def test_checkpoint_replays_log_over_snapshot_and_compacts(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    cp = Checkpoint(path)
+    cp.mark_ingested("10")
+    cp.mark_backfill_page(3)
+    cp.save()
+    cp.mark_ingested("11")
+    cp.mark_backfill_page(4)
+    assert cp.log_path.read_text() == "11\nbackfillPage=4\n"
+
+    # A crash mid-append leaves a torn last line; it is dropped, not misread.
+    with cp.log_path.open("a") as fh:
+        fh.write("12")
+
+    again = Checkpoint(path)
+    assert again.ingested == {"10", "11"}
+    assert again.backfill_page == 4
+    # Loading folded the log into the snapshot.
+    assert not again.log_path.exists()
+    assert json.loads(path.read_text())["ingested"] == ["10", "11"]
+
+    again.mark_ingested("12")
+    assert Checkpoint(path).ingested == {"10", "11", "12"}
+
+
+def _page(ids):
+    return [{"id": i, "url": f"https://vlr.example/{i}", "event": "ev"} for i in ids]
+
+
+def test_crawl_recent_stops_at_first_fully_ingested_page(tmp_path, monkeypatch):
+    pages = {1: _page(["5", "4"]), 2: _page(["3", "2"]), 3: _page(["1", "0"])}
+    requested = []
+    stored = []
+
+    def fake_results_page(page):
+        requested.append(page)
+        return pages.get(page, [])
+
+    def fake_fetch_parse(jobs):
+        for job in jobs:
+            yield job, [{"playerId": "p", "matchId": job.key["id"], "mapNumber": 1}], None
+
+    monkeypatch.setattr(vlr_match_crawler, "get_results_page", fake_results_page)
+    monkeypatch.setattr(vlr_match_crawler, "fetch_parse", fake_fetch_parse)
+    monkeypatch.setattr(vlr_match_crawler, "_append_rows", lambda rows: stored.extend(rows))
+
+    cp = Checkpoint(tmp_path / "checkpoint.json")
+    for mid in ("3", "2", "1", "0"):
+        cp.mark_ingested(mid)
+
+    added = vlr_match_crawler.crawl_recent(max_pages=3, cp=cp)
+    assert added == 2
+    assert requested == [1, 2]
+    assert sorted(r["matchId"] for r in stored) == ["4", "5"]
+    assert all(r["event"] == "ev" for r in stored)
+    assert {"4", "5"} <= Checkpoint(tmp_path / "checkpoint.json").ingested
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import vlr_scraper
+from vlr_scraper import PlayerIdCache
+
+
+def _age(cache, name, days):
+    stamp = datetime.now(timezone.utc) - timedelta(days=days)
+    cache._load()[cache._key(name)]["resolvedAt"] = stamp.isoformat()
+
+
+def test_player_id_cache_ttls(tmp_path):
+    cache = PlayerIdCache(tmp_path / "ids.json")
+    cache.put("TenZ", "9", 1.0)
+    cache.put("  tenz  jr ", "10", 0.5)
+    cache.put("nobody", None)
+
+    # Keys are normalised and the cache survives a reload from disk.
+    reloaded = PlayerIdCache(tmp_path / "ids.json")
+    assert reloaded.get("tenz")["id"] == "9"
+    assert reloaded.get("TENZ JR")["id"] == "10"
+    assert reloaded.get("nobody")["id"] is None  # a cached miss, not an unknown name
+
+    for name in ("TenZ", "tenz jr", "nobody"):
+        _age(reloaded, name, 2)
+    assert reloaded.get("TenZ")["id"] == "9"  # exact matches never expire
+    assert reloaded.get("tenz jr")["id"] == "10"  # fuzzy hits last a week
+    assert reloaded.get("nobody") is None  # misses only a day
+
+    _age(reloaded, "tenz jr", 8)
+    assert reloaded.get("tenz jr") is None
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = PlayerIdCache(tmp_path / "ids.json")
+    monkeypatch.setattr(vlr_scraper, "player_id_cache", cache)
+    return cache
+
+
+def test_search_player_caches_misses_but_not_errors(cache, monkeypatch):
+    calls = []
+
+    def fake_search(name):
+        calls.append(name)
+        if name == "down":
+            raise RuntimeError("GET failed after 3 tries")
+        return (None, 0.0) if name == "ghost" else ("9", 1.0)
+
+    monkeypatch.setattr(vlr_scraper, "_search_player_uncached", fake_search)
+
+    assert vlr_scraper.search_player("ghost") is None
+    assert vlr_scraper.search_player("ghost") is None
+    assert vlr_scraper.search_player("down") is None
+    assert vlr_scraper.search_player("down") is None
+    assert calls == ["ghost", "down", "down"]
+    assert cache.get("down") is None
+
+    assert vlr_scraper.search_player("TenZ")["id"] == "9"
+    assert vlr_scraper.search_player("TenZ")["id"] == "9"
+    assert calls.count("TenZ") == 1
+
+
+def test_invalidate_player_id(cache, monkeypatch):
+    calls = []
+    monkeypatch.setattr(vlr_scraper, "_search_player_uncached", lambda name: calls.append(name) or ("9", 1.0))
+    for name in ("TenZ", "Sacy", "TenZ", "Sacy"):
+        vlr_scraper.search_player(name)
+    assert calls == ["TenZ", "Sacy"]
+
+    vlr_scraper.invalidate_player_id("tenz")
+    vlr_scraper.search_player("TenZ")
+    vlr_scraper.search_player("Sacy")
+    assert calls == ["TenZ", "Sacy", "TenZ"]
+
+    vlr_scraper.invalidate_player_id()
+    vlr_scraper.search_player("Sacy")
+    assert calls[-1] == "Sacy"
+    assert PlayerIdCache(cache.path).get("TenZ") is None
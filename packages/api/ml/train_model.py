@@ -3,9 +3,10 @@
 Usage examples:
   python packages/api/ml/train_model.py
   python packages/api/ml/train_model.py --target kills_per_round --model hgb --limit-year 2023,2024 --min-rounds 40
+  python packages/api/ml/train_model.py --game cod   # needs: python packages/api/ml/bp_scraper.py --backfill
 
 Defaults:
-  target: kills_per_round (computed as kills / rounds_played)
+  target: kills_per_round (computed as kills / rounds_played); kills_per_map for --game cod
   model: hgb (HistGradientBoostingRegressor)
 
 Artifacts:
@@ -31,8 +32,12 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.model_selection import train_test_split
 import joblib
 
+try:
+    from preprocess_data import load_training_dataset
+except ImportError:
+    from packages.api.ml.preprocess_data import load_training_dataset  # type: ignore
+
 ROOT = Path(__file__).parent
-DATA_PATH = ROOT / 'data' / 'training_data.csv'
 MODELS_DIR = ROOT / 'models'
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -44,34 +49,72 @@ NUMERIC_CANDIDATES = [
 
 DEFAULT_TARGET = 'kills_per_round'
 
+# COD: season aggregates from bp_scraper's backfill. Features are the player's
+# previous-season per-map rates, so nothing from the target season leaks in.
+COD_DEFAULT_TARGET = 'kills_per_map'
+COD_RATE_COLS = {
+    'kills_per_map': 'kills',
+    'deaths_per_map': 'deaths',
+    'assists_per_map': 'assists',
+    'damage_per_map': 'damage',
+}
+COD_FEATURES = [f'prev_{c}' for c in COD_RATE_COLS] + ['prev_bp_rating', 'prev_game_count']
+
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser()
-    p.add_argument('--target', default=DEFAULT_TARGET, help='Target column or derived metric')
+    p.add_argument('--game', default='val', choices=['val','cod'])
+    p.add_argument('--target', default=None, help='Target column or derived metric')
     p.add_argument('--model', default='hgb', choices=['hgb','rf'])
     p.add_argument('--limit-year', default=None, help='Comma separated list of years to include (e.g. 2023,2024)')
-    p.add_argument('--min-rounds', type=int, default=20, help='Minimum rounds_played filter')
+    p.add_argument('--min-rounds', type=int, default=20, help='Minimum rounds_played filter (maps played for --game cod)')
     p.add_argument('--test-size', type=float, default=0.2)
     p.add_argument('--random-state', type=int, default=1337)
     p.add_argument('--max-rows', type=int, default=None, help='Optional limit for faster iteration')
-    return p.parse_args()
-
-
-def load_dataset(limit_year: str | None, min_rounds: int, max_rows: int | None) -> pd.DataFrame:
-    if not DATA_PATH.exists():
-        raise FileNotFoundError(f"Missing consolidated dataset: {DATA_PATH}. Run preprocess_data.py first.")
-    df = pd.read_csv(DATA_PATH)
-    # Basic cleaning
-    for col in NUMERIC_CANDIDATES:
-        if col in df.columns:
-            # Coerce to numeric ignoring errors
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    if 'rounds_played' in df.columns:
-        df = df[df['rounds_played'] >= min_rounds]
+    args = p.parse_args()
+    if args.target is None:
+        args.target = COD_DEFAULT_TARGET if args.game == 'cod' else DEFAULT_TARGET
+    return args
+
+
+def load_dataset(
+    limit_year: str | None, min_rounds: int, max_rows: int | None, target: str | None = None
+) -> pd.DataFrame:
+    years = None
+    if limit_year:
+        years = {int(y.strip()) for y in limit_year.split(',') if y.strip().isdigit()} or None
+    # Only the feature/target columns and the requested years are read; the
+    # rounds filter is pushed down to the Parquet reader.
+    columns = ['player', 'year', *NUMERIC_CANDIDATES, *([target] if target else [])]
+    df = load_training_dataset(columns=columns, years=years, filters=[('rounds_played', '>=', min_rounds)])
+    if max_rows:
+        df = df.head(max_rows)
+    return df.reset_index(drop=True)
+
+
+def load_cod_dataset(limit_year: str | None, min_maps: int, max_rows: int | None) -> pd.DataFrame:
+    try:
+        from bp_scraper import COD_DATASET_DIR, load_seasons
+    except ImportError:
+        from packages.api.ml.bp_scraper import COD_DATASET_DIR, load_seasons  # type: ignore
+    seasons = None
     if limit_year:
-        years = {int(y.strip()) for y in limit_year.split(',') if y.strip().isdigit()}
-        if 'year' in df.columns and years:
-            df = df[df['year'].isin(years)]
+        seasons = {int(y.strip()) for y in limit_year.split(',') if y.strip().isdigit()} or None
+    # Load everything: a limited season still needs its predecessor for lag features.
+    df = load_seasons()
+    if df.empty:
+        raise FileNotFoundError(f"No COD seasons in {COD_DATASET_DIR}. Run bp_scraper.py --backfill first.")
+    for col in ['game_count', 'bp_rating', *COD_RATE_COLS.values()]:
+        df[col] = pd.to_numeric(df.get(col), errors='coerce')
+    maps = df['game_count'].where(df['game_count'] > 0)
+    for rate, col in COD_RATE_COLS.items():
+        df[rate] = df[col] / maps
+    df = df[df['game_count'] >= min_maps].sort_values(['player_id', 'season_id'])
+    prev = df.groupby('player_id')[[*COD_RATE_COLS, 'bp_rating', 'game_count']].shift(1)
+    df = df.join(prev.add_prefix('prev_'))
+    df = df[df['prev_game_count'].notna()]
+    if seasons:
+        df = df[df['season_id'].isin(seasons)]
     if max_rows:
         df = df.head(max_rows)
     return df.reset_index(drop=True)
@@ -87,7 +130,9 @@ def derive_target(df: pd.DataFrame, target: str) -> pd.Series:
     return df[target]
 
 
-def select_features(df: pd.DataFrame, target_col: str) -> list[str]:
+def select_features(df: pd.DataFrame, target_col: str, game: str = 'val') -> list[str]:
+    if game == 'cod':
+        return [c for c in COD_FEATURES if c in df.columns]
     feats = [c for c in NUMERIC_CANDIDATES if c in df.columns and c != target_col]
     # Remove high leakage columns if predicting kills_per_round (e.g., kills, deaths) -> keep context but not raw kills when target derived from kills?
     if target_col == 'kills_per_round':
@@ -116,9 +161,12 @@ def get_git_commit() -> str | None:
 
 def main():
     args = parse_args()
-    df = load_dataset(args.limit_year, args.min_rounds, args.max_rows)
+    if args.game == 'cod':
+        df = load_cod_dataset(args.limit_year, args.min_rounds, args.max_rows)
+    else:
+        df = load_dataset(args.limit_year, args.min_rounds, args.max_rows, args.target)
     y = derive_target(df, args.target)
-    feature_cols = select_features(df, args.target)
+    feature_cols = select_features(df, args.target, args.game)
     X = df[feature_cols].fillna(0)
 
     X_train, X_test, y_train, y_test = train_test_split(
@@ -150,6 +198,7 @@ def main():
         'metadata': {
             'trained_at': datetime.utcnow().isoformat(),
             'python_version': platform.python_version(),
+            'game': args.game,
             'target': args.target,
             'model_type': args.model,
             'feature_cols': feature_cols,
@@ -177,6 +226,7 @@ def main():
         print(f"[train] WARN could not update latest symlink: {e}", file=sys.stderr)
 
     metrics = {
+        'game': args.game,
         'target': args.target,
         'model': args.model,
         'timestamp': ts,
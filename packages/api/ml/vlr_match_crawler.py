@@ -0,0 +1,275 @@
+"""
+Resumable, incremental VLR.gg match-history crawler.
+
+Walks /matches/results (newest first), fetches each completed match page and
+appends its per-map player box scores (PlayerMatchStat shape) to a local
+JSONL store. Progress is checkpointed after every match, so an interrupted
+crawl picks up where it stopped, and later runs stop paging as soon as they
+reach a results page that is already fully ingested.
+
+Files (under data/match_history/):
+  player_map_stats.jsonl   one row per (playerId, matchId, mapNumber)
+  checkpoint.json          ingested match ids + backfill cursor (compacted)
+  checkpoint.log           progress since the last compaction, one line each
+
+Usage:
+  # refresh recent form (usually 1-2 results pages)
+  python packages/api/ml/vlr_match_crawler.py
+
+  # extend history 20 pages deeper than the previous backfill reached
+  python packages/api/ml/vlr_match_crawler.py --backfill-pages 20
+
+  # print per-player form over the last 30 days
+  python packages/api/ml/vlr_match_crawler.py --form-days 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+ML_DIR = Path(__file__).resolve().parent
+if str(ML_DIR) not in sys.path:
+    sys.path.insert(0, str(ML_DIR))
+
+from cache_util import load_json, now_iso, write_json  # noqa: E402
+from crawl_pool import Job, fetch_parse  # noqa: E402
+from vlr_scraper import get_results_page  # noqa: E402
+
+HISTORY_DIR = Path(os.getenv("VLR_HISTORY_DIR") or ML_DIR / "data" / "match_history")
+STORE_PATH = HISTORY_DIR / "player_map_stats.jsonl"
+CHECKPOINT_PATH = HISTORY_DIR / "checkpoint.json"
+
+ROW_KEY = ("playerId", "matchId", "mapNumber")
+
+
+class Checkpoint:
+    """
+    Ingested match ids plus the deepest results page a backfill has finished.
+
+    Progress is appended to a log beside the JSON snapshot (a match id, or
+    ``backfillPage=<n>``, per line), so recording one match costs one short
+    append instead of rewriting every id. Loading replays the log and folds it
+    into the snapshot; :meth:`save` does the same at the end of a run.
+    """
+
+    def __init__(self, path: Path = CHECKPOINT_PATH):
+        self.path = path
+        self.log_path = path.with_suffix(".log")
+        data = load_json(path, {}) or {}
+        self.ingested: set = set(data.get("ingested") or [])
+        self.backfill_page: int = int(data.get("backfillPage") or 0)
+        if self.log_path.exists():
+            with self.log_path.open(encoding="utf-8") as fh:
+                for raw in fh:
+                    if not raw.endswith("\n"):
+                        break  # torn last write from a crash; that match is simply retried
+                    line = raw.strip()
+                    if line.startswith("backfillPage="):
+                        self.backfill_page = max(self.backfill_page, int(line.partition("=")[2] or 0))
+                    elif line.isdigit():
+                        self.ingested.add(line)
+            # Compact now so later appends never land after a torn line.
+            self.save()
+
+    def _append(self, line: str) -> None:
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.log_path.open("a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def mark_ingested(self, match_id: str) -> None:
+        self.ingested.add(match_id)
+        self._append(match_id)
+
+    def mark_backfill_page(self, page: int) -> None:
+        self.backfill_page = page
+        self._append(f"backfillPage={page}")
+
+    def save(self) -> None:
+        """Write the full snapshot and clear the log."""
+        write_json(
+            self.path,
+            {
+                "ingested": sorted(self.ingested, key=int),
+                "backfillPage": self.backfill_page,
+                "updatedAt": now_iso(),
+            },
+        )
+        try:
+            self.log_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _append_rows(rows: List[Dict[str, Any]], path: Path = STORE_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as fh:
+        for r in rows:
+            fh.write(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def _ingest(matches: Iterable[Dict[str, Any]], cp: Checkpoint) -> int:
+    """Fetch every not-yet-ingested match; log each one to the checkpoint as it lands."""
+    added = 0
+    todo = [m for m in matches if m["id"] not in cp.ingested]
+    # Match pages download on threads and parse on the process pool.
+    jobs = [Job(m["url"], "match_map_stats", args=(m["id"],), key=m) for m in todo]
+    for job, rows, err in fetch_parse(jobs):
+        m = job.key
+        if err is not None:
+            # Leave it un-ingested; the next run retries it.
+            print(f"[crawl] match {m['id']} failed: {err}", file=sys.stderr)
+            continue
+        for r in rows:
+            if not r.get("event"):
+                r["event"] = m.get("event") or ""
+        if rows:
+            _append_rows(rows)
+        cp.mark_ingested(m["id"])
+        added += len(rows)
+    return added
+
+
+def crawl_recent(max_pages: int = 5, cp: Optional[Checkpoint] = None) -> int:
+    """Ingest matches newer than the checkpoint; stops at the first fully-known page."""
+    cp = cp or Checkpoint()
+    added = 0
+    for page in range(1, max_pages + 1):
+        matches = get_results_page(page)
+        if not matches:
+            break
+        if cp.ingested and all(m["id"] in cp.ingested for m in matches):
+            break
+        added += _ingest(matches, cp)
+        print(f"[crawl] recent page={page} rows+={added}", file=sys.stderr)
+    return added
+
+
+def backfill(pages: int, cp: Optional[Checkpoint] = None) -> int:
+    """Continue the historical crawl ``pages`` results pages past the saved cursor."""
+    cp = cp or Checkpoint()
+    added = 0
+    start = cp.backfill_page + 1
+    for page in range(start, start + pages):
+        matches = get_results_page(page)
+        if not matches:
+            break
+        added += _ingest(matches, cp)
+        if all(m["id"] in cp.ingested for m in matches):
+            # Only advance past pages that are complete, so failures get retried.
+            cp.mark_backfill_page(page)
+        print(f"[crawl] backfill page={page} rows+={added}", file=sys.stderr)
+    return added
+
+
+def load_store(path: Path = STORE_PATH) -> List[Dict[str, Any]]:
+    """All stored rows, deduplicated on (playerId, matchId, mapNumber) keeping the latest."""
+    if not path.exists():
+        return []
+    by_key: Dict[tuple, Dict[str, Any]] = {}
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # Torn last line from an interrupted append.
+                continue
+            by_key[tuple(row.get(k) for k in ROW_KEY)] = row
+    return list(by_key.values())
+
+
+def recent_form(days: int = 30, rows: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Per-player rates over maps played in the last ``days`` (feature column names)."""
+    rows = load_store() if rows is None else rows
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    acc: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        played = r.get("playedAt")
+        try:
+            if not played or datetime.fromisoformat(played) < cutoff:
+                continue
+        except ValueError:
+            continue
+        a = acc.setdefault(
+            r["playerId"],
+            {"player": r.get("name"), "maps": 0, "rounds": 0, "kills": 0, "deaths": 0, "assists": 0,
+             "first_kills": 0, "first_deaths": 0, "acs_x_rounds": 0.0, "adr_x_rounds": 0.0,
+             "hs_sum": 0.0, "hs_n": 0},
+        )
+        rounds = r.get("rounds") or 0
+        a["maps"] += 1
+        a["rounds"] += rounds
+        a["kills"] += r.get("kills") or 0
+        a["deaths"] += r.get("deaths") or 0
+        a["assists"] += r.get("assists") or 0
+        a["first_kills"] += r.get("firstKills") or 0
+        a["first_deaths"] += r.get("firstDeaths") or 0
+        a["acs_x_rounds"] += (r.get("acs") or 0) * rounds
+        a["adr_x_rounds"] += (r.get("adr") or 0) * rounds
+        if r.get("hsPercent") is not None:
+            a["hs_sum"] += r["hsPercent"]
+            a["hs_n"] += 1
+
+    out = []
+    for pid, a in acc.items():
+        rounds = a["rounds"]
+        deaths = a["deaths"]
+        out.append(
+            {
+                "playerId": pid,
+                "player": a["player"],
+                "maps": a["maps"],
+                "rounds_played": rounds,
+                "kpr": a["kills"] / rounds if rounds else None,
+                "apr": a["assists"] / rounds if rounds else None,
+                "acs": a["acs_x_rounds"] / rounds if rounds else None,
+                "adr": a["adr_x_rounds"] / rounds if rounds else None,
+                "fkpr": a["first_kills"] / rounds if rounds else None,
+                "fdpr": a["first_deaths"] / rounds if rounds else None,
+                "kdr": a["kills"] / deaths if deaths else None,
+                "kad": (a["kills"] + a["assists"]) / deaths if deaths else None,
+                "fk_fd_diff": a["first_kills"] - a["first_deaths"],
+                "hs_rate": a["hs_sum"] / a["hs_n"] / 100.0 if a["hs_n"] else None,
+            }
+        )
+    out.sort(key=lambda x: x["maps"], reverse=True)
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--max-pages", type=int, default=5, help="Results pages to scan for new matches")
+    p.add_argument("--backfill-pages", type=int, default=0, help="Extend history this many pages past the cursor")
+    p.add_argument("--form-days", type=int, default=0, help="Print per-player recent form over N days")
+    args = p.parse_args(argv)
+
+    cp = Checkpoint()
+    try:
+        added = crawl_recent(args.max_pages, cp)
+        if args.backfill_pages:
+            added += backfill(args.backfill_pages, cp)
+    finally:
+        cp.save()
+    print(
+        json.dumps({"rowsAdded": added, "matchesIngested": len(cp.ingested), "backfillPage": cp.backfill_page}),
+    )
+    if args.form_days:
+        for row in recent_form(args.form_days):
+            print(json.dumps(row))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,14 +1,20 @@
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 import re
 import sys
-from fake_useragent import UserAgent
+import threading
 
 try:
-    from http_util import get as http_get, session as http_session, DEFAULT_UA
+    from http_util import get as http_get, session as http_session, submit, DEFAULT_UA
+    from image_index import vlr_key
+    from cache_util import CACHE_DIR, DAY, age_seconds, load_json, now_iso, write_json
+    from crawl_pool import Job, fetch_parse
 except ImportError:
-    from packages.api.ml.http_util import get as http_get, session as http_session, DEFAULT_UA  # type: ignore
+    from packages.api.ml.http_util import get as http_get, session as http_session, submit, DEFAULT_UA  # type: ignore
+    from packages.api.ml.image_index import vlr_key  # type: ignore
+    from packages.api.ml.cache_util import CACHE_DIR, DAY, age_seconds, load_json, now_iso, write_json  # type: ignore
+    from packages.api.ml.crawl_pool import Job, fetch_parse  # type: ignore
 
 VLR_ORIGIN = "https://www.vlr.gg"
 DEFAULT_HEADERS = {
@@ -39,20 +45,17 @@ def _vlr_get(url: str):
 
 
 def get_upcoming_matches():
-    ua = UserAgent()
-    headers = {'User-Agent': ua.random}
-    # Fallback if random fails or is blocked, use the one that worked
-    headers['User-Agent'] = DEFAULT_UA
-    
     url = "https://www.vlr.gg/matches"
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        resp.raise_for_status()
+        resp = http_get(url, timeout=10)
     except Exception as e:
         print(f"Error fetching vlr.gg: {e}", file=sys.stderr)
         return []
+    return parse_upcoming_matches(resp.text)
+
 
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def parse_upcoming_matches(html, now=None):
+    soup = BeautifulSoup(html, 'html.parser')
     matches = []
     
     # vlr.gg structure:
@@ -77,7 +80,7 @@ def get_upcoming_matches():
     # Let's just find all match items and try to parse the ETA, which is relative and easier.
     
     match_items = soup.select('a.match-item')
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
     
     for item in match_items:
         try:
@@ -149,19 +152,16 @@ def get_upcoming_matches():
     return matches
 
 def get_match_players(match_url):
-    ua = UserAgent()
-    headers = {'User-Agent': ua.random}
-    # Fallback
-    headers['User-Agent'] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    
     try:
-        resp = requests.get(match_url, headers=headers, timeout=10)
-        resp.raise_for_status()
+        resp = http_get(match_url, timeout=10)
     except Exception as e:
         print(f"Error fetching match details {match_url}: {e}", file=sys.stderr)
         return []
+    return parse_match_players(resp.text)
+
 
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def parse_match_players(html):
+    soup = BeautifulSoup(html, 'html.parser')
     players = []
     
     # Players are in td.mod-player a
@@ -216,30 +216,51 @@ def get_match_players(match_url):
         
     return players
 
+# Class attrs are still raw strings while parse_only filters, so match with a regex.
+_PLAYER_HEADER = SoupStrainer(class_=re.compile(r"\bplayer-header\b"))
+
+
+def _parse_player_image(soup):
+    header_img = soup.select_one('.player-header img')
+    if not header_img:
+        return None
+    src = header_img.get('src')
+    if src and 'owcdn' in src:
+        if src.startswith('//'):
+            return 'https:' + src
+        return src
+    return None
+
+
+def parse_player_image(html):
+    """Avatar URL from a profile page, building only the player-header subtree."""
+    soup = BeautifulSoup(html, "html.parser", parse_only=_PLAYER_HEADER)
+    try:
+        return _parse_player_image(soup)
+    finally:
+        soup.decompose()
+
+
+def get_player_image(player_url):
+    """Fetch a profile page and return only the avatar URL (None if it has none). Raises on fetch errors."""
+    resp = http_get(player_url, timeout=20)
+    return parse_player_image(resp.text)
+
+
 def get_player_stats(player_url):
-    ua = UserAgent()
-    headers = {'User-Agent': ua.random}
-    headers['User-Agent'] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    
     try:
-        resp = requests.get(player_url, headers=headers, timeout=10)
-        resp.raise_for_status()
+        resp = http_get(player_url, timeout=10)
     except Exception as e:
         print(f"Error fetching player stats {player_url}: {e}", file=sys.stderr)
         return {}
+    return parse_player_stats(resp.text)
+
 
-    soup = BeautifulSoup(resp.text, 'html.parser')
+def parse_player_stats(html):
+    soup = BeautifulSoup(html, 'html.parser')
     
     # Extract player image
-    image_url = None
-    header_img = soup.select_one('.player-header img')
-    if header_img:
-        src = header_img.get('src')
-        if src and 'owcdn' in src:
-            if src.startswith('//'):
-                image_url = 'https:' + src
-            else:
-                image_url = src
+    image_url = _parse_player_image(soup)
 
     # Find the stats table. It's usually the first table in the "Stats" section or just the main table.
     # The table has headers like "Agent", "Usage", "Rounds", "Rating", "ACS", "K:D", "ADR", "KAST", "KPR", "APR", "FKPR", "FDPR", "K", "D", "A", "FK", "FD"
@@ -392,75 +413,135 @@ def _parse_num(text: str):
             return None
 
 
-def get_stats_leaderboard(timespan: str = "90d", min_rounds: int = 100, limit: int = 100):
-    """
-    Scrape VLR.gg aggregate player stats table.
-    Returns DemoStatRow-compatible VALORANT dicts.
-    """
-    url = (
-        f"{VLR_ORIGIN}/stats/?event_group_id=all&event_id=all&region=all"
+def _stats_url(timespan: str = "90d", region: str = "all", min_rounds: int = 100) -> str:
+    return (
+        f"{VLR_ORIGIN}/stats/?event_group_id=all&event_id=all&region={region}"
         f"&country=all&min_rounds={min_rounds}&min_rating=1550&agent=all"
         f"&map_id=all&timespan={timespan}"
     )
-    resp = _vlr_get(url)
-    if resp is None:
+
+
+def _parse_stats_row(row):
+    """One /stats table <tr> -> DemoStatRow-compatible dict (None for header/short rows)."""
+    tds = row.find_all("td")
+    if len(tds) < 21:
+        return None
+    link = tds[0].select_one('a[href*="/player/"]')
+    if not link:
+        return None
+    href = link.get("href") or ""
+    parts = href.strip("/").split("/")
+    # /player/{id}/{slug}
+    pid = parts[1] if len(parts) >= 2 else href
+    name_el = tds[0].select_one(".st-pl-name")
+    team_el = tds[0].select_one(".st-pl-country")
+    name = name_el.get_text(strip=True) if name_el else link.get_text(strip=True)
+    team = team_el.get_text(strip=True) if team_el else ""
+
+    maps = _parse_num(tds[2].get_text(strip=True)) or 0
+    rating = _parse_num(tds[4].get_text(strip=True)) or 0
+    acs = _parse_num(tds[5].get_text(strip=True))
+    hs = _parse_pct(tds[14].get_text(strip=True))
+    kills = _parse_num(tds[18].get_text(strip=True)) or 0
+    deaths = _parse_num(tds[19].get_text(strip=True)) or 0
+    assists = _parse_num(tds[20].get_text(strip=True)) or 0
+
+    return {
+        "playerId": f"val-{pid}",
+        "name": name,
+        "team": team or "VLR",
+        "game": "VALORANT",
+        "imageUrl": "",
+        "maps": int(maps),
+        "kills": int(kills),
+        "deaths": int(deaths),
+        "assists": int(assists),
+        "rating": round(float(rating), 3),
+        "acs": int(acs) if acs is not None else None,
+        "hsPercent": round(hs, 1) if hs is not None else None,
+        "source": "vlr",
+        "profileUrl": f"{VLR_ORIGIN}{href}" if href.startswith("/") else href,
+    }
+
+
+def parse_stats_page(html: str):
+    """
+    Yield leaderboard rows from a /stats page.
+
+    Only the <table> subtree is built, and it is decomposed once the rows
+    have been consumed, so memory per page stays bounded.
+    """
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("table"))
+    try:
+        table = soup.find("table")
+        if not table:
+            print("[vlr] no stats table found", file=sys.stderr)
+            return
+        for row in table.find_all("tr"):
+            parsed = _parse_stats_row(row)
+            if parsed:
+                yield parsed
+    finally:
+        soup.decompose()
+
+
+def _fetch_stats_page(timespan: str, region: str, min_rounds: int, fallback: bool):
+    """Download and parse one slice; only the compact row dicts outlive the call."""
+    resp = _vlr_get(_stats_url(timespan, region, min_rounds))
+    if resp is None and fallback:
         # Fallback default stats landing page
         resp = _vlr_get(f"{VLR_ORIGIN}/stats")
     if resp is None:
         return []
+    return list(parse_stats_page(resp.text))
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-    table = soup.find("table")
-    if not table:
-        print("[vlr] no stats table found", file=sys.stderr)
-        return []
 
-    out = []
-    for row in table.find_all("tr")[1:]:
-        tds = row.find_all("td")
-        if len(tds) < 21:
-            continue
-        link = tds[0].select_one('a[href*="/player/"]')
-        if not link:
-            continue
-        href = link.get("href") or ""
-        parts = href.strip("/").split("/")
-        # /player/{id}/{slug}
-        pid = parts[1] if len(parts) >= 2 else href
-        name_el = tds[0].select_one(".st-pl-name")
-        team_el = tds[0].select_one(".st-pl-country")
-        name = name_el.get_text(strip=True) if name_el else link.get_text(strip=True)
-        team = team_el.get_text(strip=True) if team_el else ""
-
-        maps = _parse_num(tds[2].get_text(strip=True)) or 0
-        rating = _parse_num(tds[4].get_text(strip=True)) or 0
-        acs = _parse_num(tds[5].get_text(strip=True))
-        hs = _parse_pct(tds[14].get_text(strip=True))
-        kills = _parse_num(tds[18].get_text(strip=True)) or 0
-        deaths = _parse_num(tds[19].get_text(strip=True)) or 0
-        assists = _parse_num(tds[20].get_text(strip=True)) or 0
-
-        out.append(
-            {
-                "playerId": f"val-{pid}",
-                "name": name,
-                "team": team or "VLR",
-                "game": "VALORANT",
-                "imageUrl": "",
-                "maps": int(maps),
-                "kills": int(kills),
-                "deaths": int(deaths),
-                "assists": int(assists),
-                "rating": round(float(rating), 3),
-                "acs": int(acs) if acs is not None else None,
-                "hsPercent": round(hs, 1) if hs is not None else None,
-                "source": "vlr",
-                "profileUrl": f"{VLR_ORIGIN}{href}" if href.startswith("/") else href,
-            }
-        )
-        if len(out) >= limit:
-            break
+def iter_stats_leaderboard(
+    timespans=("90d",),
+    regions=("all",),
+    min_rounds: int = 100,
+    limit: int | None = None,
+    workers: int = 4,
+):
+    """
+    Stream VLR.gg leaderboard rows across timespan x region slices.
+
+    Slices are downloaded and parsed concurrently on worker threads (rate
+    limited per host by http_util); each page's tree is freed in the worker.
+    Rows are yielded in slice order, each slice as soon as it and every slice
+    before it are done, so callers can start merging before later pages
+    arrive. A player in several slices keeps the row from the earliest slice,
+    whatever order the downloads finish in. Stops fetching once ``limit``
+    rows have been yielded.
+    """
+    slices = [(t, r) for t in timespans for r in regions]
+    if not slices:
+        return
+    fallback = len(slices) == 1
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(slices))), thread_name_prefix="vlr-stats")
+    try:
+        futures = [submit(pool, _fetch_stats_page, t, r, min_rounds, fallback) for t, r in slices]
+        seen = set()
+        emitted = 0
+        for fut in futures:
+            for row in fut.result():
+                if row["playerId"] in seen:
+                    continue
+                seen.add(row["playerId"])
+                yield row
+                emitted += 1
+                if limit is not None and emitted >= limit:
+                    return
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
+
+def get_stats_leaderboard(timespan: str = "90d", min_rounds: int = 100, limit: int = 100):
+    """
+    Scrape VLR.gg aggregate player stats table.
+    Returns DemoStatRow-compatible VALORANT dicts.
+    """
+    out = list(iter_stats_leaderboard(timespans=(timespan,), min_rounds=min_rounds, limit=limit))
     print(f"[vlr] leaderboard rows={len(out)}", file=sys.stderr)
     return out
 
@@ -476,54 +557,284 @@ def _player_id_from_href(href: str):
     return None
 
 
-def search_player(name: str):
-    """Best-effort VLR player search. Returns {id, name, url} or None."""
-    from urllib.parse import quote
+def parse_results_page(html: str):
+    """Completed matches listed on /matches/results (newest first) -> [{id, url, event}]."""
+    soup = BeautifulSoup(html, "html.parser")
+    try:
+        out = []
+        for item in soup.select("a.match-item"):
+            href = item.get("href") or ""
+            mid = href.strip("/").split("/")[0]
+            if not mid.isdigit():
+                continue
+            event_el = item.select_one(".match-item-event")
+            event = " ".join(event_el.get_text(" ", strip=True).split()) if event_el else ""
+            out.append({"id": mid, "url": f"{VLR_ORIGIN}{href}", "event": event})
+        return out
+    finally:
+        soup.decompose()
 
-    q = quote(name)
-    resp = _vlr_get(f"{VLR_ORIGIN}/search/?type=players&q={q}")
+
+def get_results_page(page: int = 1):
+    resp = _vlr_get(f"{VLR_ORIGIN}/matches/results?page={page}")
     if resp is None:
-        return None
-    soup = BeautifulSoup(resp.text, "html.parser")
-    candidates = []
-    for a in soup.select('a[href*="/player/"]'):
-        href = a.get("href") or ""
-        pid = _player_id_from_href(href)
-        if not pid:
-            continue
-        text = a.get_text(" ", strip=True)
-        candidates.append((pid, text, href))
+        return []
+    return parse_results_page(resp.text)
+
+
+def _stat_cell(td):
+    both = td.select_one(".mod-both") or td
+    return both.get_text(strip=True).strip("/").strip()
+
+
+def parse_match_map_stats(html: str, match_id: str):
+    """
+    Per-map player box scores from a completed match page.
+
+    Rows follow the PlayerMatchStat shape (playerId, matchId, mapNumber,
+    kills, deaths, assists, acs, adr, hsPercent, damage) plus name, team,
+    map, rounds, rating, first kills/deaths, event and playedAt.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    try:
+        ts_el = soup.select_one(".match-header-date [data-utc-ts]")
+        played_at = None
+        if ts_el and ts_el.get("data-utc-ts"):
+            played_at = ts_el["data-utc-ts"].strip().replace(" ", "T") + "+00:00"
+        event_el = soup.select_one(".match-header-event")
+        event = " ".join(event_el.get_text(" ", strip=True).split()) if event_el else ""
+
+        rows = []
+        map_number = 0
+        for game in soup.select(".vm-stats-game"):
+            game_id = game.get("data-game-id")
+            if not game_id or game_id == "all":
+                continue
+            map_number += 1
+            map_el = game.select_one(".vm-stats-game-header .map")
+            map_tokens = map_el.get_text(" ", strip=True).split() if map_el else []
+            map_name = map_tokens[0] if map_tokens else None
+            scores = [_parse_num(x.get_text(strip=True)) for x in game.select(".vm-stats-game-header .score")]
+            rounds = sum(x for x in scores if x) or None
+
+            for tr in game.select("table.wf-table-inset tbody tr"):
+                link = tr.select_one('td.mod-player a[href*="/player/"]')
+                if not link:
+                    continue
+                pid = _player_id_from_href(link.get("href") or "")
+                if not pid:
+                    continue
+                stats = [_stat_cell(td) for td in tr.select("td.mod-stat")]
+                if len(stats) < 11:
+                    continue
+                name_el = link.select_one(".text-of")
+                team_el = link.select_one(".ge-text-light")
+                rating, acs, kills, deaths, assists, _kd, _kast, adr, hs, fk, fd = stats[:11]
+                rows.append(
+                    {
+                        "playerId": f"val-{pid}",
+                        "matchId": f"vlr_{match_id}",
+                        "mapNumber": map_number,
+                        "kills": _parse_num(kills) or 0,
+                        "deaths": _parse_num(deaths),
+                        "assists": _parse_num(assists),
+                        "acs": _parse_num(acs),
+                        "adr": _parse_num(adr),
+                        "hsPercent": _parse_pct(hs),
+                        "damage": None,
+                        "name": name_el.get_text(strip=True) if name_el else link.get_text(strip=True),
+                        "team": team_el.get_text(strip=True) if team_el else "",
+                        "map": map_name,
+                        "rounds": rounds,
+                        "rating": _parse_num(rating),
+                        "firstKills": _parse_num(fk),
+                        "firstDeaths": _parse_num(fd),
+                        "event": event,
+                        "playedAt": played_at,
+                    }
+                )
+        return rows
+    finally:
+        soup.decompose()
+
+
+def get_match_map_stats(match_url: str, match_id: str):
+    """Fetch + parse one completed match. Raises on fetch errors so crawlers can retry later."""
+    resp = http_get(match_url, timeout=20)
+    return parse_match_map_stats(resp.text, match_id)
+
+
+# name -> VLR id resolutions. Exact-name hits are treated as stable and never
+# re-searched; fuzzy hits and misses expire so renames / new players get picked up.
+PLAYER_ID_CACHE_PATH = CACHE_DIR / "vlr_player_ids.json"
+FUZZY_HIT_TTL = 7 * DAY
+MISS_TTL = 1 * DAY
+
+
+class PlayerIdCache:
+    """Persistent name -> {id, confidence, resolvedAt} map with a negative cache (id=None)."""
+
+    def __init__(self, path=PLAYER_ID_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return " ".join((name or "").lower().split())
+
+    def _load(self):
+        if self._entries is None:
+            data = load_json(self.path, {})
+            self._entries = data if isinstance(data, dict) else {}
+        return self._entries
+
+    def get(self, name: str):
+        """Cached entry if still valid, else None. Misses come back as {"id": None, ...}."""
+        with self._lock:
+            entry = self._load().get(self._key(name))
+        if not entry:
+            return None
+        if entry.get("id") is None:
+            ttl = MISS_TTL
+        elif (entry.get("confidence") or 0) >= 1.0:
+            return entry
+        else:
+            ttl = FUZZY_HIT_TTL
+        return entry if age_seconds(entry.get("resolvedAt")) < ttl else None
+
+    def put(self, name: str, player_id, confidence: float = 0.0) -> None:
+        with self._lock:
+            self._load()[self._key(name)] = {
+                "id": player_id,
+                "name": name,
+                "confidence": confidence,
+                "resolvedAt": now_iso(),
+            }
+            self._save()
+
+    def invalidate(self, name=None) -> None:
+        """Forget one name (e.g. after a rename) or, with no name, every entry."""
+        with self._lock:
+            entries = self._load()
+            if name is None:
+                entries.clear()
+            else:
+                entries.pop(self._key(name), None)
+            self._save()
+
+    def _save(self) -> None:
+        try:
+            write_json(self.path, self._entries)
+        except Exception as e:
+            print(f"[vlr] could not write {self.path}: {e}", file=sys.stderr)
+
+
+player_id_cache = PlayerIdCache()
+
+
+def invalidate_player_id(name=None) -> None:
+    """Drop a cached name -> id resolution (all of them if name is None)."""
+    player_id_cache.invalidate(name)
+
+
+def parse_search_results(html: str):
+    """Player hits on a /search page -> [(id, text, href)] in page order."""
+    soup = BeautifulSoup(html, "html.parser")
+    try:
+        candidates = []
+        for a in soup.select('a[href*="/player/"]'):
+            href = a.get("href") or ""
+            pid = _player_id_from_href(href)
+            if not pid:
+                continue
+            text = a.get_text(" ", strip=True)
+            candidates.append((pid, text, href))
+        return candidates
+    finally:
+        soup.decompose()
+
+
+def _search_player_uncached(name: str):
+    """Hit /search and return (id, confidence); (None, 0.0) on no results, raises on fetch errors."""
+    from urllib.parse import quote
 
+    q = quote(name)
+    resp = http_get(f"{VLR_ORIGIN}/search/?type=players&q={q}", timeout=20)
+    candidates = parse_search_results(resp.text)
     if not candidates:
-        return None
+        return None, 0.0
 
     # Prefer exact name match (case-insensitive) on the first token / full text.
     name_l = name.lower()
     exact = [c for c in candidates if c[1].split()[0].lower() == name_l or c[1].lower() == name_l]
-    pick = exact[0] if exact else candidates[0]
-    pid = pick[0]
+    if exact:
+        return exact[0][0], 1.0
+    return candidates[0][0], 0.5
+
+
+def search_player(name: str, use_cache: bool = True):
+    """
+    Best-effort VLR player search. Returns {id, name, url, confidence} or None.
+
+    Resolutions (and misses) are memoized in a persistent TTL cache; exact
+    matches never hit the search endpoint again until invalidated.
+    """
+    entry = player_id_cache.get(name) if use_cache else None
+    if entry is None:
+        try:
+            pid, confidence = _search_player_uncached(name)
+        except Exception as e:
+            # Network errors are not cached as misses.
+            print(f"[vlr] search failed for {name}: {e}", file=sys.stderr)
+            return None
+        player_id_cache.put(name, pid, confidence)
+    else:
+        pid, confidence = entry.get("id"), entry.get("confidence") or 0.0
+    if not pid:
+        return None
     return {
         "id": pid,
         "name": name,
         "url": f"{VLR_ORIGIN}/player/{pid}",
+        "confidence": confidence,
     }
 
 
-def get_watchlist_players(names=None):
+def get_watchlist_players(names=None, index=None):
     """
     Resolve watchlist names to player pages and pull recent stats + avatars.
-    Fail-soft per player.
+    Fail-soft per player. Avatars found are recorded in ``index`` (an ImageIndex).
     """
     names = names or WATCHLIST_NAMES
-    rows = []
+    hits = []
     for name in names:
         try:
             hit = search_player(name)
-            if not hit:
-                print(f"[vlr] watchlist miss: {name}", file=sys.stderr)
-                continue
-            stats = get_player_stats(hit["url"]) or {}
+        except Exception as e:
+            print(f"[vlr] watchlist error {name}: {e}", file=sys.stderr)
+            continue
+        if not hit:
+            print(f"[vlr] watchlist miss: {name}", file=sys.stderr)
+            continue
+        hits.append((name, hit))
+
+    # Profile pages are fetched concurrently and parsed off the GIL.
+    stats_by_idx = {}
+    jobs = [Job(hit["url"], "player_stats", key=i) for i, (_name, hit) in enumerate(hits)]
+    for job, stats, err in fetch_parse(jobs):
+        if err is not None:
+            print(f"Error fetching player stats {job.url}: {err}", file=sys.stderr)
+            continue
+        stats_by_idx[job.key] = stats or {}
+
+    rows = []
+    for i, (name, hit) in enumerate(hits):
+        try:
+            stats = stats_by_idx.get(i) or {}
             image = stats.get("image_url") or ""
+            if index is not None and stats:
+                index.record(vlr_key(hit["id"]), image, "vlr")
             kills = int(stats.get("kills") or 0)
             deaths = int(stats.get("deaths") or 0)
             assists = int(stats.get("assists") or 0)
@@ -558,25 +869,45 @@ def get_watchlist_players(names=None):
     return rows
 
 
-def enrich_image_urls(players, max_fetch: int = 25):
-    """Fill missing imageUrl by visiting player profile pages (capped)."""
-    fetched = 0
+def enrich_image_urls(players, max_fetch: int = 25, index=None):
+    """
+    Fill missing imageUrl, preferring the persistent image index.
+
+    Only players whose index entry is missing or past its TTL cost a profile
+    fetch (capped at ``max_fetch``); results are written back to the index.
+    ``players`` may be any iterable (e.g. iter_stats_leaderboard): index
+    lookups happen as rows stream in, then the remaining profile pages are
+    fetched in one concurrent batch. Returns a list.
+    """
+    out = []
+    todo = []
     for p in players:
+        out.append(p)
         if p.get("imageUrl"):
             continue
-        if fetched >= max_fetch:
-            break
-        url = p.get("profileUrl")
-        if not url:
+        pid = p.get("playerId")
+        if index is not None and index.is_fresh(pid):
+            p["imageUrl"] = index.lookup(pid) or ""
             continue
-        try:
-            stats = get_player_stats(url) or {}
-            if stats.get("image_url"):
-                p["imageUrl"] = stats["image_url"]
-            fetched += 1
-        except Exception:
+        if len(todo) >= max_fetch or not p.get("profileUrl"):
+            if index is not None:
+                # Over budget: serve a stale URL rather than nothing.
+                p["imageUrl"] = index.lookup(pid) or ""
             continue
-    return players
+        todo.append(p)
+
+    jobs = [Job(p["profileUrl"], "player_image", key=i) for i, p in enumerate(todo)]
+    for job, image, err in fetch_parse(jobs):
+        p = todo[job.key]
+        if err is not None:
+            if index is not None:
+                p["imageUrl"] = index.lookup(p.get("playerId")) or ""
+            continue
+        if image:
+            p["imageUrl"] = image
+        if index is not None:
+            index.record(p.get("playerId"), image, "vlr")
+    return out
 
 
 if __name__ == "__main__":